@@ -0,0 +1,159 @@
+"""Latency and fairness of the role balancer against the old rejection loop.
+
+The second table is the role distribution: the share of deals, per lobby size,
+that include a wolf (any of the pack), a cultist, a serial killer or an arsonist.
+A balancer that is fair on strength can still skew which evil side shows up.
+
+With NumPy installed the batched rejection sampler from ``cogs.werewolf.vectorized``
+is measured too, along with its bulk throughput in candidates per second. It is
+only used for analysis; per lobby it is slower than ``Session.balance``.
+
+Run with ``python -m benchmarks.balance``.
+"""
+import random
+import statistics
+import time
+from types import SimpleNamespace
+from typing import List, Tuple
+
+from cogs.werewolf.roles import ROLES, Role
+from cogs.werewolf.session import Session
+from cogs.werewolf import vectorized
+
+
+def make_session(player_count: int, chaos: bool = False) -> Session:
+    session = Session(None, chaos, None)
+    for n in range(player_count):
+        session.join(SimpleNamespace(id=n, display_name=f'Bob_{n}', mention=f'@Bob_{n}'))
+    return session
+
+
+def legacy_balance(session: Session) -> Tuple[List[Role], int]:
+    """The rejection loop ``Session.balance`` used before, returning the roles and the number of draws."""
+    role_to_assign = session.get_role_list()
+    if session.player_count > len(role_to_assign):
+        role_to_assign += [ROLES.Villager] * (session.player_count - len(role_to_assign))
+    count = 0
+    while True:
+        count += 1
+        roles = random.choices(role_to_assign, k=session.player_count)
+        if count >= 500:
+            break
+        pointless_role = [x for x in roles if x in [ROLES.Traitor, ROLES.SnowWolf, ROLES.Sorcerer]]
+        if pointless_role and ROLES.Wolf not in roles:
+            roles[roles.index(pointless_role[0])] = ROLES.Wolf
+        if (
+                ROLES.Cultist in roles and
+                ROLES.CultistHunter not in roles and
+                not session.is_disabled(ROLES.CultistHunter)
+        ):
+            if ROLES.Villager in roles:
+                roles[roles.index(ROLES.Villager)] = ROLES.CultistHunter
+            else:
+                roles[roles.index(ROLES.Cultist)] = ROLES.Villager
+        if not session.setting.burning_overkill and ROLES.Arsonist in roles and ROLES.SerialKiller in roles:
+            roles[roles.index(ROLES.Arsonist)] = ROLES.Villager
+        if ROLES.ApprenticeSeer in roles and ROLES.Seer not in roles:
+            roles[roles.index(ROLES.ApprenticeSeer)] = ROLES.Seer
+        baddies = [x for x in roles if ROLES.is_evil(x)]
+        villagers = [x for x in roles if not ROLES.is_evil(x)]
+        if not (villagers and baddies):
+            continue
+        if len(villagers) < len(baddies):
+            continue
+        if session.chaos:
+            break
+        if abs(sum(n.strength for n in villagers) - sum(n.strength for n in baddies)) <= session.player_count // 4 + 1:
+            break
+    return roles, count
+
+
+def vectorized_balance(session: Session) -> List[Role]:
+    result, _ = vectorized.balance_vectorized(
+        session.get_role_list(),
+        session.player_count,
+        chaos=session.chaos,
+        burning_overkill=session.setting.burning_overkill,
+        cult_hunter=not session.is_disabled(ROLES.CultistHunter),
+    )
+    return result.roles
+
+
+def is_balanced(session: Session, roles: List[Role]) -> bool:
+    villagers = [n.strength for n in roles if not ROLES.is_evil(n)]
+    baddies = [n.strength for n in roles if ROLES.is_evil(n)]
+    return (
+            bool(villagers and baddies) and len(villagers) >= len(baddies) and
+            abs(sum(villagers) - sum(baddies)) <= session.player_count // 4 + 1
+    )
+
+
+def measure(func, session: Session, rounds: int):
+    timings, balanced, evil = [], 0, []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        roles = func(session)
+        timings.append(time.perf_counter() - start)
+        balanced += is_balanced(session, roles)
+        evil.append(sum(1 for n in roles if ROLES.is_evil(n)))
+    return statistics.mean(timings) * 1000, max(timings) * 1000, balanced / rounds, statistics.mean(evil)
+
+
+def throughput(session: Session, seconds: float = 0.5) -> Tuple[float, float]:
+    """Candidates scored per second, one at a time in Python and as one NumPy batch."""
+    pool = session.get_role_list()
+    pool += [ROLES.Villager] * max(session.player_count - len(pool), 0)
+    count, start = 0, time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        roles = random.choices(pool, k=session.player_count)
+        sum(n.strength for n in roles if ROLES.is_evil(n)) - sum(n.strength for n in roles if not ROLES.is_evil(n))
+        count += 1
+    python = count / (time.perf_counter() - start)
+    start = time.perf_counter()
+    vectorized.sample_roles(pool, session.player_count, 100_000)
+    return python, 100_000 / (time.perf_counter() - start)
+
+
+FACTIONS = (('wolf', ROLES.wolves), ('cult', (ROLES.Cultist,)), ('sk', (ROLES.SerialKiller,)), ('arson', (ROLES.Arsonist,)))
+
+
+def distribution(func, session: Session, deals: int) -> List[float]:
+    """The share of ``deals`` that include each of :data:`FACTIONS`."""
+    seen = [0] * len(FACTIONS)
+    for _ in range(deals):
+        roles = set(func(session))
+        for idx, (_, members) in enumerate(FACTIONS):
+            seen[idx] += any(n in roles for n in members)
+    return [n / deals for n in seen]
+
+
+def main(rounds: int = 200, deals: int = 1000):
+    columns = [('legacy', lambda s: legacy_balance(s)[0]), ('balance', Session.balance)]
+    if vectorized.HAS_NUMPY:
+        columns.append(('vectorized', vectorized_balance))
+    print(f'{"players":>7} | ' + ' | '.join(
+        f'{name + " ms":>13} {"max":>7} {"ok %":>6} {"evil":>5}' for name, _ in columns
+    ))
+    for player_count in range(5, 51, 5):
+        session = make_session(player_count)
+        results = [measure(func, session, rounds) for _, func in columns]
+        print(f'{player_count:>7} | ' + ' | '.join(
+            f'{n[0]:>13.3f} {n[1]:>7.2f} {n[2] * 100:>6.1f} {n[3]:>5.1f}' for n in results
+        ))
+    dealers = columns[:2]
+    print(f'\n{"players":>7} | ' + ' | '.join(
+        ' '.join(f'{name[:4] + " " + faction:>11}' for faction, _ in FACTIONS) for name, _ in dealers
+    ))
+    for player_count in (5, 6, 7, 8, 10, 15, 20, 30, 40, 50):
+        session = make_session(player_count)
+        shares = [distribution(func, session, deals) for _, func in dealers]
+        print(f'{player_count:>7} | ' + ' | '.join(' '.join(f'{n * 100:>10.1f}%' for n in row) for row in shares))
+    if vectorized.HAS_NUMPY:
+        print(f'\n{"players":>7} | {"python cand/s":>14} {"numpy cand/s":>14}')
+        for player_count in (10, 30, 50):
+            python, batched = throughput(make_session(player_count))
+            print(f'{player_count:>7} | {python:>14,.0f} {batched:>14,.0f}')
+
+
+if __name__ == '__main__':
+    main()
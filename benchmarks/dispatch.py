@@ -0,0 +1,56 @@
+"""Wall-clock time of a 50 player DM fan-out, sequential against :class:`DMDispatcher`.
+
+Run with ``python -m benchmarks.dispatch``.
+"""
+import asyncio
+import logging
+import random
+import time
+
+from cogs.werewolf.dispatch import DMDispatcher
+
+
+class FakeMember:
+    def __init__(self, id: int, latency: float, fail: bool = False):
+        self.id = id
+        self.latency = latency
+        self.fail = fail
+
+    async def send(self, content: str):
+        await asyncio.sleep(self.latency)
+        if self.fail:
+            raise RuntimeError('cannot send messages to this user')
+
+    def __repr__(self):
+        return f'<FakeMember id={self.id}>'
+
+
+async def sequential(messages):
+    start = time.perf_counter()
+    for member, content in messages:
+        try:
+            await member.send(content)
+        except Exception:
+            pass
+    return time.perf_counter() - start
+
+
+async def run(players: int = 50, latency: float = 0.08):
+    rng = random.Random(0)
+    members = [FakeMember(n, latency * rng.uniform(0.5, 1.5), fail=n % 17 == 0) for n in range(players)]
+    messages = [(m, f'你是第 {m.id} 号玩家') for m in members]
+
+    print(f'{players} players, ~{latency * 1000:.0f} ms per DM')
+    print(f'{"sequential":<16}{await sequential(messages):>8.3f}s')
+    for limit in (5, 10, 25, 50):
+        report = await DMDispatcher(limit).send_all(messages)
+        print(f'{f"limit={limit}":<16}{report.elapsed:>8.3f}s  sent={report.sent} failed={len(report.failed)}')
+
+
+def main():
+    logging.getLogger('cogs.werewolf.dispatch').setLevel(logging.ERROR)
+    asyncio.run(run())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""Stand-ins for the ``qq`` objects a :class:`Session` touches, for benchmarks.
+
+Sessions built by :func:`make_session` go through the real constructor with a
+:class:`FakeContext`, but talk to bots over a
+:class:`~cogs.werewolf.simulation.LocalTransport`, so nothing leaves the process.
+"""
+import datetime
+from typing import Iterable, List, Optional, Sequence
+
+from cogs.werewolf.roles import Role
+from cogs.werewolf.session import Player, Session
+from cogs.werewolf.simulation import LocalTransport, Strategy
+
+__all__ = (
+    'FakeMember',
+    'FakeChannel',
+    'FakeGuild',
+    'FakeContext',
+    'make_session',
+    'players',
+    'pair',
+    'kill',
+)
+
+
+class FakeMember:
+    """A ``qq.Member``; private messages end up in :attr:`inbox`."""
+
+    def __init__(self, member_id: int, name: Optional[str] = None):
+        self.id: int = member_id
+        self.display_name: str = name or f'Bob_{member_id}'
+        self.mention: str = f'@{self.display_name}'
+        self.bot: bool = False
+        self.inbox: List[str] = []
+
+    def __repr__(self):
+        return f'<FakeMember id={self.id} name={self.display_name}>'
+
+    async def send(self, content: str):
+        self.inbox.append(content)
+
+
+class FakeChannel:
+    """A ``qq.TextChannel``; posts end up in :attr:`log`."""
+
+    def __init__(self, channel_id: int = 1):
+        self.id: int = channel_id
+        self.log: List[str] = []
+
+    async def send(self, content: str):
+        self.log.append(content)
+
+
+class FakeGuild:
+    def __init__(self, guild_id: int = 1, name: str = 'bench'):
+        self.id: int = guild_id
+        self.name: str = name
+
+
+class FakeContext:
+    """The parts of ``commands.Context`` a :class:`Session` reads."""
+
+    def __init__(self, guild: Optional[FakeGuild] = None, channel: Optional[FakeChannel] = None,
+                 author: Optional[FakeMember] = None):
+        self.bot = None
+        self.guild: FakeGuild = guild or FakeGuild()
+        self.channel: FakeChannel = channel or FakeChannel()
+        self.author: FakeMember = author or FakeMember(0)
+
+    async def reply(self, content: str):
+        await self.channel.send(content)
+
+    async def send(self, content: str):
+        await self.channel.send(content)
+
+
+def make_session(
+        player_count: int,
+        chaos: bool = False,
+        *,
+        roles: Optional[Sequence[Role]] = None,
+        strategy: Optional[Strategy] = None,
+        running: bool = False,
+) -> Session:
+    """A lobby of ``player_count`` :class:`FakeMember`, without timers.
+
+    With ``roles`` the players get them in order, any left over are not dealt a role.
+    ``running`` puts the session in the state :meth:`Session.main_game_loop` leaves it
+    in once the roles are dealt.
+    """
+    session = Session(FakeContext(), chaos, None, transport=LocalTransport(strategy))
+    session.setting.game_join_time = 0
+    session.setting.start_delay = 0
+    session.setting.night_time = 0
+    session.setting.night_warning = 0
+    session.setting.day_time = 0
+    session.setting.lynch_time = 0
+    for n in range(player_count):
+        session.join(FakeMember(n))
+    if roles is not None:
+        for p, role in zip(session.players.values(), roles):
+            p.set_role(role)
+    if running:
+        session.is_joining = False
+        session.is_running = True
+        session.day = 1
+        session.start_time = datetime.datetime.now()
+    return session
+
+
+def players(session: Session) -> List[Player]:
+    return list(session.players.values())
+
+
+def pair(first: Player, second: Player):
+    first.in_love = second
+    second.in_love = first
+
+
+def kill(session: Session, who: Iterable[Player]):
+    """Mark players dead without any of :meth:`Session.kill_player`'s side effects."""
+    for p in who:
+        p.dead = True
+        p.time_died = session.day
@@ -0,0 +1,96 @@
+"""Sustained game-history inserts while many games end at once.
+
+Records of simulated games are replayed by ``GAMES`` concurrent producers, each
+ending a game every ``INTERVAL`` seconds on average. The batched background writer of
+:class:`HistoryStore` is compared with a naive store that commits every game on the
+event loop with SQLite's default rollback journal. Event-loop lag is the worst delay
+a 5 ms ticker saw while the games were being stored.
+
+Run with ``python -m benchmarks.history``.
+"""
+import asyncio
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from typing import List
+
+from cogs.werewolf.history import SCHEMA, GameRecord, HistoryStore
+from cogs.werewolf.simulation import simulate
+
+GAMES = 500
+INTERVAL = 0.05
+PLAYERS = 12
+WINDOW = 5.0
+
+
+class InlineStore(HistoryStore):
+    """Writes and commits each game on the event loop, as a naive store would."""
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path)
+            self._conn.executescript(SCHEMA)
+        return self._conn
+
+    def record(self, game: GameRecord):
+        self._write([game])
+
+    async def close(self):
+        self._conn.close()
+
+
+async def make_records(count: int) -> List[GameRecord]:
+    records = []
+    for seed in range(count):
+        session = await simulate(PLAYERS, seed=seed, max_days=3)
+        records.append(GameRecord.from_session(session))
+    return records
+
+
+async def lag_monitor(stop: asyncio.Event, lag: list):
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        start = loop.time()
+        await asyncio.sleep(0.005)
+        lag[0] = max(lag[0], loop.time() - start - 0.005)
+
+
+async def producer(store: HistoryStore, records: List[GameRecord], deadline: float):
+    loop = asyncio.get_running_loop()
+    while loop.time() < deadline:
+        await asyncio.sleep(random.expovariate(1 / INTERVAL))
+        store.record(random.choice(records))
+
+
+async def measure(store: HistoryStore, records: List[GameRecord]):
+    loop = asyncio.get_running_loop()
+    stop, lag = asyncio.Event(), [0.0]
+    monitor = asyncio.create_task(lag_monitor(stop, lag))
+    start = time.perf_counter()
+    deadline = loop.time() + WINDOW
+    await asyncio.gather(*(producer(store, records, deadline) for _ in range(GAMES)))
+    await store.flush()
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await monitor
+    await store.close()
+    return store.stats, elapsed, lag[0]
+
+
+def main():
+    records = asyncio.run(make_records(50))
+    print(f'{GAMES} concurrent games ending every {INTERVAL * 1000:.0f} ms, {PLAYERS} players, {WINDOW:.0f}s window')
+    print(f'{"store":<10}{"games/s":>10}{"rows/s":>10}{"batches":>9}{"max batch":>11}{"loop lag ms":>13}')
+    for name, cls in (('inline', InlineStore), ('batched', HistoryStore)):
+        with tempfile.TemporaryDirectory() as path:
+            stats, elapsed, lag = asyncio.run(measure(cls(os.path.join(path, 'history.db')), records))
+        print(
+            f'{name:<10}{stats.games / elapsed:>10.0f}{stats.rows / elapsed:>10.0f}{stats.batches:>9}'
+            f'{stats.max_batch:>11}{lag * 1000:>13.1f}'
+        )
+
+
+if __name__ == '__main__':
+    main()
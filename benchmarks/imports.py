@@ -0,0 +1,89 @@
+"""What importing the engine costs a fresh worker process.
+
+``cogs.werewolf`` is imported ``RUNS`` times, every time in a new interpreter
+started with ``-X importtime``. The medians reported are the whole package's import
+time, the time spent in the modules that hold role text themselves (their own
+code, without what they import), and how much the peak resident set size grew.
+One more run under :mod:`tracemalloc` counts the memory still held by objects
+those modules allocated. ``+ role text`` then reads every role's text once, the
+way a long-running game eventually does.
+
+Run with ``python -m benchmarks.imports``.
+"""
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+RUNS = 15
+
+MODULES = ('cogs.werewolf.roles', 'cogs.werewolf.narrative', 'cogs.werewolf.catalog')
+
+CHILD = '''
+import resource
+before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+import cogs.werewolf
+{then}
+print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before)
+'''
+
+HEAP = '''
+import tracemalloc
+tracemalloc.start()
+import cogs.werewolf
+{then}
+snapshot = tracemalloc.take_snapshot()
+print(sum(n.size for n in snapshot.statistics('filename') if n.traceback[0].filename.endswith({files})))
+'''
+
+READ_ALL = '''
+from cogs.werewolf.roles import ROLES
+for role in ROLES.all_role.values():
+    role.desc, role.about, role.eaten, role.killed, role.frozen
+'''
+
+
+def import_times(stderr: str) -> Dict[str, Tuple[int, int]]:
+    """``-X importtime`` lines as module -> (self us, cumulative us)."""
+    result = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        result[name.strip()] = (int(own), int(cumulative))
+    return result
+
+
+def heap(then: str) -> int:
+    files = tuple('/'.join(n.split('.')[1:]) + '.py' for n in MODULES)
+    out = subprocess.run(
+        [sys.executable, '-c', HEAP.format(then=then, files=files)], capture_output=True, text=True, check=True,
+    )
+    return int(out.stdout)
+
+
+def measure(then: str) -> Tuple[float, float, float]:
+    package: List[int] = []
+    text: List[int] = []
+    rss: List[int] = []
+    for _ in range(RUNS):
+        out = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', CHILD.format(then=then)],
+            capture_output=True, text=True, check=True,
+        )
+        times = import_times(out.stderr)
+        package.append(times['cogs.werewolf'][1])
+        text.append(sum(times[n][0] for n in MODULES if n in times))
+        rss.append(int(out.stdout))
+    return statistics.median(package), statistics.median(text), statistics.median(rss)
+
+
+def main():
+    print(f'{"":<14}{"package ms":>11}{"role text ms":>14}{"rss KiB":>10}{"heap KiB":>10}')
+    for name, then in (('import', ''), ('+ role text', READ_ALL)):
+        package, text, rss = measure(then)
+        print(f'{name:<14}{package / 1000:>11.2f}{text / 1000:>14.2f}{rss:>10.0f}{heap(then) / 1024:>10.1f}')
+
+
+if __name__ == '__main__':
+    main()
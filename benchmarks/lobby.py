@@ -0,0 +1,102 @@
+"""Event-loop wakeups with 1,000 idle lobbies: one-second polling against :class:`Scheduler`.
+
+Run with ``python -m benchmarks.lobby``.
+"""
+import asyncio
+import random
+
+from cogs.werewolf.scheduler import Scheduler
+
+LOBBIES = 1000
+JOIN_TIME = 120
+WINDOW = 5.0
+
+
+class CountingSelector:
+    """Wraps the loop's selector and counts how often the loop wakes up."""
+
+    def __init__(self, selector):
+        self.selector = selector
+        self.wakeups = 0
+
+    def select(self, timeout=None):
+        events = self.selector.select(timeout)
+        self.wakeups += 1
+        return events
+
+    def __getattr__(self, item):
+        return getattr(self.selector, item)
+
+
+async def polling_lobby(ticks: list):
+    await asyncio.sleep(random.random())
+    join_time = JOIN_TIME
+    force_start = False
+    while not force_start and join_time:
+        join_time -= 1
+        ticks[0] += 1
+        await asyncio.sleep(1)
+
+
+async def measure(setup) -> float:
+    loop = asyncio.get_running_loop()
+    selector = loop._selector = CountingSelector(loop._selector)  # noqa
+    extra = await setup()
+    selector.wakeups = 0
+    await asyncio.sleep(WINDOW)
+    return selector.wakeups / WINDOW, extra
+
+
+async def polling():
+    ticks = [0]
+    tasks = [asyncio.create_task(polling_lobby(ticks)) for _ in range(LOBBIES)]
+    await asyncio.sleep(1)
+    ticks[0] = 0
+
+    def report():
+        for task in tasks:
+            task.cancel()
+        return ticks[0] / WINDOW
+
+    return report
+
+
+async def scheduled():
+    scheduler = Scheduler()
+    fired = [0]
+
+    def remind(_):
+        fired[0] += 1
+
+    loop = asyncio.get_running_loop()
+    for _ in range(LOBBIES):
+        deadline = loop.time() + JOIN_TIME + random.random()
+        for mark in (60, 30, 10):
+            scheduler.call_at(deadline - mark, remind, mark)
+        scheduler.call_at(deadline, remind, 0)
+    await asyncio.sleep(1)
+
+    def report():
+        scheduler.close()
+        return fired[0] / WINDOW
+
+    return report
+
+
+def run(setup):
+    async def main():
+        wakeups, report = await measure(setup)
+        return wakeups, report()
+
+    return asyncio.run(main())
+
+
+def main():
+    print(f'{LOBBIES} idle lobbies, {JOIN_TIME}s join time, {WINDOW:.0f}s window')
+    for name, setup in (('sleep(1) polling', polling), ('scheduler', scheduled)):
+        wakeups, callbacks = run(setup)
+        print(f'{name:<18}{wakeups:>10.1f} loop wakeups/s{callbacks:>10.1f} lobby ticks/s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+"""Rendering the end-of-game survivor table: ``+=`` f-strings against precompiled templates.
+
+Run with ``python -m benchmarks.narrative``.
+"""
+import datetime
+import timeit
+
+from cogs.werewolf import narrative
+from cogs.werewolf.session import Session
+from cogs.werewolf.simulation import BotMember, LocalTransport
+
+NUMBER = 2000
+
+
+def concatenated(players, alive, played) -> str:
+    msg = f"幸存者们: {alive}/{len(players)}\n"
+    for p in players:
+        msg += f"{p.member.mention}: {'❌ 死亡' if p.dead else '✅ 存活'}{'(🏳️ 已逃跑)' if p.flee else ''}"
+        msg += f"{'❤️' if p.in_love else ''} {'胜利' if p.win else '失败'}\n"
+    msg += f"游戏进行了：{played}"
+    return msg
+
+
+def main():
+    played = datetime.timedelta(minutes=12, seconds=34)
+    print(f'{"players":>8}{"+= (us)":>12}{"template (us)":>16}')
+    for count in (10, 50, 200):
+        transport = LocalTransport()
+        session = Session(None, False, None, transport=transport)
+        for n in range(count):
+            session.join(BotMember(n))
+        players = list(session.players.values())
+        for p in players[::2]:
+            p.dead = True
+        alive = len(session.alive_players)
+        assert concatenated(players, alive, played) == narrative.survivors_message(players, alive, played)
+        old = timeit.timeit(lambda: concatenated(players, alive, played), number=NUMBER) / NUMBER
+        new = timeit.timeit(lambda: narrative.survivors_message(players, alive, played), number=NUMBER) / NUMBER
+        print(f'{count:>8}{old * 1e6:>12.1f}{new * 1e6:>16.1f}')
+        transport.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""Cost of resolving one night against the number of players.
+
+Each lobby is a chaos game whose bots all answered their night menus at random.
+The resolver's work per player should stay flat as lobbies grow; a step that
+scanned the players for every action would show up here as a per-player cost
+rising with the lobby size.
+
+Run with ``python -m benchmarks.night``.
+"""
+import asyncio
+import random
+import statistics
+import time
+from typing import List, Tuple
+
+from cogs.werewolf.night import NightResolver
+from cogs.werewolf.session import Player, Session
+
+from benchmarks.fakes import make_session
+
+ROUNDS = 200
+
+
+class AnsweredNight:
+    """A session right after every bot answered, which :meth:`restore` puts back after each resolve."""
+
+    def __init__(self, player_count: int, seed: int = 0):
+        rng = random.Random(seed)
+        random.seed(seed)
+        self.session: Session = make_session(player_count, chaos=True, strategy=lambda q, r: None, running=True)
+        self.session.assign_role()
+        self.rng = rng
+        self.saved: List[Tuple[Player, object, int]] = []
+
+    async def answer(self):
+        questions = await self.session.send_night_action()
+        for q in questions:
+            q.resolve(self.rng.randrange(len(q.options)))
+        self.saved = [(p, p.role, p.flags) for p in self.session.players.values()]
+        return len(questions)
+
+    def restore(self) -> Session:
+        for p, role, flags in self.saved:
+            p.role = role
+            p.flags = flags
+        return self.session
+
+
+async def measure(player_count: int) -> Tuple[int, float, float]:
+    night = AnsweredNight(player_count)
+    answered = await night.answer()
+    timings = []
+    for _ in range(ROUNDS):
+        session = night.restore()
+        start = time.perf_counter()
+        NightResolver(session).resolve()
+        timings.append(time.perf_counter() - start)
+    night.session.transport.close()
+    median = statistics.median(timings)
+    return answered, median, median / player_count
+
+
+async def main():
+    print(f'{"players":>8}{"answered":>10}{"night us":>10}{"us/player":>11}')
+    for player_count in (10, 25, 50, 100, 200):
+        answered, median, per_player = await measure(player_count)
+        print(f'{player_count:>8}{answered:>10}{median * 1e6:>10.1f}{per_player * 1e6:>11.2f}')
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
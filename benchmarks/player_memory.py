@@ -0,0 +1,72 @@
+"""Memory per :class:`Player`, the old ``__dict__`` layout against the slotted one.
+
+Run with ``python -m benchmarks.player_memory``.
+"""
+import gc
+import tracemalloc
+from types import SimpleNamespace
+
+from qq.utils import MISSING
+
+from cogs.werewolf.session import Player
+
+COUNT = 10000
+
+
+class LegacyPlayer:
+    """The attribute layout ``Player`` had before it used ``__slots__``."""
+
+    def __init__(self, player, session):
+        self.member = player
+        self._role = MISSING
+        self.cult_leader = False
+        self._dead = False
+        self.died_last_night = False
+        self.win = False
+        self.bitten = False
+        self.role_model = MISSING
+        self.in_love = MISSING
+        self.session = session
+        self.changed_role_count = 0
+        self.time_died = 0
+        self.bullet = 2
+        self.current_questions = None
+        self.choice = 0
+        self.drunk = False
+        self.kill_by_role = MISSING
+        self.kill_method = MISSING
+        self.final_shot_delay = MISSING
+        self.converted_to_cult = False
+        self.flee = False
+        self.used_ability = False
+        self.doused = False
+        # added on the fly by night_loop
+        self.choice2 = 0
+        self.current_question = MISSING
+        self.votes = 0
+        self.being_visited_same_night_count = 0
+
+
+def measure(cls, members, session) -> float:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    players = [cls(m, session) for m in members]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del players
+    return (after - before) / len(members)
+
+
+def main():
+    members = [SimpleNamespace(id=n) for n in range(COUNT)]
+    session = SimpleNamespace()
+    legacy = measure(LegacyPlayer, members, session)
+    slotted = measure(Player, members, session)
+    print(f'{COUNT} players')
+    print(f'{"__dict__":<10}{legacy:>8.0f} bytes/player')
+    print(f'{"__slots__":<10}{slotted:>8.0f} bytes/player  ({(1 - slotted / legacy) * 100:.0f}% less)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""Micro-benchmark for the role category index.
+
+Run with ``python -m benchmarks.roles``.
+"""
+import timeit
+
+from cogs.werewolf.enum import WinType
+from cogs.werewolf.roles import ROLES, Role, _RoleSentinel
+
+EVIL = [WinType.Wolf, WinType.Cult, WinType.SerialKiller, WinType.Arsonist, WinType.Sorcerer]
+
+
+def scan_evil_list():
+    return [n for m, n in _RoleSentinel.__dict__.items() if isinstance(n, Role) and n.party in EVIL]
+
+
+def scan_wolf():
+    return {m: n for m, n in _RoleSentinel.__dict__.items() if isinstance(n, Role) and n.party in [
+        WinType.Wolf, WinType.Sorcerer
+    ]}
+
+
+CASES = {
+    'evil_list': (
+        lambda: scan_evil_list(),
+        lambda: ROLES.evil_list,
+    ),
+    'wolf.values': (
+        lambda: scan_wolf().values(),
+        lambda: ROLES.wolf.values(),
+    ),
+    'role in evil_list': (
+        lambda: ROLES.Seer in scan_evil_list(),
+        lambda: ROLES.is_evil(ROLES.Seer),
+    ),
+    'role in wolf.values()': (
+        lambda: ROLES.Lycan in scan_wolf().values(),
+        lambda: ROLES.is_wolf(ROLES.Lycan),
+    ),
+}
+
+
+def main(number: int = 20000):
+    print(f'{"case":<24}{"scan (us)":>12}{"index (us)":>12}{"speedup":>10}')
+    for name, (before, after) in CASES.items():
+        b = timeit.timeit(before, number=number) / number * 1e6
+        a = timeit.timeit(after, number=number) / number * 1e6
+        print(f'{name:<24}{b:>12.3f}{a:>12.3f}{b / a:>9.1f}x')
+
+
+if __name__ == '__main__':
+    main()
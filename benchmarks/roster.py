@@ -0,0 +1,58 @@
+"""Reading the player lists of a busy 50 player lobby: re-joined on every read against :class:`Roster`.
+
+Each round one player leaves or joins and the list is then read ``READS`` times, as
+the status commands of the chat front-ends do.
+
+Run with ``python -m benchmarks.roster``.
+"""
+import random
+import time
+
+from cogs.werewolf.session import Session
+from cogs.werewolf.simulation import BotMember, LocalTransport
+
+PLAYERS = 50
+ROUNDS = 20000
+READS = 5
+
+
+def rejoined(session: Session) -> str:
+    players = "\n".join([m.member.mention for n, m in session.players.items()])
+    return f'玩家: {session.player_count}\n{players}'
+
+
+def churn(read) -> float:
+    rng = random.Random(0)
+    transport = LocalTransport()
+    session = Session(None, False, None, transport=transport)
+    members = [BotMember(n) for n in range(PLAYERS * 2)]
+    for member in members[:PLAYERS]:
+        session.join(member)
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        member = rng.choice(members)
+        if member.id in session.players:
+            session.leave(member)
+        else:
+            session.join(member)
+        for _ in range(READS):
+            read(session)
+    elapsed = time.perf_counter() - start
+    transport.close()
+    return elapsed
+
+
+def main():
+    session = Session(None, False, None, transport=LocalTransport())
+    for n in range(PLAYERS):
+        session.join(BotMember(n))
+    assert session.player_list_string == rejoined(session)
+
+    print(f'{PLAYERS} player lobby, {ROUNDS} joins/leaves, {READS} reads each')
+    for name, read in (('re-joined', rejoined), ('roster', lambda s: s.player_list_string)):
+        elapsed = churn(read)
+        print(f'{name:<12}{elapsed * 1000:>10.1f} ms{ROUNDS * READS / elapsed:>14.0f} reads/s')
+
+
+if __name__ == '__main__':
+    main()
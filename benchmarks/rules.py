@@ -0,0 +1,59 @@
+"""Times the table of :mod:`cogs.werewolf.rules` as the session calls it.
+
+Each case is decided twice: once with the table counting roles and parties
+itself, once with the counts :class:`~cogs.werewolf.index.RoleIndex` keeps up
+to date for the session. ``tests/test_rules.py`` checks the table against the
+if-chain it replaced.
+
+Run with ``python -m benchmarks.rules``.
+"""
+import timeit
+from collections import Counter
+
+from cogs.werewolf import rules
+from cogs.werewolf.enum import PlayerFlag
+from cogs.werewolf.roles import ROLES
+
+NUMBER = 20000
+
+ROSTER = (
+    ROLES.Villager, ROLES.Seer, ROLES.Wolf, ROLES.Lycan, ROLES.SnowWolf, ROLES.Traitor, ROLES.Hunter,
+)
+
+
+class Survivor:
+    def __init__(self, role, in_love=False, bitten=False, bullet=2):
+        self.role = role
+        self.in_love = in_love
+        self.flags = int(PlayerFlag.Bitten) if bitten else 0
+        self.bullet = bullet
+
+    @property
+    def bitten(self):
+        return not not self.flags & int(PlayerFlag.Bitten)
+
+
+def decide(survivor, check_bitten, roles=None, parties=None):
+    composition = rules.Composition(survivor, check_bitten, roles, parties)
+    rule = rules.evaluate(composition)
+    if rule is None:
+        return None, None
+    return rule.action, rule.outcome(composition)
+
+
+def main():
+    for label, survivor in (
+            ('2 alive', [Survivor(ROLES.Hunter), Survivor(ROLES.Wolf)]),
+            ('12 alive', [Survivor(r) for r in ROSTER + (ROLES.Villager,) * 5]),
+            ('30 alive', [Survivor(r) for r in ROSTER + (ROLES.Villager,) * 23]),
+    ):
+        # What RoleIndex keeps up to date for the session.
+        roles = Counter(n.role for n in survivor)
+        parties = Counter(n.role.party for n in survivor)
+        counted = timeit.timeit(lambda: decide(survivor, True), number=NUMBER) / NUMBER
+        kept = timeit.timeit(lambda: decide(survivor, True, roles, parties), number=NUMBER) / NUMBER
+        print(f'{label:<10}table, counting {counted * 1e6:6.1f} us   table, kept counts {kept * 1e6:6.1f} us')
+
+
+if __name__ == '__main__':
+    main()
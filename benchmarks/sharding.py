@@ -0,0 +1,77 @@
+"""Throughput of headless games spread over worker processes by guild id.
+
+Every worker keeps ``IN_FLIGHT`` simulated games going; each game's channel posts are
+relayed back to this process like a real game's. Run with
+``python -m benchmarks.sharding [max workers]``; it defaults to the number of cores.
+"""
+import asyncio
+import itertools
+import os
+import sys
+import time
+
+from cogs.werewolf.sharding import ShardPool
+
+PLAYERS = 12
+IN_FLIGHT = 20
+WINDOW = 5.0
+
+
+async def measure(workers: int):
+    loop = asyncio.get_running_loop()
+    posts = [0]
+    ended = [0]
+    guild_ids = itertools.count(1)
+    deadline = [0.0]
+    done = asyncio.Event()
+
+    def on_post(_, __):
+        posts[0] += 1
+
+    def on_ended(*_):
+        ended[0] += 1
+        if loop.time() < deadline[0]:
+            launch()
+        elif not pool.guilds:
+            done.set()
+
+    def launch():
+        guild_id = next(guild_ids)
+        pool.simulate(guild_id, PLAYERS, guild_id)
+
+    pool = ShardPool(workers, on_post=on_post, on_dm=lambda *_: None, on_ended=on_ended)
+    pool.start()
+    # Let every worker import the cog before the clock starts.
+    for n in range(workers):
+        pool.simulate(-1 - n, 5, 0)
+    while pool.guilds:
+        await asyncio.sleep(0.05)
+    ended[0] = posts[0] = 0
+    done.clear()
+
+    start = time.perf_counter()
+    deadline[0] = loop.time() + WINDOW
+    for _ in range(workers * IN_FLIGHT):
+        launch()
+    await done.wait()
+    elapsed = time.perf_counter() - start
+    await pool.close()
+    return ended[0] / elapsed, posts[0] / elapsed
+
+
+def main():
+    cores = os.cpu_count() or 1
+    limit = int(sys.argv[1]) if len(sys.argv) > 1 else cores
+    print(f'{cores} cores, {PLAYERS} player games, {IN_FLIGHT} in flight per worker, {WINDOW:.0f}s window')
+    print(f'{"workers":>7}{"games/s":>10}{"posts/s":>10}{"speedup":>9}')
+    base = None
+    workers = 1
+    while workers <= limit:
+        games, posts = asyncio.run(measure(workers))
+        base = base or games
+        print(f'{workers:>7}{games:>10.1f}{posts:>10.0f}{games / base:>9.2f}')
+        workers *= 2
+
+
+if __name__ == '__main__':
+    main()
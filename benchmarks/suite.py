@@ -0,0 +1,373 @@
+"""Timings of the engine's hot paths, saved as JSON and compared between commits.
+
+Every case gets a fresh, untimed ``prepare()`` before each timed call, so calls
+that change the session (killing players, ending the game) measure the same work
+every time; the garbage collector only runs between calls. A case runs for
+``ROUNDS`` rounds of at least ``ROUND_TIME`` seconds, and the median and the
+fastest round are reported per call.
+
+Run with ``python -m benchmarks.suite``. ``--save results.json`` keeps the
+results, ``--compare baseline.json`` flags every case whose fastest round got slower
+than ``--threshold`` (a ratio, 1.5 by default) and exits with status 1 if any did.
+The fastest round is compared because it is the least disturbed by the rest of the
+machine; medians are kept to show how noisy a run was.
+``--filter`` runs only the cases whose name contains it.
+"""
+import argparse
+import asyncio
+import datetime
+import gc
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from cogs.werewolf.cascade import Death
+from cogs.werewolf.enum import KillMethod, WinType
+from cogs.werewolf.night import NightResolver
+from cogs.werewolf.roles import ROLES, Role
+from cogs.werewolf.session import Session
+
+from benchmarks.fakes import kill, make_session, pair, players
+from benchmarks.night import AnsweredNight
+
+ROUNDS = 7
+ROUND_TIME = 0.02
+PLAYER_COUNTS = (5, 12, 20, 35)
+
+
+@dataclass
+class Case:
+    """``run(prepare())`` is timed; ``after`` gets its result, untimed, to clean up."""
+    name: str
+    prepare: Callable[[], Any]
+    run: Callable[[Any], Any]
+    after: Optional[Callable[[Any], Any]] = None
+    is_async: bool = False
+
+
+def cases() -> List[Case]:
+    result: List[Case] = []
+    for count in PLAYER_COUNTS:
+        for chaos in (False, True):
+            suffix = f'[{count}, chaos]' if chaos else f'[{count}]'
+            session = make_session(count, chaos)
+            result += [
+                Case(f'get_role_list{suffix}', lambda s=session: s, Session.get_role_list),
+                Case(f'balance{suffix}', lambda s=session: s, Session.balance),
+                Case(f'assign_role{suffix}', lambda s=session: s, Session.assign_role),
+            ]
+    result += check_game_end_cases()
+    result += kill_player_cases()
+    result += send_night_action_cases()
+    result += resolve_night_cases()
+    result += lynch_vote_cases()
+    result += end_cases()
+    return result
+
+
+def _running(count: int, roles: Sequence[Role], **kwargs) -> Session:
+    roles = list(roles) + [ROLES.Villager] * (count - len(roles))
+    return make_session(count, roles=roles, running=True, **kwargs)
+
+
+def check_game_end_cases() -> List[Case]:
+    def composition(count: int, roles: Sequence[Role], dead: int = 0, lovers: bool = False) -> Callable[[], Session]:
+        session = _running(count, roles)
+        everyone = players(session)
+        kill(session, everyone[len(everyone) - dead:])
+        if lovers:
+            pair(everyone[0], everyone[1])
+
+        def prepare():
+            # Whatever ended the game last time must be able to end it again.
+            session.is_running = True
+            session.transport.log.clear()
+            return session
+
+        return prepare
+
+    compositions = {
+        'goes on, 12 alive': composition(12, [ROLES.Wolf, ROLES.Seer]),
+        'goes on, 35 alive': composition(35, [ROLES.Wolf, ROLES.AlphaWolf, ROLES.Seer, ROLES.Cultist]),
+        'killer loose, 20 alive': composition(20, [ROLES.SerialKiller, ROLES.Wolf]),
+        'wolf parity': composition(12, [ROLES.Wolf] * 3, dead=6),
+        'village cleared': composition(12, [ROLES.Seer, ROLES.Hunter]),
+        'lovers': composition(12, [ROLES.Wolf, ROLES.Villager], dead=10, lovers=True),
+        'hunter duel': composition(12, [ROLES.Hunter, ROLES.Wolf], dead=10),
+    }
+    return [
+        Case(f'check_game_end[{name}]', prepare, Session.check_game_end, is_async=True)
+        for name, prepare in compositions.items()
+    ]
+
+
+def kill_player_cases() -> List[Case]:
+    # Hunters always shoot the first target they are offered.
+    def shoot_first(question, rng):
+        return 0 if question.options else -1
+
+    def cascade(roles: Sequence[Role], victim: int, lover: Optional[int], is_night: bool) -> Callable[[], Tuple]:
+        def prepare():
+            session = _running(12, roles, strategy=shoot_first)
+            everyone = players(session)
+            if lover is not None:
+                pair(everyone[victim], everyone[lover])
+            return session, everyone[victim], is_night
+
+        return prepare
+
+    async def run(args):
+        session, victim, is_night = args
+        await session.kill_player(victim, KillMethod.Eat, is_night=is_night)
+        return session
+
+    def after(session: Session):
+        session.transport.close()
+
+    cascades = {
+        'villager': cascade([], 0, None, True),
+        'lovers, night': cascade([], 0, 1, True),
+        'lovers, day': cascade([], 0, 1, False),
+        'hunter, night': cascade([ROLES.Hunter], 0, None, True),
+        'hunter, day': cascade([ROLES.Hunter], 0, None, False),
+        'lover of a hunter, day': cascade([ROLES.Villager, ROLES.Hunter], 0, 1, False),
+    }
+    # A night's deaths buried in one batch: hunters who shoot at dawn and lovers who follow.
+    def batch(count: int, dying: int) -> Callable[[], Tuple]:
+        def prepare():
+            session = _running(count, [ROLES.Hunter, ROLES.Villager] * (dying // 2), strategy=shoot_first)
+            everyone = players(session)
+            for n in range(0, dying, 4):
+                pair(everyone[n + 1], everyone[dying + n])
+            return session, [Death(p, KillMethod.Eat) for p in everyone[:dying]]
+
+        return prepare
+
+    async def run_batch(args):
+        session, deaths = args
+        await session.kill_players(deaths)
+        return session
+
+    result = [
+        Case(f'kill_player[{name}]', prepare, run, after, is_async=True)
+        for name, prepare in cascades.items()
+    ]
+    result.append(Case('kill_players[batch of 8, 35 players]', batch(35, 8), run_batch, after, is_async=True))
+    return result
+
+
+def send_night_action_cases() -> List[Case]:
+    result = []
+    for count in (12, 35):
+        random.seed(count)
+        # Bots never answer; the questions are expired after each call.
+        session = make_session(count, strategy=lambda question, rng: None, running=True)
+        session.assign_role()
+
+        def expire(questions, transport=session.transport):
+            for q in questions:
+                transport.expire(q)
+
+        result.append(Case(
+            f'send_night_action[{count}]', lambda s=session: s, Session.send_night_action, expire, is_async=True,
+        ))
+    return result
+
+
+def resolve_night_cases() -> List[Case]:
+    result = []
+    for count in (12, 50):
+        night = AnsweredNight(count)
+        asyncio.run(night.answer())
+        result.append(Case(f'resolve_night[{count}, chaos]', night.restore, lambda s: NightResolver(s).resolve()))
+    return result
+
+
+def lynch_vote_cases() -> List[Case]:
+    # Every bot votes for the first player it is offered, so the vote closes as soon as that is a majority.
+    def first(question, rng):
+        return 0
+
+    def vote(count: int) -> Callable[[], Session]:
+        return lambda: _running(count, [ROLES.Wolf, ROLES.Mayor], strategy=first)
+
+    return [
+        Case(f'lynch_vote[{count}]', vote(count), Session.lynch_vote, is_async=True)
+        for count in (12, 50)
+    ]
+
+
+def end_cases() -> List[Case]:
+    def ending(count: int, roles: Sequence[Role], winner: WinType) -> Callable[[], Tuple]:
+        session = _running(count, roles)
+        everyone = players(session)
+        kill(session, everyone[::2])
+
+        def prepare():
+            session.is_running = True
+            session.transport.log.clear()
+            return session, winner
+
+        return prepare
+
+    async def run(args):
+        session, winner = args
+        return await session.end(winner)
+
+    endings = {
+        'village, 12': ending(12, [ROLES.Wolf, ROLES.Seer], WinType.Villager),
+        'village, 50': ending(50, [ROLES.Wolf, ROLES.Seer], WinType.Villager),
+        'wolves, 35': ending(35, [ROLES.Wolf] * 8, WinType.Wolf),
+        'no one, 12': ending(12, [ROLES.Sorcerer, ROLES.Thief], WinType.NoOne),
+    }
+    return [Case(f'end[{name}]', prepare, run, is_async=True) for name, prepare in endings.items()]
+
+
+def _calibrate(step: Callable[[], float]) -> int:
+    """How many calls make a round of at least ``ROUND_TIME``."""
+    number, spent = 1, step()
+    while spent < ROUND_TIME:
+        number *= 2
+        spent = sum(step() for _ in range(number))
+    return number
+
+
+def measure(case: Case) -> Dict[str, Any]:
+    def call() -> float:
+        arg = case.prepare()
+        gc.disable()
+        start = time.perf_counter()
+        result = case.run(arg)
+        elapsed = time.perf_counter() - start
+        gc.enable()
+        if case.after is not None:
+            case.after(result)
+        return elapsed
+
+    number = _calibrate(call)
+    rounds = [sum(call() for _ in range(number)) / number for _ in range(ROUNDS)]
+    return _summary(rounds, number)
+
+
+async def measure_async(case: Case) -> Dict[str, Any]:
+    async def call() -> float:
+        arg = case.prepare()
+        gc.disable()
+        start = time.perf_counter()
+        result = await case.run(arg)
+        elapsed = time.perf_counter() - start
+        gc.enable()
+        if case.after is not None:
+            case.after(result)
+        return elapsed
+
+    number, spent = 1, await call()
+    while spent < ROUND_TIME:
+        number *= 2
+        spent = 0.0
+        for _ in range(number):
+            spent += await call()
+    rounds = []
+    for _ in range(ROUNDS):
+        spent = 0.0
+        for _ in range(number):
+            spent += await call()
+        rounds.append(spent / number)
+    return _summary(rounds, number)
+
+
+def _summary(rounds: List[float], number: int) -> Dict[str, Any]:
+    return {
+        'median_us': round(statistics.median(rounds) * 1e6, 3),
+        'min_us': round(min(rounds) * 1e6, 3),
+        'calls': number,
+        'rounds': len(rounds),
+    }
+
+
+def _commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=Path(__file__).resolve().parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(selected: Sequence[Case]) -> Dict[str, Any]:
+    results: Dict[str, Dict[str, Any]] = {}
+
+    async def run_async():
+        for case in selected:
+            if case.is_async:
+                results[case.name] = await measure_async(case)
+                _report(case.name, results[case.name])
+
+    for case in selected:
+        if not case.is_async:
+            random.seed(0)
+            results[case.name] = measure(case)
+            _report(case.name, results[case.name])
+    random.seed(0)
+    asyncio.run(run_async())
+    return {
+        'commit': _commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'cases': results,
+    }
+
+
+def _report(name: str, result: Dict[str, Any]):
+    print(f'{name:<44}{result["median_us"]:>12.1f}{result["min_us"]:>12.1f}', flush=True)
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Print ``current`` against ``baseline`` and return the names of the cases slower by more than ``threshold``."""
+    print(f'\n{"case":<44}{"base min":>12}{"now min":>12}{"ratio":>8}   ({baseline.get("commit")} -> {current.get("commit")})')
+    slower = []
+    for name, result in current['cases'].items():
+        base = baseline['cases'].get(name)
+        if base is None:
+            print(f'{name:<44}{"-":>12}{result["min_us"]:>12.1f}{"new":>8}')
+            continue
+        ratio = result['min_us'] / base['min_us'] if base['min_us'] else float('inf')
+        flag = ''
+        if ratio > threshold:
+            slower.append(name)
+            flag = '  SLOWER'
+        print(f'{name:<44}{base["min_us"]:>12.1f}{result["min_us"]:>12.1f}{ratio:>8.2f}{flag}')
+    return slower
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--save', type=Path, help='write the results to this JSON file')
+    parser.add_argument('--compare', type=Path, help='JSON file of an earlier run to compare with')
+    parser.add_argument('--threshold', type=float, default=1.5, help='ratio of the fastest rounds above which a case is slower')
+    parser.add_argument('--filter', default='', help='only run cases whose name contains this')
+    args = parser.parse_args()
+
+    selected = [n for n in cases() if args.filter in n.name]
+    print(f'{"case":<44}{"median us":>12}{"min us":>12}')
+    current = run_suite(selected)
+    if args.save:
+        args.save.write_text(json.dumps(current, indent=2, ensure_ascii=False) + '\n', encoding='utf-8')
+    if args.compare:
+        slower = compare(current, json.loads(args.compare.read_text(encoding='utf-8')), args.threshold)
+        if slower:
+            print(f'\n{len(slower)} of {len(current["cases"])} cases slower than {args.threshold:.2f}x the baseline')
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""Checks :class:`LynchTally` against recounting every ballot, then times both.
+
+Random electorates (a few mayors with double votes, some abstentions) vote one
+ballot at a time. After each ballot the tally's leader, result and early close
+must match a full recount. The timing columns are the cost of one ballot: the
+heap's update against the recount a naive vote would do on every message.
+``closed at`` is how far into a lopsided vote the tally could stop waiting.
+
+Run with ``python -m benchmarks.vote``.
+"""
+import random
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from cogs.werewolf.vote import LynchTally
+
+CHECKS = 300
+
+
+class Voter:
+    __slots__ = ('id',)
+
+    def __init__(self, voter_id: int):
+        self.id = voter_id
+
+
+def electorate(rng: random.Random, size: int) -> Dict[Voter, int]:
+    return {Voter(n): 2 if rng.random() < 0.05 else 1 for n in range(size)}
+
+
+def ballots(rng: random.Random, weights, favourite: float = 0.0) -> List[Tuple[object, Optional[object]]]:
+    voters = list(weights)
+    rng.shuffle(voters)
+    candidates = voters[:max(2, len(voters) // 4)]
+    result = []
+    for voter in voters:
+        roll = rng.random()
+        if roll < 0.1:
+            result.append((voter, None))
+        elif roll < 0.1 + favourite:
+            result.append((voter, candidates[0]))
+        else:
+            result.append((voter, rng.choice(candidates)))
+    return result
+
+
+def recount(weights, cast) -> Tuple[Counter, int]:
+    counts = Counter()
+    for voter, target in cast:
+        if target is not None:
+            counts[target] += weights[voter]
+    return counts, sum(weights[v] for v, _ in cast)
+
+
+def verify() -> int:
+    rng = random.Random(0)
+    checked = 0
+    for _ in range(CHECKS):
+        weights = electorate(rng, rng.randint(2, 60))
+        tally = LynchTally(dict(weights))
+        cast = []
+        for voter, target in ballots(rng, weights, rng.random()):
+            tally.cast(voter, target)
+            cast.append((voter, target))
+            counts, used = recount(weights, cast)
+            ranked = counts.most_common(2)
+            best = ranked[0][1] if ranked else 0
+            second = ranked[1][1] if len(ranked) > 1 else 0
+            leader = tally.leader()
+            assert (leader[1] if leader else 0) == best
+            assert tally.runner_up() == second
+            assert tally.decided == (used == tally.total or best * 2 > tally.total)
+            assert tally.result() == (ranked[0][0] if ranked and best != second else None)
+            checked += 1
+    return checked
+
+
+def measure(size: int) -> Tuple[float, float, float]:
+    rng = random.Random(size)
+    weights = electorate(rng, size)
+    cast = ballots(rng, weights, favourite=0.6)
+
+    tally = LynchTally(dict(weights))
+    closed = None
+    start = time.perf_counter()
+    for n, (voter, target) in enumerate(cast, 1):
+        tally.cast(voter, target)
+        if closed is None and tally.decided:
+            closed = n
+    heap = (time.perf_counter() - start) / len(cast)
+
+    start = time.perf_counter()
+    for n in range(1, len(cast) + 1):
+        counts, _ = recount(weights, cast[:n])
+        counts.most_common(2)
+    naive = (time.perf_counter() - start) / len(cast)
+    return heap, naive, (closed or len(cast)) / len(cast)
+
+
+def main():
+    print(f'{verify()} ballots agree with a full recount')
+    print(f'{"voters":>7}{"tally us":>10}{"recount us":>12}{"closed at":>11}')
+    for size in (12, 50, 200, 1000):
+        heap, naive, closed = measure(size)
+        print(f'{size:>7}{heap * 1e6:>10.2f}{naive * 1e6:>12.1f}{closed:>10.0%}')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,35 +1,209 @@
 import asyncio
-from typing import Dict, List, Tuple, Any
+import logging
+import os
+from typing import Awaitable, Dict, List, Set, Tuple, Any, Optional
 import random
 
 import qq
 from qq.ext import commands
 
+from cogs.werewolf import metrics
+from cogs.werewolf.dispatch import DMDispatcher
 from cogs.werewolf.enum import QuestionType
+from cogs.werewolf.history import HistoryStore
+from cogs.werewolf.outbound import OutboundQueue
+from cogs.werewolf.profiling import PhaseProfiler
+from cogs.werewolf.question import Question, QuestionRouter, format_menu
+from cogs.werewolf.scheduler import Scheduler
 from cogs.werewolf.session import Session
+from cogs.werewolf.sharding import ShardPool
+from cogs.werewolf.snapshot import SnapshotStore
+
+log = logging.getLogger(__name__)
+
+PROFILES = os.environ.get('WEREWOLF_PROFILES', 'profiles')
 
 
 class Werewolf(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
         self.sessions: Dict[int, Session] = {}
-        self.active_questions: Dict[int, (QuestionType, List)] = {}
+        self.router: QuestionRouter = QuestionRouter()
+        self.active_questions: Dict[int, Question] = self.router.pending
+        self.outbound: OutboundQueue = OutboundQueue()
+        self.scheduler: Scheduler = Scheduler()
+        self.history: HistoryStore = HistoryStore(os.environ.get('WEREWOLF_DB', 'werewolf.db'))
+        self.snapshots: SnapshotStore = SnapshotStore(os.environ.get('WEREWOLF_SNAPSHOTS', 'snapshots'))
+        self.tasks: Dict[int, asyncio.Task] = {}
+        self.unloading: bool = False
+        self.shards: Optional[ShardPool] = None
+        self.channels: Dict[int, qq.abc.Messageable] = {}
+        self.members: Dict[int, qq.Member] = {}
+        self.dispatcher: DMDispatcher = DMDispatcher()
+        self.lag_monitor: Optional[metrics.LagMonitor] = None
+        self.metrics_tasks: List[asyncio.Task] = []
+
+    def cog_unload(self):
+        # Running games keep their snapshots and are picked up again by the next setup().
+        self.unloading = True
+        for task in self.tasks.values():
+            task.cancel()
+        self.scheduler.close()
+        asyncio.ensure_future(self.history.close())
+        if self.shards is not None:
+            asyncio.ensure_future(self.shards.close())
+        if self.lag_monitor is not None:
+            self.lag_monitor.close()
+        for task in self.metrics_tasks:
+            task.cancel()
+
+    async def start_metrics(self):
+        """Export :data:`metrics.REGISTRY` as configured by the ``WEREWOLF_METRICS_*`` variables."""
+        self.lag_monitor = metrics.LagMonitor(lambda: self.sessions.keys())
+        self.lag_monitor.start()
+        port = os.environ.get('WEREWOLF_METRICS_PORT')
+        if port:
+            server = await metrics.serve(int(port))
+            self.metrics_tasks.append(asyncio.create_task(server.serve_forever()))
+        path = os.environ.get('WEREWOLF_METRICS_FILE')
+        if path:
+            interval = float(os.environ.get('WEREWOLF_METRICS_INTERVAL', 15))
+            self.metrics_tasks.append(asyncio.create_task(metrics.dump(path, interval)))
+
+    def start_shards(self, workers: int):
+        """Run new games in ``workers`` worker processes instead of on this loop."""
+        self.shards = ShardPool(
+            workers, on_post=self._relay_post, on_dm=self._relay_dm, on_ended=self._relay_ended,
+            history=self.history.path, snapshots=str(self.snapshots.directory), profiles=PROFILES,
+        )
+        self.shards.start()
+
+    def _relay_post(self, channel_id: int, content: str):
+        channel = self.channels.get(channel_id)
+        if channel is not None:
+            self.outbound.post(channel, content)
+
+    def _relay_dm(self, member_id: int, content: str):
+        member = self.members.get(member_id)
+        if member is None:
+            guild = self.bot.get_guild(self.shards.members.get(member_id, 0))
+            member = guild.get_member(member_id) if guild is not None else None
+            if member is None:
+                log.warning('Dropped a DM to %s, who is in no game on this front', member_id)
+                return
+            self.members[member_id] = member
+        asyncio.create_task(self.dispatcher.send(member, content))
+
+    def _relay_ended(self, guild_id: int, channel_id: int, member_ids: Set[int]):
+        self.channels.pop(channel_id, None)
+        for member_id in member_ids:
+            self.members.pop(member_id, None)
+
+    async def run_session(self, session: Session, game: Awaitable):
+        guild_id = session.guild.id
+        self.tasks[guild_id] = asyncio.current_task()
+        try:
+            await game
+        finally:
+            self.tasks.pop(guild_id, None)
+            self.sessions.pop(guild_id, None)
+            if not self.unloading:
+                self.snapshots.remove(guild_id)
+            if session.profiler is not None:
+                session.profiler.finish()
+        await self.outbound.flush(session.channel)
+
+    async def resume_sessions(self):
+        await self.bot.wait_until_ready()
+        for state in self.snapshots.load_all():
+            guild = self.bot.get_guild(state.guild_id)
+            channel = self.bot.get_channel(state.channel_id)
+            if guild is None or channel is None or state.guild_id in self.sessions:
+                self.snapshots.remove(state.guild_id)
+                continue
+            if self.shards is not None:
+                members = [n for n in map(guild.get_member, (p.member_id for p in state.players)) if n is not None]
+                if self.shards.resume(guild.id, channel.id, members):
+                    self.channels[channel.id] = channel
+                    self.members.update((n.id, n) for n in members)
+                continue
+            session = Session(None, state.chaos, self, channel=channel, guild=guild)
+            self.snapshots.restore(state, session, guild.get_member)
+            self.sessions[guild.id] = session
+            asyncio.create_task(self.run_session(session, session.resume(state.join_time)))
+
+    def build_menu(
+            self, option_str: List[str], options: List[Any], member: qq.Member, msg: str, q_type: QuestionType
+    ) -> Optional[Question]:
+        if member.id in self.router:
+            return None
+        return self.router.ask(member, q_type, [n for n in options], format_menu(msg, option_str))
 
     async def send_menu(
             self, option_str: List[str], options: List[Any], member: qq.Member, msg: str, q_type: QuestionType
-    ):
-        if member.id in self.active_questions:
+    ) -> Optional[Question]:
+        question = self.build_menu(option_str, options, member, msg, q_type)
+        if question:
+            await member.send(question.prompt)
+        return question
+
+    def answer(self, member_id: int, choice: int) -> bool:
+        return self.router.answer(member_id, choice)
+
+    def expire(self, question: Question):
+        self.router.expire(question)
+
+    @commands.Cog.listener()
+    async def on_message(self, message: qq.Message):
+        # Menus are answered by DM; a number posted in the game channel is only chat.
+        if not message.direct:
             return
-        self.active_questions[member.id] = (q_type, [n for n in options])
-        msg += '\n请回复机器人其中一个序列号：'
-        for idx, name in enumerate([m for m in option_str]):
-            msg += f'\n{idx}. {name}'
-        await member.send(msg)
+        if message.author.id in self.router:
+            self.router.dispatch(message.author.id, message.content)
+        elif self.shards is not None and message.content.strip().lstrip('-').isdigit():
+            self.shards.answer(message.author.id, message.content)
 
     @commands.Command
     async def start(self, ctx: commands.Context):
         await self.start_game(ctx, False)
 
+    @commands.Command
+    async def join(self, ctx: commands.Context):
+        if self.shards is not None:
+            # The front keeps the member so the worker's DMs to them can be relayed.
+            if ctx.guild.id in self.shards:
+                self.members[ctx.author.id] = ctx.author
+                self.shards.join(ctx.guild.id, ctx.author)
+            return
+        session = self.sessions.get(ctx.guild.id)
+        if session is None or not session.is_joining or ctx.author.id in session.players:
+            return
+        session.join(ctx.author)
+        await ctx.reply(session.player_list_string)
+
+    @commands.Command
+    @commands.is_owner()
+    async def profile(self, ctx: commands.Context, phases: int = 1):
+        """Profile the next ``phases`` phases of this guild's game and DM the hottest functions."""
+        if self.shards is not None:
+            # The worker running the game profiles it and DMs the result through the front.
+            if not self.shards.profile(ctx.guild.id, ctx.author.id, phases):
+                return await ctx.reply("本群没有正在进行的游戏。")
+            self.members[ctx.author.id] = ctx.author
+            return await ctx.reply(f"将分析本局接下来的 {max(phases, 1)} 个阶段，结果会私聊发给你。")
+        session = self.sessions.get(ctx.guild.id)
+        if session is None:
+            return await ctx.reply("本群没有正在进行的游戏。")
+        if session.profiler is not None and not session.profiler.done:
+            return await ctx.reply("这局游戏已经在分析中了。")
+        author = ctx.author
+
+        def done(path, summary: str):
+            asyncio.create_task(self.dispatcher.send(author, f"{path}\n{summary}"))
+
+        session.profiler = PhaseProfiler(ctx.guild.id, phases, PROFILES, done)
+        await ctx.reply(f"将分析本局接下来的 {session.profiler.remaining} 个阶段，结果会私聊发给你。")
+
     async def start_game(self, ctx: commands.Context, chaos: bool):
         msg = [
             "%s 已经敲响了末日的钟声！ 发送 /join 来参加这场屠杀宴会……说不定会暴死当场！",
@@ -40,14 +214,27 @@ class Werewolf(commands.Cog):
             "以 %s 为先锋，混乱模式全面启动！发送 /join 来响应 %s 的号召。",
             "%s 解除了混乱的封印！现实世界从不曾有公平和美好！ 发送 /join 加入！"
         ]
+        if self.shards is not None:
+            if not self.shards.start_game(ctx.guild.id, ctx.channel.id, chaos, ctx.author):
+                return
+            self.channels[ctx.channel.id] = ctx.channel
+            self.members[ctx.author.id] = ctx.author
+            return await ctx.reply(random.choice(msg) % ctx.author.mention)
         sessions = Session(ctx, chaos, self)
         self.sessions[ctx.guild.id] = sessions
         sessions.join(ctx.author)
         await ctx.reply(random.choice(msg) % ctx.author.mention)
         await ctx.reply(sessions.player_list_string)
-        await sessions.main_game_loop()
-        self.sessions.pop(ctx.guild.id)
+        await self.run_session(sessions, sessions.main_game_loop())
 
 
 def setup(bot):
-    bot.add_cog(Werewolf(bot))
+    cog = Werewolf(bot)
+    bot.add_cog(cog)
+    workers = int(os.environ.get('WEREWOLF_SHARDS', 0))
+    if workers:
+        # Before resume_sessions, which hands sharded games back to the workers.
+        bot.loop.call_soon(cog.start_shards, workers)
+    bot.loop.create_task(cog.resume_sessions())
+    if metrics.ENABLED:
+        bot.loop.create_task(cog.start_metrics())
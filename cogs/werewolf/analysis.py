@@ -0,0 +1,333 @@
+"""Monte Carlo analysis of :func:`role_pool` + :func:`balance_roles`.
+
+Draws many role assignments for every player count, spread over a process pool, and
+reports how far apart the two sides end up, how often the balancer has to fall back
+to its closest unbalanced list, and how often each role is dealt::
+
+    python -m cogs.werewolf.analysis --samples 1000000 --players 5-50 --disable Thief,Chemist
+
+``--engine rejection`` analyzes the legacy 500-draw rejection sampler instead, run
+in bulk by :func:`cogs.werewolf.vectorized.sample_lobbies` (needs NumPy); there
+"fallback" is how often the 500 draw cap was hit.
+
+The default of ``SAMPLES`` lobbies per player count takes 10-20 CPU seconds per
+count, so the full 5-50 sweep finishes in minutes. Tails and rare roles need more;
+``--samples 1000000`` is opt-in and costs about ten times as much.
+
+Seeded results are cached on disk, keyed by a hash of the settings, the seed and
+the role table, so repeating a run is instant. Unseeded runs (``--seed -1``) are
+never cached, so every one of them samples afresh.
+"""
+from __future__ import annotations
+
+import argparse
+import dataclasses
+import hashlib
+import json
+import math
+import os
+import random
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from cogs.werewolf.balance import balance_roles, role_pool
+from cogs.werewolf.roles import ROLES, Role
+from cogs.werewolf import vectorized
+
+__all__ = (
+    'AnalysisSettings',
+    'PlayerCountStats',
+    'analyze',
+    'sample',
+)
+
+DEFAULT_CACHE = Path(os.environ.get('WEREWOLF_ANALYSIS_CACHE', Path.home() / '.cache' / 'werewolf' / 'analysis'))
+CHUNK = 5000
+SAMPLES = 100_000
+
+_NAMES: Dict[Role, str] = {n: m for m, n in ROLES.all_role.items()}
+
+
+@dataclass(frozen=True)
+class AnalysisSettings:
+    """The :class:`Setting` fields that change what :meth:`Session.balance` deals."""
+    disabled_role: int = 0
+    burning_overkill: bool = True
+    chaos: bool = False
+    engine: str = 'knapsack'
+
+    def key(self, samples: int, seed: Optional[int]) -> str:
+        # Strength or bit changes in roles.py must not be served from an old cache entry.
+        table = sorted((m, n.bit, n.strength, n.party.value) for m, n in ROLES.all_role.items())
+        payload = json.dumps([dataclasses.asdict(self), samples, seed, table], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+@dataclass
+class PlayerCountStats:
+    player_count: int
+    samples: int = 0
+    fallback: int = 0
+    unbalanced: int = 0
+    delta_sum: int = 0
+    delta_sq_sum: int = 0
+    delta_min: int = 0
+    delta_max: int = 0
+    deltas: Dict[int, int] = field(default_factory=dict)
+    roles: Dict[str, int] = field(default_factory=dict)
+    lobbies_with: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def mean_delta(self) -> float:
+        return self.delta_sum / self.samples if self.samples else 0.0
+
+    @property
+    def stdev_delta(self) -> float:
+        if self.samples < 2:
+            return 0.0
+        mean = self.mean_delta
+        return math.sqrt(max(self.delta_sq_sum / self.samples - mean * mean, 0.0))
+
+    @property
+    def fallback_rate(self) -> float:
+        return self.fallback / self.samples if self.samples else 0.0
+
+    @property
+    def unbalanced_rate(self) -> float:
+        return self.unbalanced / self.samples if self.samples else 0.0
+
+    def add(self, roles: List[Role], villager_strength: int, enemy_strength: int, balanced: bool):
+        delta = villager_strength - enemy_strength
+        if not self.samples:
+            self.delta_min = self.delta_max = delta
+        else:
+            self.delta_min = min(self.delta_min, delta)
+            self.delta_max = max(self.delta_max, delta)
+        self.samples += 1
+        self.fallback += not balanced
+        self.unbalanced += abs(delta) > variance(self.player_count)
+        self.delta_sum += delta
+        self.delta_sq_sum += delta * delta
+        self.deltas[delta] = self.deltas.get(delta, 0) + 1
+        for name, count in Counter(_NAMES[n] for n in roles).items():
+            self.roles[name] = self.roles.get(name, 0) + count
+            self.lobbies_with[name] = self.lobbies_with.get(name, 0) + 1
+
+    def add_batch(self, batch: vectorized.LobbyBatch):
+        np = vectorized.np
+        delta = batch.villager_strength.astype(np.int64) - batch.enemy_strength
+        if not self.samples:
+            self.delta_min, self.delta_max = int(delta.min()), int(delta.max())
+        else:
+            self.delta_min = min(self.delta_min, int(delta.min()))
+            self.delta_max = max(self.delta_max, int(delta.max()))
+        self.samples += len(delta)
+        self.fallback += int((~batch.balanced).sum())
+        self.unbalanced += int((np.abs(delta) > variance(self.player_count)).sum())
+        self.delta_sum += int(delta.sum())
+        self.delta_sq_sum += int((delta * delta).sum())
+        for k, v in zip(*np.unique(delta, return_counts=True)):
+            self.deltas[int(k)] = self.deltas.get(int(k), 0) + int(v)
+        counts = np.zeros((len(delta), len(vectorized.TABLE)), dtype=np.int32)
+        np.add.at(counts, (np.arange(len(delta))[:, None], batch.roles), 1)
+        for idx, (total, lobbies) in enumerate(zip(counts.sum(axis=0).tolist(), (counts > 0).sum(axis=0).tolist())):
+            if total:
+                name = _NAMES[vectorized.TABLE[idx]]
+                self.roles[name] = self.roles.get(name, 0) + total
+                self.lobbies_with[name] = self.lobbies_with.get(name, 0) + lobbies
+
+    def merge(self, other: PlayerCountStats):
+        if not other.samples:
+            return
+        if not self.samples:
+            self.delta_min, self.delta_max = other.delta_min, other.delta_max
+        else:
+            self.delta_min = min(self.delta_min, other.delta_min)
+            self.delta_max = max(self.delta_max, other.delta_max)
+        self.samples += other.samples
+        self.fallback += other.fallback
+        self.unbalanced += other.unbalanced
+        self.delta_sum += other.delta_sum
+        self.delta_sq_sum += other.delta_sq_sum
+        for target, source in ((self.deltas, other.deltas), (self.roles, other.roles),
+                               (self.lobbies_with, other.lobbies_with)):
+            for k, v in source.items():
+                target[k] = target.get(k, 0) + v
+
+    @classmethod
+    def from_dict(cls, data: dict) -> PlayerCountStats:
+        data = dict(data)
+        data['deltas'] = {int(k): v for k, v in data['deltas'].items()}
+        return cls(**data)
+
+
+def variance(player_count: int) -> int:
+    """The tolerance :func:`balance_roles` uses outside chaos mode."""
+    return player_count // 4 + 1
+
+
+def sample(player_count: int, settings: AnalysisSettings, samples: int, seed: Optional[int] = None) -> PlayerCountStats:
+    """Deal ``samples`` lobbies of ``player_count`` players in this process."""
+    rng = random.Random(seed)
+    stats = PlayerCountStats(player_count)
+    cult_hunter = not ROLES.has_role(settings.disabled_role, ROLES.CultistHunter)
+    if settings.engine == 'rejection':
+        pools = vectorized.np.stack([
+            vectorized.role_ids(role_pool(player_count, settings.disabled_role, rng)) for _ in range(samples)
+        ])
+        stats.add_batch(vectorized.sample_lobbies(
+            pools,
+            player_count,
+            chaos=settings.chaos,
+            burning_overkill=settings.burning_overkill,
+            cult_hunter=cult_hunter,
+            rng=vectorized.np.random.default_rng(seed),
+        ))
+        return stats
+    for _ in range(samples):
+        result = balance_roles(
+            role_pool(player_count, settings.disabled_role, rng),
+            player_count,
+            chaos=settings.chaos,
+            burning_overkill=settings.burning_overkill,
+            cult_hunter=cult_hunter,
+            rng=rng,
+        )
+        stats.add(*result)
+    return stats
+
+
+def _chunks(player_counts: Iterable[int], samples: int, seed: Optional[int]) -> List[Tuple[int, int, Optional[int]]]:
+    jobs = []
+    for player_count in player_counts:
+        for idx, start in enumerate(range(0, samples, CHUNK)):
+            chunk_seed = None if seed is None else hash((seed, player_count, idx)) & 0xFFFFFFFF
+            jobs.append((player_count, min(CHUNK, samples - start), chunk_seed))
+    return jobs
+
+
+def _load(path: Path) -> Optional[Dict[int, PlayerCountStats]]:
+    try:
+        data = json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+    return {int(k): PlayerCountStats.from_dict(v) for k, v in data.items()}
+
+
+def _store(path: Path, results: Dict[int, PlayerCountStats]):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix('.tmp')
+    tmp.write_text(json.dumps({k: dataclasses.asdict(v) for k, v in results.items()}))
+    tmp.replace(path)
+
+
+def analyze(
+        player_counts: Iterable[int],
+        settings: AnalysisSettings = AnalysisSettings(),
+        *,
+        samples: int = SAMPLES,
+        seed: Optional[int] = 0,
+        workers: Optional[int] = None,
+        cache: Optional[Path] = DEFAULT_CACHE,
+) -> Dict[int, PlayerCountStats]:
+    """Sample ``samples`` lobbies for each of ``player_counts`` across ``workers`` processes.
+
+    Player counts already in the cache for the same settings, sample count and seed are
+    not sampled again. Pass ``cache=None`` to skip the cache; a ``seed`` of ``None``
+    always skips it, since a random run must not be answered with an earlier one.
+    """
+    if settings.engine == 'rejection' and not vectorized.HAS_NUMPY:
+        raise RuntimeError('the rejection engine needs numpy')
+    player_counts = sorted(set(player_counts))
+    results: Dict[int, PlayerCountStats] = {}
+    path = cache / f'{settings.key(samples, seed)}.json' if cache is not None and seed is not None else None
+    if path is not None:
+        results = {k: v for k, v in (_load(path) or {}).items() if k in player_counts}
+    missing = [n for n in player_counts if n not in results]
+    if missing:
+        for player_count in missing:
+            results[player_count] = PlayerCountStats(player_count)
+        jobs = _chunks(missing, samples, seed)
+        with ProcessPoolExecutor(workers) as pool:
+            futures = [pool.submit(sample, player_count, settings, size, chunk_seed)
+                       for player_count, size, chunk_seed in jobs]
+            for future in futures:
+                stats = future.result()
+                results[stats.player_count].merge(stats)
+        if path is not None:
+            cached = _load(path) or {}
+            cached.update(results)
+            _store(path, cached)
+    return {n: results[n] for n in player_counts}
+
+
+def _player_counts(spec: str) -> List[int]:
+    counts = []
+    for part in spec.split(','):
+        low, _, high = part.partition('-')
+        counts.extend(range(int(low), int(high or low) + 1))
+    return counts
+
+
+def _disabled(spec: str) -> int:
+    bits = 0
+    for name in filter(None, (n.strip() for n in spec.split(','))):
+        if name not in ROLES.all_role:
+            raise SystemExit(f'unknown role {name!r}')
+        bits |= 1 << ROLES.all_role[name].bit
+    return bits
+
+
+def report(results: Dict[int, PlayerCountStats], top: int = 8) -> str:
+    lines = [f'{"players":>7} {"samples":>9} {"Δ mean":>8} {"Δ sd":>6} {"Δ min":>6} {"Δ max":>6} '
+             f'{"fallback":>9} {"unbal.":>8}  most dealt (share of lobbies)']
+    for player_count, stats in results.items():
+        common = sorted(stats.lobbies_with.items(), key=lambda n: -n[1])[:top]
+        roles = ' '.join(f'{name}:{count / stats.samples:.0%}' for name, count in common)
+        lines.append(
+            f'{player_count:>7} {stats.samples:>9} {stats.mean_delta:>8.2f} {stats.stdev_delta:>6.2f} '
+            f'{stats.delta_min:>6} {stats.delta_max:>6} {stats.fallback_rate:>9.2%} {stats.unbalanced_rate:>8.2%}  {roles}'
+        )
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--players', default='5-50', help='player counts, e.g. 5-50 or 8,12,20-24')
+    parser.add_argument('--samples', type=int, default=SAMPLES, help='lobbies per player count')
+    parser.add_argument('--disable', default='', help='comma separated ROLES attributes to disable')
+    parser.add_argument('--engine', choices=('knapsack', 'rejection'), default='knapsack')
+    parser.add_argument('--chaos', action='store_true')
+    parser.add_argument('--no-burning-overkill', action='store_true')
+    parser.add_argument('--seed', type=int, default=0, help='-1 for an unseeded, uncached run')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--cache', type=Path, default=DEFAULT_CACHE)
+    parser.add_argument('--no-cache', action='store_true')
+    args = parser.parse_args()
+
+    settings = AnalysisSettings(
+        disabled_role=_disabled(args.disable),
+        burning_overkill=not args.no_burning_overkill,
+        chaos=args.chaos,
+        engine=args.engine,
+    )
+    seed = None if args.seed < 0 else args.seed
+    start = time.perf_counter()
+    results = analyze(
+        _player_counts(args.players),
+        settings,
+        samples=args.samples,
+        seed=seed,
+        workers=args.workers,
+        cache=None if args.no_cache else args.cache,
+    )
+    print(report(results))
+    print(f'\nsettings {settings.key(args.samples, seed)}, {time.perf_counter() - start:.1f}s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,332 @@
+from __future__ import annotations
+
+import random
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+from cogs.werewolf.roles import ROLES, Role
+
+__all__ = (
+    'DRAW_LIMIT',
+    'BalanceResult',
+    'role_pool',
+    'balance_roles',
+)
+
+# The rejection loop gives up after this many candidates and hands the lobby to the knapsack.
+DRAW_LIMIT = 500
+
+# Every strength is shifted by this much inside the knapsack so that sums stay non-negative (ClumsyGuy is -1).
+_SHIFT = 1
+
+Option = Tuple[Tuple[Role, ...], int]
+
+# Wolf-side roles the rejection loop turns into a Wolf when none was drawn.
+_POINTLESS = frozenset((ROLES.Traitor, ROLES.SnowWolf, ROLES.Sorcerer))
+
+
+class BalanceResult(NamedTuple):
+    roles: List[Role]
+    villager_strength: int
+    enemy_strength: int
+    balanced: bool
+
+
+class _Group(NamedTuple):
+    options: Tuple[Option, ...]
+    forced: bool
+
+
+def _replace(roles: List[Role], old: Role, new: Role):
+    roles[roles.index(old)] = new
+
+
+def _draw(
+        pool: Sequence[Role], player_count: int, chaos: bool, burning_overkill: bool, cult_hunter: bool,
+        variance: int, rng: random.Random,
+) -> BalanceResult:
+    """One candidate of the old rejection loop: ``player_count`` draws from ``pool`` with its fix-ups."""
+    roles = rng.choices(pool, k=player_count)
+    present = set(roles)
+    if ROLES.Wolf not in present:
+        pointless = next((n for n in roles if n in _POINTLESS), None)
+        if pointless is not None:
+            _replace(roles, pointless, ROLES.Wolf)
+    if cult_hunter and ROLES.Cultist in present and ROLES.CultistHunter not in present:
+        if ROLES.Villager in present:
+            _replace(roles, ROLES.Villager, ROLES.CultistHunter)
+        else:
+            _replace(roles, ROLES.Cultist, ROLES.Villager)
+    if not burning_overkill and ROLES.Arsonist in present and ROLES.SerialKiller in present:
+        _replace(roles, ROLES.Arsonist, ROLES.Villager)
+    if ROLES.ApprenticeSeer in present and ROLES.Seer not in present:
+        _replace(roles, ROLES.ApprenticeSeer, ROLES.Seer)
+    baddies = enemy_strength = villager_strength = 0
+    for role in roles:
+        if ROLES.is_evil(role):
+            baddies += 1
+            enemy_strength += role.strength
+        else:
+            villager_strength += role.strength
+    balanced = 0 < baddies <= player_count - baddies and (
+            chaos or abs(villager_strength - enemy_strength) <= variance
+    )
+    return BalanceResult(roles, villager_strength, enemy_strength, balanced)
+
+
+def _option(*roles: Role) -> Option:
+    return roles, sum(n.strength + _SHIFT for n in roles)
+
+
+def _pick_evil(
+        evil: Sequence[Role], count: int, burning_overkill: bool, rng: random.Random
+) -> List[Role]:
+    candidates = list(evil)
+    rng.shuffle(candidates)
+    picked: List[Role] = []
+    # The first slot always goes to a wolf. Drawing every slot from the whole evil pool
+    # leaves most small games without one, which the old loop avoided by turning a
+    # drawn Traitor, SnowWolf or Sorcerer into a Wolf; like it, a pool whose only
+    # wolf-side role is a SnowWolf or Sorcerer still gets a Wolf.
+    if count:
+        wolf = ROLES.Wolf if ROLES.Wolf in candidates else next((n for n in candidates if n in ROLES.wolves), ROLES.Wolf)
+        if wolf in candidates:
+            candidates.remove(wolf)
+        picked.append(wolf)
+    for role in candidates:
+        if len(picked) >= count:
+            break
+        if not burning_overkill and (
+                (role is ROLES.Arsonist and ROLES.SerialKiller in picked) or
+                (role is ROLES.SerialKiller and ROLES.Arsonist in picked)
+        ):
+            continue
+        picked.append(role)
+    return picked
+
+
+def _good_groups(good: Sequence[Role], evil: Sequence[Role], count: int, cult_hunter: bool) -> List[_Group]:
+    items = list(good)
+    groups: List[_Group] = []
+
+    if ROLES.Cultist in evil and cult_hunter and count:
+        items = [n for n in items if n is not ROLES.CultistHunter]
+        groups.append(_Group((_option(ROLES.CultistHunter),), True))
+
+    if ROLES.Wolf not in evil:
+        items = [n for n in items if n is not ROLES.Traitor]
+
+    if ROLES.ApprenticeSeer in items:
+        items = [n for n in items if n is not ROLES.ApprenticeSeer]
+        if ROLES.Seer in items:
+            items.remove(ROLES.Seer)
+            groups.append(_Group((_option(ROLES.Seer), _option(ROLES.Seer, ROLES.ApprenticeSeer)), False))
+        else:
+            # An apprentice with no seer to learn from is dealt as the seer.
+            groups.append(_Group((_option(ROLES.Seer),), False))
+
+    groups.extend(_Group((_option(n),), False) for n in items)
+
+    optional = sum(max(len(r) for r, _ in g.options) for g in groups if not g.forced)
+    if optional < count:
+        groups.extend(_Group((_option(ROLES.Villager),), False) for _ in range(count - optional))
+    return groups
+
+
+def _knapsack(groups: Sequence[_Group], count: int) -> List[List[int]]:
+    """``history[i][c]`` is a bitmask of the shifted strength sums reachable with ``c`` roles
+    out of the first ``i`` groups."""
+    remaining = sum(max(len(r) for r, _ in g.options) for g in groups)
+    reach = [0] * (count + 1)
+    reach[0] = 1
+    history = [reach]
+    for group in groups:
+        remaining -= max(len(r) for r, _ in group.options)
+        new = list(reach) if not group.forced else [0] * (count + 1)
+        for roles, weight in group.options:
+            size = len(roles)
+            # States that can't be topped up to ``count`` by the groups left over are never used.
+            for c in range(count - size, max(count - remaining - size, 0) - 1, -1):
+                if reach[c]:
+                    new[c + size] |= reach[c] << weight
+        reach = new
+        history.append(reach)
+    return history
+
+
+def _backtrack(
+        groups: Sequence[_Group], history: List[List[int]], count: int, total: int, rng: random.Random
+) -> List[Role]:
+    roles: List[Role] = []
+    for idx in range(len(groups) - 1, -1, -1):
+        before = history[idx]
+        choices: List[Option] = []
+        if not groups[idx].forced and before[count] >> total & 1:
+            choices.append(((), 0))
+        for option in groups[idx].options:
+            size = len(option[0])
+            if size <= count and option[1] <= total and before[count - size] >> (total - option[1]) & 1:
+                choices.append(option)
+        picked, weight = rng.choice(choices)
+        roles.extend(picked)
+        count -= len(picked)
+        total -= weight
+    return roles
+
+
+def _reachable(mask: int, low: int, high: int) -> List[int]:
+    return [n for n in range(max(low, 0), high + 1) if mask >> n & 1]
+
+
+def _nearest(mask: int, target: int) -> int:
+    best = -1
+    for n in range(mask.bit_length()):
+        if mask >> n & 1 and (best < 0 or abs(n - target) < abs(best - target)):
+            best = n
+    return best
+
+
+def role_pool(player_count: int, disabled_role: int = 0, rng: Optional[random.Random] = None) -> List[Role]:
+    """The candidate roles for a ``player_count`` lobby, before balancing.
+
+    ``disabled_role`` is the :attr:`Setting.disabled_role` bit field.
+    """
+    rng = rng or random
+
+    def disabled(role: Role) -> bool:
+        return ROLES.has_role(disabled_role, role)
+
+    possible_wolf = [n for n in ROLES.wolf_list if not disabled(n)]
+    role_to_assign: List[Role] = []
+
+    wolf_count = min(max(player_count // 5, 1), 5)
+    if wolf_count == 1:
+        if ROLES.SnowWolf in possible_wolf:
+            possible_wolf.remove(ROLES.SnowWolf)
+    for n in range(wolf_count):
+        role = rng.choice(possible_wolf)
+        if role is not ROLES.Wolf:
+            possible_wolf.remove(role)
+        role_to_assign.append(role)
+
+    for role in ROLES.not_wolf.values():
+        if disabled(role):
+            continue
+        if role is ROLES.Cultist:
+            if player_count > 10:
+                role_to_assign.append(role)
+            continue
+        role_to_assign.append(role)
+
+    if not disabled(ROLES.Mason):
+        role_to_assign.append(ROLES.Mason)
+        role_to_assign.append(ROLES.Mason)
+
+    if ROLES.CultistHunter in role_to_assign and not disabled(ROLES.Cultist):
+        role_to_assign.append(ROLES.Cultist)
+        role_to_assign.append(ROLES.Cultist)
+
+    for n in range(player_count // 4):
+        role_to_assign.append(ROLES.Villager)
+
+    return role_to_assign
+
+
+def balance_roles(
+        pool: Sequence[Role],
+        player_count: int,
+        *,
+        chaos: bool = False,
+        burning_overkill: bool = True,
+        cult_hunter: bool = True,
+        variance: Optional[int] = None,
+        rng: Optional[random.Random] = None,
+) -> BalanceResult:
+    """Build a role list for ``player_count`` players out of the candidate ``pool``.
+
+    Candidates are drawn the way the old rejection loop drew them, ``player_count``
+    picks from ``pool`` with its fix-ups, and the first one whose sides are within
+    ``variance`` of each other is returned, so which roles get dealt follows the old
+    loop exactly. That takes a handful of candidates for almost every lobby. After
+    :data:`DRAW_LIMIT` misses the lobby goes to :func:`_balance_knapsack`, which
+    finds a balanced list whenever the pool has one instead of returning the last
+    candidate as the old loop did.
+    """
+    rng = rng or random
+    if variance is None:
+        variance = player_count // 4 + 1
+    pool = list(pool)
+    if player_count > len(pool):
+        pool += [ROLES.Villager] * (player_count - len(pool))
+    for _ in range(DRAW_LIMIT):
+        result = _draw(pool, player_count, chaos, burning_overkill, cult_hunter, variance, rng)
+        if result.balanced:
+            return result
+    return _balance_knapsack(pool, player_count, chaos, burning_overkill, cult_hunter, variance, rng)
+
+
+def _balance_knapsack(
+        pool: List[Role], player_count: int, chaos: bool, burning_overkill: bool, cult_hunter: bool,
+        variance: int, rng: random.Random,
+) -> BalanceResult:
+    """The fallback of :func:`balance_roles` for lobbies the rejection loop can't balance.
+
+    The evil side is drawn first, with roughly as many evil roles as a plain draw from
+    ``pool`` would give, one of them always a wolf. The village side is then picked by a knapsack over
+    :attr:`Role.strength` so that both sides end up within ``variance`` of each other.
+    Every entry of ``pool`` is dealt at most once, so a role listed once (a Seer, a
+    Cupid) never turns up twice the way the old draw with replacement could deal
+    it; Villagers fill whatever the pool runs short of.
+    When the drawn count can't be balanced the count is walked towards the side that
+    is too weak, so the result always comes back after at most ``player_count // 2``
+    passes; if none balances, the closest role list found is returned.
+    """
+    evil = [n for n in pool if ROLES.is_evil(n)]
+    good = [n for n in pool if not ROLES.is_evil(n)]
+    limit = max(min(len(evil), player_count // 2), 1)
+    drawn = sum(1 for _ in range(player_count) if rng.random() * len(pool) < len(evil))
+
+    best: Optional[BalanceResult] = None
+    evil_count = min(max(drawn, 1), limit)
+    step = 0
+    tried = set()
+    while 1 <= evil_count <= limit and evil_count not in tried:
+        tried.add(evil_count)
+        baddies = _pick_evil(evil, evil_count, burning_overkill, rng)
+        count = player_count - len(baddies)
+        groups = _good_groups(good, baddies, count, cult_hunter)
+        rng.shuffle(groups)
+        history = _knapsack(groups, count)
+        mask = history[-1][count]
+        if not mask:
+            break
+
+        enemy_strength = sum(n.strength for n in baddies)
+        target = enemy_strength + count * _SHIFT
+        if chaos:
+            sums = _reachable(mask, 0, mask.bit_length())
+        else:
+            sums = _reachable(mask, target - variance, target + variance)
+        balanced = bool(sums)
+        total = rng.choice(sums) if sums else _nearest(mask, target)
+
+        villagers = _backtrack(groups, history, count, total, rng)
+        result = BalanceResult(
+            roles=baddies + villagers,
+            villager_strength=total - count * _SHIFT,
+            enemy_strength=enemy_strength,
+            balanced=balanced,
+        )
+        if balanced:
+            return result
+        if best is None or (
+                abs(result.villager_strength - result.enemy_strength) <
+                abs(best.villager_strength - best.enemy_strength)
+        ):
+            best = result
+        # A village that is too strong needs more evil roles, a weak one fewer; keep walking that way.
+        direction = 1 if result.villager_strength > result.enemy_strength else -1
+        if step and direction != step:
+            break
+        step = direction
+        evil_count += step
+    return best
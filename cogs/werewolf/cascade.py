@@ -0,0 +1,79 @@
+"""The worklist behind :meth:`Session.kill_players`.
+
+A batch starts with the deaths it was given. Processing a death can queue more
+work: the lover's suicide, or a hunter's final shot, which in turn can queue
+the death of whoever was shot. Work is taken first in, first out until the
+queues are empty; nothing recurses, so the depth of a chain of lovers and
+hunters does not matter. A player is only ever buried once, so a batch does at
+most a death, a lover and a shot per player.
+
+Everything that happened is recorded as a flat list of :class:`DeathEvent`, in
+the order it happened.
+"""
+from __future__ import annotations
+
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Iterable, List, Optional, Tuple, TYPE_CHECKING
+
+from cogs.werewolf.enum import KillMethod
+
+if TYPE_CHECKING:
+    from cogs.werewolf.session import Player
+
+__all__ = (
+    'Death',
+    'DeathEvent',
+    'Cascade',
+)
+
+# DeathEvent.kind
+DIED = 'died'
+# The wolves lost their cub and are out for revenge.
+WOLF_CUB = 'wolf_cub'
+# A hunter who died at night, who shoots at dawn.
+SHOT_DELAYED = 'shot_delayed'
+# A hunter's final shot; detail is the outcome: timeout, skip, shot or elder.
+FINAL_SHOT = 'final_shot'
+ROLE_CHANGED = 'role_changed'
+
+
+@dataclass
+class Death:
+    player: Player
+    method: KillMethod
+    killer: Optional[Player] = None
+    final_shot: bool = True
+
+
+@dataclass(frozen=True)
+class DeathEvent:
+    """``other`` is the killer of a death, the target of a shot, or the role model of a role change."""
+    kind: str
+    player: Player
+    method: Optional[KillMethod] = None
+    other: Optional[Player] = None
+    detail: Optional[str] = None
+
+
+class Cascade:
+    def __init__(self, deaths: Iterable[Death] = (), shots: Iterable[Tuple[Player, KillMethod]] = ()):
+        self.deaths: Deque[Death] = deque(deaths)
+        self.shots: Deque[Tuple[Player, KillMethod]] = deque(shots)
+        self.events: List[DeathEvent] = []
+
+    def __bool__(self):
+        return bool(self.deaths or self.shots)
+
+    def emit(
+            self,
+            kind: str,
+            player: Player,
+            method: Optional[KillMethod] = None,
+            other: Optional[Player] = None,
+            detail: Optional[str] = None,
+    ):
+        self.events.append(DeathEvent(kind, player, method, other, detail))
+
+    def died(self) -> List[DeathEvent]:
+        return [n for n in self.events if n.kind == DIED]
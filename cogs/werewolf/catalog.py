@@ -0,0 +1,107 @@
+"""Role text, read from a catalog file only when a game asks for it.
+
+A locale's catalog is ``text/<locale>.txt`` next to this module: one entry per
+line, ``<role>.<key>``, a tab, then the text with newlines written as ``\\n``
+and backslashes as ``\\\\``. A key may repeat on consecutive lines for a list
+of variants, such as a role's ``desc``.
+
+The file is memory-mapped on the first lookup and never read into memory as a
+whole. A lookup finds its entry in the mapping, decodes only those lines and
+keeps the result, so a worker holds the text of the roles its games actually
+dealt and nothing else; there is no index to build. Every locale other than
+:data:`DEFAULT_LOCALE` falls back to it for the entries it leaves out.
+"""
+from __future__ import annotations
+
+import mmap
+import os
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+__all__ = (
+    'DEFAULT_LOCALE',
+    'LOCALE',
+    'Catalog',
+    'catalog',
+)
+
+DEFAULT_LOCALE = 'zh_CN'
+LOCALE = os.environ.get('WEREWOLF_LOCALE') or DEFAULT_LOCALE
+DIRECTORY = Path(__file__).with_name('text')
+
+
+def _unescape(text: str) -> str:
+    if '\\' not in text:
+        return text
+    return '\\'.join(n.replace('\\n', '\n') for n in text.split('\\\\'))
+
+
+class Catalog:
+    def __init__(self, path: Path, fallback: Optional[Catalog] = None):
+        self.path: Path = path
+        self.fallback: Optional[Catalog] = fallback
+        self._map: Optional[mmap.mmap] = None
+        self._cache: Dict[str, Tuple[str, ...]] = {}
+
+    def _open(self) -> mmap.mmap:
+        with open(self.path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._map
+
+    def _find(self, name: str) -> Tuple[str, ...]:
+        data = self._map if self._map is not None else self._open()
+        prefix = b'\n' + name.encode() + b'\t'
+        at = data.find(prefix)
+        if data[:len(prefix) - 1] == prefix[1:]:
+            # The first line, which has no newline before it.
+            at = -1
+        elif at == -1:
+            return ()
+        result = []
+        # Variants are consecutive lines, so collecting stops at the first other entry.
+        while True:
+            start = at + len(prefix)
+            end = data.find(b'\n', start)
+            if end == -1:
+                end = len(data)
+            result.append(_unescape(data[start:end].decode()))
+            if data[end:end + len(prefix)] != prefix:
+                return tuple(result)
+            at = end
+
+    def texts(self, role: str, key: str) -> Tuple[str, ...]:
+        """Every variant of ``key`` for ``role``; empty when neither this locale nor its fallback has it."""
+        name = f'{role}.{key}'
+        result = self._cache.get(name)
+        if result is None:
+            result = self._find(name)
+            if not result and self.fallback is not None:
+                result = self.fallback.texts(role, key)
+            self._cache[name] = result
+        return result
+
+    def text(self, role: str, key: str) -> Optional[str]:
+        texts = self.texts(role, key)
+        return texts[0] if texts else None
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._cache.clear()
+
+
+_CATALOGS: Dict[str, Catalog] = {}
+
+
+def catalog(locale: Optional[str] = None) -> Catalog:
+    """The catalog of ``locale``, by default :data:`LOCALE` (``WEREWOLF_LOCALE``), opened once per process."""
+    locale = locale or LOCALE
+    result = _CATALOGS.get(locale)
+    if result is None:
+        path = DIRECTORY / f'{locale}.txt'
+        if not path.exists():
+            raise LookupError(f'no role text for locale {locale!r}')
+        fallback = catalog(DEFAULT_LOCALE) if locale != DEFAULT_LOCALE else None
+        result = _CATALOGS[locale] = Catalog(path, fallback)
+    return result
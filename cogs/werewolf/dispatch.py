@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Iterable, List, Optional, Tuple
+
+import qq
+
+__all__ = (
+    'BatchReport',
+    'DMDispatcher',
+)
+
+log = logging.getLogger(__name__)
+
+
+@dataclass
+class BatchReport:
+    sent: int = 0
+    failed: List[Tuple[qq.Member, BaseException]] = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def total(self) -> int:
+        return self.sent + len(self.failed)
+
+
+class DMDispatcher:
+    """Sends the private messages of one game phase concurrently.
+
+    At most ``limit`` sends are in flight at a time. A failed send is recorded in the
+    returned :class:`BatchReport` and never stops the rest of the batch.
+    """
+
+    def __init__(self, limit: int = 10):
+        self.limit: int = max(limit, 1)
+        self.last_report: Optional[BatchReport] = None
+
+    async def send(self, member: qq.Member, content: str) -> BatchReport:
+        return await self.send_all([(member, content)])
+
+    async def send_all(self, messages: Iterable[Tuple[qq.Member, str]], limit: Optional[int] = None) -> BatchReport:
+        """``limit`` overrides :attr:`limit` for this batch."""
+        messages = [(m, c) for m, c in messages if c]
+        report = BatchReport()
+        if not messages:
+            return report
+        semaphore = asyncio.Semaphore(max(limit, 1) if limit is not None else self.limit)
+
+        async def deliver(member: qq.Member, content: str):
+            async with semaphore:
+                try:
+                    await member.send(content)
+                except Exception as e:
+                    report.failed.append((member, e))
+                else:
+                    report.sent += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(deliver(m, c) for m, c in messages))
+        report.elapsed = time.perf_counter() - start
+        self.last_report = report
+
+        for member, exc in report.failed:
+            log.warning('Failed to send DM to %s: %r', member, exc)
+        log.debug('Sent %d/%d DMs in %.3fs', report.sent, report.total, report.elapsed)
+        return report
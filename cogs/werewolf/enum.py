@@ -1,4 +1,4 @@
-from enum import Enum, unique
+from enum import Enum, IntFlag, unique
 
 
 @unique
@@ -71,3 +71,17 @@ class KillMethod(Enum):
     Spotted = 21
     Burn = 22
     VisitBurning = 23
+
+
+@unique
+class PlayerFlag(IntFlag):
+    CultLeader = 1 << 0
+    Dead = 1 << 1
+    DiedLastNight = 1 << 2
+    Win = 1 << 3
+    Bitten = 1 << 4
+    Drunk = 1 << 5
+    ConvertedToCult = 1 << 6
+    Flee = 1 << 7
+    UsedAbility = 1 << 8
+    Doused = 1 << 9
@@ -0,0 +1,281 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, List, Optional, Sequence, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from cogs.werewolf.session import Session
+
+__all__ = (
+    'PlayerRecord',
+    'DeathRecord',
+    'GameRecord',
+    'WriterStats',
+    'HistoryStore',
+)
+
+log = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    id INTEGER PRIMARY KEY,
+    guild_id INTEGER,
+    channel_id INTEGER,
+    chaos INTEGER NOT NULL,
+    player_count INTEGER NOT NULL,
+    days INTEGER NOT NULL,
+    winner INTEGER,
+    start_time REAL,
+    end_time REAL
+);
+CREATE TABLE IF NOT EXISTS players (
+    game_id INTEGER NOT NULL REFERENCES games (id),
+    member_id INTEGER NOT NULL,
+    name TEXT,
+    role INTEGER,
+    win INTEGER NOT NULL,
+    dead INTEGER NOT NULL,
+    flee INTEGER NOT NULL,
+    time_died INTEGER,
+    kill_method INTEGER,
+    kill_by_role INTEGER,
+    PRIMARY KEY (game_id, member_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS deaths (
+    game_id INTEGER NOT NULL REFERENCES games (id),
+    seq INTEGER NOT NULL,
+    member_id INTEGER NOT NULL,
+    day INTEGER NOT NULL,
+    night INTEGER NOT NULL,
+    kill_method INTEGER,
+    killer_id INTEGER,
+    killer_role INTEGER,
+    PRIMARY KEY (game_id, seq)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS players_by_member ON players (member_id, game_id);
+CREATE INDEX IF NOT EXISTS games_by_guild ON games (guild_id, end_time);
+"""
+
+
+@dataclass
+class PlayerRecord:
+    member_id: int
+    name: str
+    role: Optional[int]
+    win: bool
+    dead: bool
+    flee: bool
+    time_died: Optional[int]
+    kill_method: Optional[int]
+    kill_by_role: Optional[int]
+
+
+@dataclass
+class DeathRecord:
+    """One death buried by :meth:`Session.kill_players`. Roles are stored as :attr:`Role.bit`."""
+    member_id: int
+    day: int
+    night: bool
+    kill_method: Optional[int]
+    killer_id: Optional[int] = None
+    killer_role: Optional[int] = None
+
+
+@dataclass
+class GameRecord:
+    guild_id: Optional[int]
+    channel_id: Optional[int]
+    chaos: bool
+    days: int
+    winner: Optional[int]
+    start_time: Optional[float]
+    end_time: Optional[float]
+    players: List[PlayerRecord] = field(default_factory=list)
+    deaths: List[DeathRecord] = field(default_factory=list)
+
+    @classmethod
+    def from_session(cls, session: Session, winner: Any = None) -> GameRecord:
+        def value(n):
+            return getattr(n, 'value', None) if n else None
+
+        def bit(role):
+            return role.bit if role else None
+
+        def timestamp(dt):
+            return dt.timestamp() if dt else None
+
+        return cls(
+            guild_id=getattr(session.guild, 'id', None),
+            channel_id=getattr(session.channel, 'id', None),
+            chaos=session.chaos,
+            days=session.day,
+            winner=value(winner),
+            start_time=timestamp(session.start_time),
+            end_time=timestamp(session.end_time),
+            players=[
+                PlayerRecord(
+                    member_id=p.member.id,
+                    name=p.name,
+                    role=bit(p.role),
+                    win=p.win,
+                    dead=p.dead,
+                    flee=p.flee,
+                    time_died=p.time_died if p.dead else None,
+                    kill_method=value(p.kill_method),
+                    kill_by_role=bit(p.kill_by_role),
+                )
+                for p in session.players.values()
+            ],
+            deaths=list(session.deaths),
+        )
+
+
+@dataclass
+class WriterStats:
+    games: int = 0
+    rows: int = 0
+    batches: int = 0
+    max_batch: int = 0
+    write_time: float = 0.0
+    failed: int = 0
+
+
+class HistoryStore:
+    """Keeps finished games in a local SQLite database.
+
+    :meth:`record` only puts the game on a queue. A background task collects up to
+    ``batch_size`` games, waiting at most ``flush_interval`` seconds for more, and
+    writes them in one transaction on a dedicated thread, so the event loop never
+    waits on the disk. The database runs in WAL mode, which keeps readers from
+    blocking the writer.
+    """
+
+    def __init__(self, path: str, *, batch_size: int = 200, flush_interval: float = 0.5):
+        self.path: str = path
+        self.batch_size: int = batch_size
+        self.flush_interval: float = flush_interval
+        self.stats: WriterStats = WriterStats()
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._executor = ThreadPoolExecutor(1, thread_name_prefix='werewolf-history')
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        # Only ever called on the executor thread.
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            self._conn.execute('PRAGMA foreign_keys=ON')
+            self._conn.executescript(SCHEMA)
+        return self._conn
+
+    async def _call(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    def record(self, game: GameRecord):
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        self._queue.put_nowait(game)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                await self._call(self._write, batch)
+            except Exception:
+                self.stats.failed += len(batch)
+                log.exception('Failed to store %d games', len(batch))
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write(self, batch: Sequence[GameRecord]):
+        start = time.perf_counter()
+        conn = self._connect()
+        rows = 0
+        with conn:
+            for game in batch:
+                game_id = conn.execute(
+                    'INSERT INTO games (guild_id, channel_id, chaos, player_count, days, winner, start_time, end_time) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                    (game.guild_id, game.channel_id, game.chaos, len(game.players), game.days, game.winner,
+                     game.start_time, game.end_time),
+                ).lastrowid
+                conn.executemany(
+                    'INSERT INTO players VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    [(game_id, p.member_id, p.name, p.role, p.win, p.dead, p.flee, p.time_died, p.kill_method,
+                      p.kill_by_role) for p in game.players],
+                )
+                conn.executemany(
+                    'INSERT INTO deaths VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                    [(game_id, seq, d.member_id, d.day, d.night, d.kill_method, d.killer_id, d.killer_role)
+                     for seq, d in enumerate(game.deaths)],
+                )
+                rows += 1 + len(game.players) + len(game.deaths)
+        self.stats.games += len(batch)
+        self.stats.rows += rows
+        self.stats.batches += 1
+        self.stats.max_batch = max(self.stats.max_batch, len(batch))
+        self.stats.write_time += time.perf_counter() - start
+
+    def _query(self, sql: str, args: Tuple[Any, ...]) -> List[dict]:
+        conn = self._connect()
+        cursor = conn.execute(sql, args)
+        columns = [n[0] for n in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    async def player_games(self, member_id: int, limit: int = 20) -> List[dict]:
+        return await self._call(
+            self._query,
+            'SELECT g.*, p.role, p.win, p.dead, p.kill_method FROM players p JOIN games g ON g.id = p.game_id '
+            'WHERE p.member_id = ? ORDER BY p.game_id DESC LIMIT ?',
+            (member_id, limit),
+        )
+
+    async def player_summary(self, member_id: int) -> dict:
+        rows = await self._call(
+            self._query,
+            'SELECT COUNT(*) AS games, COALESCE(SUM(win), 0) AS wins, COALESCE(SUM(NOT dead), 0) AS survived '
+            'FROM players WHERE member_id = ?',
+            (member_id,),
+        )
+        return rows[0]
+
+    async def guild_games(self, guild_id: int, limit: int = 20) -> List[dict]:
+        return await self._call(
+            self._query,
+            'SELECT * FROM games WHERE guild_id = ? ORDER BY end_time DESC LIMIT ?',
+            (guild_id, limit),
+        )
+
+    async def flush(self):
+        """Wait until every recorded game is written."""
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def close(self):
+        await self.flush()
+        if self._task is not None:
+            self._task.cancel()
+        if self._conn is not None:
+            await self._call(self._conn.close)
+            self._conn = None
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import os
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, TYPE_CHECKING
+
+from cogs.werewolf.enum import WinType
+from cogs.werewolf.roles import Role
+
+if TYPE_CHECKING:
+    from cogs.werewolf.session import Player
+
+__all__ = (
+    'RoleIndex',
+)
+
+
+class RoleIndex:
+    """Role and liveness lookups for the players of one :class:`Session`.
+
+    ``Player.role`` and ``Player.dead`` report every change here, so lookups never
+    have to walk ``Session.players``. Set :attr:`debug` (or ``WEREWOLF_DEBUG_INDEX=1``)
+    to check the index against a full rebuild on every lookup.
+    """
+    debug: bool = bool(os.environ.get('WEREWOLF_DEBUG_INDEX'))
+
+    def __init__(self):
+        self.members: Dict[int, Player] = {}
+        self.alive: Dict[int, Player] = {}
+        self.by_role: Dict[Role, Dict[int, Player]] = {}
+        self.alive_by_role: Dict[Role, Dict[int, Player]] = {}
+        self.party_count: Counter[WinType] = Counter()
+
+    def __contains__(self, player: Player) -> bool:
+        return self.members.get(player.member.id) is player
+
+    def add(self, player: Player):
+        self.members[player.member.id] = player
+        if not player.dead:
+            self.alive[player.member.id] = player
+        self._link(player, player.role, player.dead)
+
+    def remove(self, player: Player):
+        if player not in self:
+            return
+        self._unlink(player, player.role, player.dead)
+        self.alive.pop(player.member.id, None)
+        del self.members[player.member.id]
+
+    def role_changed(self, player: Player, old: Optional[Role]):
+        if player not in self:
+            return
+        self._unlink(player, old, player.dead)
+        self._link(player, player.role, player.dead)
+
+    def dead_changed(self, player: Player, old: bool):
+        if player not in self or old == player.dead:
+            return
+        if player.dead:
+            self.alive.pop(player.member.id, None)
+        else:
+            self.alive[player.member.id] = player
+        self._unlink(player, player.role, old)
+        self._link(player, player.role, player.dead)
+
+    def _link(self, player: Player, role: Optional[Role], dead: bool):
+        if not isinstance(role, Role):
+            return
+        key = player.member.id
+        self.by_role.setdefault(role, {})[key] = player
+        if not dead:
+            self.alive_by_role.setdefault(role, {})[key] = player
+            self.party_count[role.party] += 1
+
+    def _unlink(self, player: Player, role: Optional[Role], dead: bool):
+        if not isinstance(role, Role):
+            return
+        key = player.member.id
+        self.by_role[role].pop(key, None)
+        if not dead:
+            self.alive_by_role[role].pop(key, None)
+            self.party_count[role.party] -= 1
+
+    def with_role(self, role: Role) -> List[Player]:
+        self.check()
+        return list(self.by_role.get(role, {}).values())
+
+    def with_roles(self, roles: Iterable[Role]) -> List[Player]:
+        self.check()
+        return [p for r in dict.fromkeys(roles) for p in self.by_role.get(r, {}).values()]
+
+    def alive_with_role(self, role: Role) -> Optional[Player]:
+        self.check()
+        for p in self.alive_by_role.get(role, {}).values():
+            return p
+        return None
+
+    def alive_with_roles(self, roles: Iterable[Role]) -> List[Player]:
+        self.check()
+        return [p for r in dict.fromkeys(roles) for p in self.alive_by_role.get(r, {}).values()]
+
+    def alive_count(self, *roles: Role) -> int:
+        return sum(len(self.alive_by_role.get(r, ())) for r in roles)
+
+    def alive_role_counts(self) -> Dict[Role, int]:
+        return {role: len(players) for role, players in self.alive_by_role.items() if players}
+
+    def alive_players(self) -> List[Player]:
+        self.check()
+        return list(self.alive.values())
+
+    def check(self):
+        if not self.debug:
+            return
+        fresh = RoleIndex()
+        for player in self.members.values():
+            fresh.add(player)
+        assert set(self.alive) == set(fresh.alive), 'RoleIndex.alive is out of sync'
+        for name in ('by_role', 'alive_by_role'):
+            got = {k: set(v) for k, v in getattr(self, name).items() if v}
+            want = {k: set(v) for k, v in getattr(fresh, name).items() if v}
+            assert got == want, f'RoleIndex.{name} is out of sync'
+        assert +self.party_count == +fresh.party_count, 'RoleIndex.party_count is out of sync'
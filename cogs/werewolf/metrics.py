@@ -0,0 +1,275 @@
+"""Per-phase latency, outbound message and event-loop lag metrics in Prometheus format.
+
+Everything here is off unless ``WEREWOLF_METRICS=1`` is set before the cog is
+imported. :func:`instrument` then returns the methods it decorates unchanged and
+:class:`MeteredTransport` is never created, so a disabled build pays nothing.
+
+When enabled, the cog exposes :data:`REGISTRY` as text on
+``127.0.0.1:$WEREWOLF_METRICS_PORT`` and/or rewrites ``$WEREWOLF_METRICS_FILE``
+every ``$WEREWOLF_METRICS_INTERVAL`` seconds (default 15).
+"""
+from __future__ import annotations
+
+import asyncio
+import bisect
+import contextlib
+import functools
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, TYPE_CHECKING
+
+from cogs.werewolf.dispatch import BatchReport
+from cogs.werewolf.transport import Transport
+
+if TYPE_CHECKING:
+    from cogs.werewolf.session import Session
+
+__all__ = (
+    'ENABLED',
+    'Histogram',
+    'Counter',
+    'Registry',
+    'REGISTRY',
+    'MeteredTransport',
+    'instrument',
+    'measure',
+    'LagMonitor',
+    'serve',
+    'dump',
+)
+
+log = logging.getLogger(__name__)
+
+ENABLED: bool = bool(os.environ.get('WEREWOLF_METRICS'))
+
+SECONDS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+COUNTS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names: Sequence[str], values: Labels, extra: str = '') -> str:
+    pairs = [f'{k}="{_escape(v)}"' for k, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Histogram:
+    """Cumulative buckets, a sum and a count per label set."""
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str], buckets: Sequence[float] = SECONDS):
+        self.name: str = name
+        self.help: str = help_text
+        self.labels: Tuple[str, ...] = tuple(labels)
+        self.buckets: Tuple[float, ...] = tuple(buckets)
+        # labels -> [count per bucket (the last one is +Inf), sum]
+        self.series: Dict[Labels, List[Any]] = {}
+
+    def observe(self, value: float, *labels: str):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        for labels, (counts, total) in sorted(self.series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = 'le="%s"' % ('+Inf' if bound == float('inf') else _number(bound))
+                lines.append(f'{self.name}_bucket{_labels(self.labels, labels, le)} {cumulative}')
+            lines.append(f'{self.name}_sum{_labels(self.labels, labels)} {_number(total)}')
+            lines.append(f'{self.name}_count{_labels(self.labels, labels)} {cumulative}')
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labels: Sequence[str]):
+        self.name: str = name
+        self.help: str = help_text
+        self.labels: Tuple[str, ...] = tuple(labels)
+        self.series: Dict[Labels, float] = {}
+
+    def inc(self, amount: float, *labels: str):
+        self.series[labels] = self.series.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        for labels, value in sorted(self.series.items()):
+            lines.append(f'{self.name}{_labels(self.labels, labels)} {_number(value)}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: List[Any] = []
+        self.phase_seconds = self.add(Histogram(
+            'werewolf_phase_seconds', 'Wall time of a session phase.', ('phase', 'guild'),
+        ))
+        self.phase_messages = self.add(Histogram(
+            'werewolf_phase_messages', 'Posts and DMs sent during a session phase.', ('phase', 'guild'), COUNTS,
+        ))
+        self.messages = self.add(Counter(
+            'werewolf_messages_total', 'Posts and DMs sent by sessions.', ('kind', 'guild'),
+        ))
+        self.loop_lag = self.add(Histogram(
+            'werewolf_loop_lag_seconds', 'How late the event loop woke up, seen by each running game.', ('guild',),
+        ))
+
+    def add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return '\n'.join(line for metric in self.metrics for line in metric.render()) + '\n'
+
+
+REGISTRY = Registry()
+
+
+def _guild(session: Session) -> str:
+    guild = session.guild
+    return str(guild.id) if guild is not None else ''
+
+
+class MeteredTransport(Transport):
+    """Counts what a session sends, then hands everything to the wrapped transport."""
+
+    def __init__(self, inner: Transport, guild: str):
+        self.inner: Transport = inner
+        self.guild: str = guild
+        self.scheduler = inner.scheduler
+        self.router = inner.router
+        self.sent: int = 0
+
+    def __getattr__(self, item):
+        return getattr(self.inner, item)
+
+    def post(self, content: str):
+        if content:
+            self.sent += 1
+            REGISTRY.messages.inc(1, 'post', self.guild)
+        self.inner.post(content)
+
+    async def send_all(self, messages) -> BatchReport:
+        report = await self.inner.send_all(messages)
+        self.sent += report.sent
+        REGISTRY.messages.inc(report.sent, 'dm', self.guild)
+        return report
+
+    async def flush(self):
+        await self.inner.flush()
+
+    def ask(self, member, q_type, options, prompt, *, allow_skip=False, replace=False):
+        return self.inner.ask(member, q_type, options, prompt, allow_skip=allow_skip, replace=replace)
+
+    async def wait(self, question, timeout=None):
+        return await self.inner.wait(question, timeout)
+
+    def expire(self, question):
+        self.inner.expire(question)
+
+
+@contextlib.contextmanager
+def measure(session: Session, phase: str):
+    """Record the wall time and messages sent of the ``with`` block as ``phase``."""
+    transport = session.transport
+    sent = getattr(transport, 'sent', 0)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        guild = _guild(session)
+        REGISTRY.phase_seconds.observe(time.perf_counter() - start, phase, guild)
+        REGISTRY.phase_messages.observe(getattr(transport, 'sent', 0) - sent, phase, guild)
+
+
+def instrument(phase: str) -> Callable:
+    """Measure every call of a :class:`Session` method as ``phase``; a no-op when disabled."""
+
+    def decorator(func):
+        if not ENABLED:
+            return func
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapper(session, *args, **kwargs):
+                with measure(session, phase):
+                    return await func(session, *args, **kwargs)
+        else:
+            @functools.wraps(func)
+            def wrapper(session, *args, **kwargs):
+                with measure(session, phase):
+                    return func(session, *args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+class LagMonitor:
+    """Wakes up every ``interval`` seconds and records how late it was for each running game."""
+
+    def __init__(self, guilds: Callable[[], Iterable[int]], interval: float = 0.5):
+        self.guilds = guilds
+        self.interval: float = interval
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(loop.time() - start - self.interval, 0.0)
+            for guild in self.guilds():
+                REGISTRY.loop_lag.observe(lag, str(guild))
+
+    def close(self):
+        if self._task is not None:
+            self._task.cancel()
+
+
+async def serve(port: int, host: str = '127.0.0.1') -> asyncio.AbstractServer:
+    """Answer every HTTP request on ``host:port`` with the current metrics."""
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            await reader.readuntil(b'\r\n\r\n')
+            body = REGISTRY.render().encode()
+            writer.write(
+                b'HTTP/1.1 200 OK\r\nContent-Type: text/plain; version=0.0.4\r\n'
+                b'Content-Length: %d\r\nConnection: close\r\n\r\n' % len(body) + body
+            )
+            await writer.drain()
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, host, port)
+
+
+async def dump(path: str, interval: float = 15):
+    """Rewrite ``path`` with the current metrics every ``interval`` seconds."""
+    tmp = f'{path}.tmp'
+    while True:
+        try:
+            with open(tmp, 'w', encoding='utf-8') as f:
+                f.write(REGISTRY.render())
+            os.replace(tmp, path)
+        except OSError:
+            log.exception('Failed to write metrics to %s', path)
+        await asyncio.sleep(interval)
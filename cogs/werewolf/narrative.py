@@ -0,0 +1,313 @@
+"""The stories told when players die and when a game ends.
+
+Every message is a :class:`Template` compiled once at import into a function that
+renders it in a single join. ``Role.eaten`` and ``Role.killed`` keep their
+``%s`` form in the role text catalog and are compiled here as well, the first
+time a role dies that way, so importing this module reads no role text.
+
+A game end is looked up by :class:`WinType`. When nobody wins, the roles that are
+still alive (the survivor pattern) decide which closing paragraphs are told.
+"""
+from __future__ import annotations
+
+import string
+from typing import Callable, Dict, FrozenSet, List, Mapping, Optional, Sequence, Tuple, TYPE_CHECKING
+
+from cogs.werewolf.enum import KillMethod, PlayerFlag, WinType
+from cogs.werewolf.roles import ROLES, Role
+
+if TYPE_CHECKING:
+    from cogs.werewolf.session import Player
+
+__all__ = (
+    'Template',
+    'WIN',
+    'NO_ONE',
+    'EATEN',
+    'KILLED',
+    'win_message',
+    'endings',
+    'no_one_message',
+    'sk_hunter_message',
+    'survivors_message',
+    'death_message',
+    'night_death',
+    'lynch_message',
+    'lover_suicide',
+    'hunter_final_shot',
+)
+
+_FORMATTER = string.Formatter()
+
+
+class Template:
+    """A message compiled once into a function that renders it in a single join.
+
+    The literal text is split at its ``{field}`` placeholders and turned into one
+    f-string over the fields, so rendering never rebuilds intermediate strings.
+    """
+    __slots__ = ('source', 'literals', 'fields', 'render')
+
+    def __init__(self, source: str):
+        literals: List[str] = []
+        fields: List[str] = []
+        pending = ''
+        for literal, field, spec, conversion in _FORMATTER.parse(source):
+            pending += literal
+            if field is None:
+                continue
+            if spec or conversion or not field.isidentifier() or field.startswith('_'):
+                raise ValueError(f'Only plain {{name}} fields are supported: {source!r}')
+            literals.append(pending)
+            fields.append(field)
+            pending = ''
+        literals.append(pending)
+        self.source: str = source
+        self.literals: Tuple[str, ...] = tuple(literals)
+        self.fields: Tuple[str, ...] = tuple(fields)
+        self.render: Callable[..., str] = self._compile()
+
+    def __repr__(self):
+        return f'<Template fields={self.fields}>'
+
+    def _compile(self) -> Callable[..., str]:
+        # The literals become keyword defaults, so the body is one f-string of locals.
+        params = ''.join(f'{n}, ' for n in dict.fromkeys(self.fields))
+        defaults = ', '.join(f'_{i}=_{i}' for i in range(len(self.literals)))
+        body = '{_0}' + ''.join(f'{{{n}}}{{_{i}}}' for i, n in enumerate(self.fields, 1))
+        namespace = {f'_{i}': n for i, n in enumerate(self.literals)}
+        exec(f"def render({params}*, {defaults}):\n    return f'{body}'", namespace)
+        return namespace['render']
+
+    @classmethod
+    def percent(cls, source: str, field: str = 'name') -> Template:
+        """Compile a ``%s`` message in which every ``%s`` stands for ``field``."""
+        return cls(source.replace('{', '{{').replace('}', '}}').replace('%s', '{%s}' % field))
+
+
+def _compile(table: Mapping) -> Dict:
+    return {k: Template(v) for k, v in table.items()}
+
+
+class _Stories(dict):
+    """Role -> its compiled ``key`` story from the catalog, or ``None``; filled in as roles are looked up."""
+
+    def __init__(self, key: str):
+        super().__init__()
+        self.key = key
+
+    def __missing__(self, role: Role) -> Optional[Template]:
+        text = role.text(self.key)
+        template = self[role] = Template.percent(text) if text else None
+        return template
+
+    def get(self, role: Role, default=None) -> Optional[Template]:
+        template = self[role]
+        return default if template is None else template
+
+
+WIN: Dict[WinType, Template] = _compile({
+    WinType.Villager: "#人类胜！ ",
+    WinType.Wolf: "#狼人胜！ 看来这届村民不行啊！",
+    WinType.Tanner: "糟糕！你们竟然昏了头脑把皮匠公审了！#皮匠胜。",
+    WinType.Arsonist: "最后，除了🔥纵火犯的家，村子里只剩一片火海。#纵火犯胜...",
+    WinType.Cult: "次日清晨，所有人👤邪教徒走上街头，最后一个人也受洗成为👤邪教徒 —— #邪教徒胜！",
+    WinType.SerialKiller: "唯一活着的竟然是🔪变态杀人狂！！ #杀人魔胜",
+    WinType.Lovers: "胜利属于爱神！ #情侣胜！",
+    WinType.NoOne: "所有人都死了。这届人类不行啊。 #无人胜 #空城",
+})
+
+# Told before the win message when the winner still has someone left to finish off.
+FINAL_BLOW: Dict[WinType, Template] = _compile({
+    WinType.Arsonist:
+        "只剩🔥纵火犯 {winner}和 {other} ... 突然 {winner} 笑起来, 划了一根火柴，"
+        "丢向了了 {other}，{other} 瞬间燃烧起来了... \n",
+    WinType.SerialKiller:
+        "这天早上，剩下的两个市民走到广场中央，🔪变态杀人狂 {winner} 看了一眼 {other} ，"
+        "脸上露出邪恶的笑容，「唰！」的一声抽出一把匕首，手起刀落，只见 {other} 已倒下。"
+        "整个城市只剩下 {winner} 是活着的…… #杀人狂胜",
+})
+
+SK_HUNTER = Template(
+    "曙光乍现， {killer} 和 {hunter} 并排前行，忽然🔪变态杀人狂 {killer} 拔出了匕首，"
+    "跳到 {hunter} 身上，把匕首狠狠刺入 {hunter} 胸部的同时，猎人 {hunter} 也反应迅敏地拔出枪，"
+    "对着 {killer} 的脸就是一枪，把 {killer} 的头打爆了。\n {hunter} 也好不到哪儿去，"
+    "匕首已经刺穿了他的心脏……最后两人都死了……\n这就是传说中的相爱相杀？ #空城"
+)
+
+# How a survivor of a game nobody won leaves the village.
+ENDING: Dict[Role, Template] = _compile({
+    ROLES.Tanner: "胜利还是属于死亡，{name} 在清晨的阳光中走入了烈火，世界最终会归尽。 #👺皮匠胜。\n",
+    ROLES.Sorcerer: "清晨的雾气消散，🔮暗黑法师{name}离开这个空无一人村庄，寻找下一个繁盛的村庄。 #暗黑法师胜\n",
+    ROLES.Thief: "👻小偷{name}离开了这个落后的小村庄，去追寻 诗和远方 （划去）..更好更多的职业 #小偷胜\n",
+    ROLES.Doppelganger:
+        "啊！一个连自己唯一的任务都无法完成的人，其生活能有多悲惨？夺取他人外表的能力只是一个传说吗？我们永远也不会知道！"
+        "现在村子里只有一个人，没有人可以模仿。他们唯一能做的就是模仿镜子里的人！这就是他们的能力。 #替身胜\n",
+})
+
+# Survivor pattern of a game nobody won -> whose endings are told, in order. A surviving
+# Tanner next to someone else is not told; that someone's ending is.
+NO_ONE: Dict[FrozenSet[Role], Tuple[Role, ...]] = {
+    frozenset(pattern): told for pattern, told in (
+        ((ROLES.Tanner,), (ROLES.Tanner,)),
+        ((ROLES.Sorcerer,), (ROLES.Sorcerer,)),
+        ((ROLES.Thief,), (ROLES.Thief,)),
+        ((ROLES.Doppelganger,), (ROLES.Doppelganger,)),
+        ((ROLES.Tanner, ROLES.Sorcerer), (ROLES.Sorcerer,)),
+        ((ROLES.Tanner, ROLES.Thief), (ROLES.Thief,)),
+        ((ROLES.Tanner, ROLES.Doppelganger), (ROLES.Doppelganger,)),
+        ((ROLES.Sorcerer, ROLES.Thief), (ROLES.Sorcerer, ROLES.Thief)),
+        ((ROLES.Sorcerer, ROLES.Doppelganger), (ROLES.Sorcerer, ROLES.Doppelganger)),
+        ((ROLES.Thief, ROLES.Doppelganger), (ROLES.Thief, ROLES.Doppelganger)),
+        ((ROLES.Sorcerer, ROLES.Thief, ROLES.Doppelganger), (ROLES.Sorcerer, ROLES.Thief, ROLES.Doppelganger)),
+    )
+}
+
+SURVIVORS = Template("幸存者们: {alive}/{total}\n")
+SURVIVOR = Template("{mention}: {state}{flee}{love} {result}\n")
+
+# Everything after the mention depends on four bits, so each of the 16 line tails is
+# rendered here once: (dead, flee and win flags, in love) -> tail.
+_SURVIVOR_FLAGS = int(PlayerFlag.Dead | PlayerFlag.Flee | PlayerFlag.Win)
+SURVIVOR_TAIL: Dict[Tuple[int, bool], str] = {
+    (dead | flee | win, love): SURVIVOR.render(
+        mention='',
+        state='❌ 死亡' if dead else '✅ 存活',
+        flee='(🏳️ 已逃跑)' if flee else '',
+        love='❤️' if love else '',
+        result='胜利' if win else '失败',
+    )
+    for dead in (0, int(PlayerFlag.Dead))
+    for flee in (0, int(PlayerFlag.Flee))
+    for win in (0, int(PlayerFlag.Win))
+    for love in (False, True)
+}
+PLAYED = Template("游戏进行了：{time}")
+
+EATEN: Dict[Role, Optional[Template]] = _Stories('eaten')
+KILLED: Dict[Role, Optional[Template]] = _Stories('killed')
+
+LOVER_SUICIDE = Template(
+    "当看到 {lover} 倒在血泊中时， {name} 不敢相信眼前发生的一切，撕吼着急急冲到他身边，可他已经断气..."
+    "{name} 顿时崩溃了，整个人像被掏空一样，趴在另一半身上恸哭不止。"
+    "最后他实在无法承受失去另一半的痛苦，找到一把枪自杀了。{role}"
+)
+ROLE = Template("{name}是个{emoji}{role}")
+
+# How a night death is told when the role has no story of its own for it.
+NIGHT_DEATH: Dict[KillMethod, Template] = _compile({
+    KillMethod.Eat: "村民们一觉醒来，发现 {name} 的家门被撞开，屋里只剩一地狼毛和血迹…… {role}",
+    KillMethod.SerialKilled: "{name} 被发现死在自家床上，身上满是刀伤……🔪变态杀人狂又出手了。 {role}",
+    KillMethod.VisitWolf: "{name} 昨晚敲开了一户人家的门，开门的却是一只🐺狼人…… {role}",
+    KillMethod.VisitVictim: "{name} 昨晚恰好留宿在狼人的猎物家中，一起被吃掉了。 {role}",
+    KillMethod.VisitKiller: "{name} 昨晚拜访了🔪变态杀人狂的家，就再也没有出来。 {role}",
+    KillMethod.GuardWolf: "{name} 昨晚守护了一只🐺狼人，结果成了狼人的夜宵。 {role}",
+    KillMethod.GuardKiller: "{name} 昨晚守护了🔪变态杀人狂，却死在了被守护者的刀下。 {role}",
+    KillMethod.Hunt: "💂邪教捕手找到了 {name} 藏起来的祭坛，当场处决了他。 {role}",
+    KillMethod.HunterCult: "{name} 想为💂邪教捕手施洗，仪式还没开始就被识破，死于非命。 {role}",
+    KillMethod.HunterShot: "{name} 昨晚闯进了🎯猎人的家，迎面就是一枪。 {role}",
+    KillMethod.Burn: "{name} 的房子昨晚燃起了大火，等村民们赶到时已经太迟了。 {role}",
+    KillMethod.VisitBurning: "{name} 昨晚待在一栋着火的房子里，没能逃出来。 {role}",
+})
+NIGHT_DEATH_DEFAULT = Template("{name} 昨晚死了。 {role}")
+
+DAY = Template("☀️天亮了，第 {day} 天。大家有 {time} 秒的时间讨论昨晚发生的事，找出隐藏在村子里的凶手。\n{alive}")
+LYNCH_START = Template("讨论结束！请在 {time} 秒内私聊机器人投票，选出今天要处死的人。")
+LYNCH = Template("村民们把 {name} 押上了绞刑架，在众人的注视下处死了他。 {role}")
+LYNCH_TANNER = Template("村民们把 {name} 押上了绞刑架……绳索收紧的一瞬间，{name} 竟然笑了。 {role}")
+LYNCH_PRINCE = Template("就在绞索即将套上 {name} 的脖子时，他亮出了王室的徽章。👑王子不能被处死，村民们只好放了他。")
+LYNCH_NONE = "村民们争论不休，始终没能达成一致，今天没有人被处死。"
+MAYOR = Template("🎖{name} 亮出了委任状，他是村长！从现在起他的一票顶两票。")
+PACIFIST = Template("☮️{name} 站上广场发表了一场和平演说，村民们被打动了，今天决定不处死任何人。")
+
+# (lynched, outcome) -> what the channel sees of a hunter's final shot.
+HUNTER: Dict[Tuple[bool, str], Template] = _compile({
+    (True, 'timeout'): "当绳索快套紧{hunter}的脖子时，他摸索着手枪想杀个人来陪葬，但却慢了一步，因为颈部清脆的断裂声已经响起...",
+    (False, 'timeout'): "似乎对{hunter}的打击太大了，以至于他们甚至无法伸手去拿自己的武器，躺在血泊中……",
+    (True, 'skip'): "{hunter}看着围观的一群愚民，拔出手枪，想找人陪葬。最终他没有扣下扳机，而是选择接受上天的安排，坦然面对死亡...",
+    (False, 'skip'): "{hunter} 躺在地上，还剩下最后一口气，原本还有机会射杀一人来陪葬，他却放弃了……他决定听天由命……",
+    (True, 'shot'):
+        "绳索套上 {hunter} 的脖子时，不甘被处死的他想找人陪葬，他迅速掏出一把枪，瞄准某处，扣动扳机，"
+        "只见 {target} 满脸讶然之色，缓缓倒在地上。 {target} 当场死亡。 {role}",
+    (False, 'shot'):
+        "{hunter}倒在地上快死了…… 但最后一刻他抓住了他的手枪，向{target}开火，{target}在两眼之间中了一枪。"
+        "{target} 当场死亡。 {role}",
+})
+HUNTER_ELDER = Template("🎯猎人{hunter} 向长老 {target}开枪 ，但很快就后悔了，因此{target}放弃了他的身份，成为了一位普通村民。")
+
+
+def _role(player: Player) -> str:
+    role = player.role
+    return ROLE.render(name=player.name, emoji=role.emoji, role=role.name)
+
+
+def win_message(teams: WinType, winner: Optional[Player] = None, other: Optional[Player] = None) -> str:
+    win = WIN.get(teams, WIN[WinType.Villager]).render()
+    if winner is not None and other is not None and teams in FINAL_BLOW:
+        return FINAL_BLOW[teams].render(winner=winner.name, other=other.name) + win
+    return win
+
+
+def endings(survivors: Sequence[Player]) -> List[Player]:
+    """The survivors of a game nobody won whose endings are told, in telling order."""
+    by_role = {p.role: p for p in survivors}
+    if len(by_role) != len(survivors):
+        return []
+    told = NO_ONE.get(frozenset(by_role), ())
+    return [by_role[r] for r in told]
+
+
+def no_one_message(told: Sequence[Player]) -> str:
+    out = [ENDING[p.role].render(name=p.name) for p in told if p.role in ENDING]
+    out.append(WIN[WinType.NoOne].render())
+    return ''.join(out)
+
+
+def sk_hunter_message(killer: Optional[Player], hunter: Optional[Player]) -> str:
+    if killer is None or hunter is None:
+        return WIN[WinType.NoOne].render()
+    return WIN[WinType.NoOne].render() + SK_HUNTER.render(killer=killer.name, hunter=hunter.name)
+
+
+def survivors_message(players: Sequence[Player], alive: int, played) -> str:
+    """The closing table: one line per player, ordered by ``players``."""
+    out = [SURVIVORS.render(alive=alive, total=len(players))]
+    out += [p.member.mention + SURVIVOR_TAIL[p.flags & _SURVIVOR_FLAGS, not not p.in_love] for p in players]
+    out.append(PLAYED.render(time=played))
+    return ''.join(out)
+
+
+def death_message(player: Player, kill_method: KillMethod) -> Optional[str]:
+    """The role's own story of being eaten by wolves or murdered, if it has one."""
+    table = EATEN if kill_method is KillMethod.Eat else KILLED if kill_method is KillMethod.SerialKilled else None
+    template = table.get(player.role) if table is not None else None
+    return template.render(name=player.name) if template is not None else None
+
+
+def night_death(player: Player, kill_method: KillMethod) -> str:
+    """What the village finds at dawn of ``player``, who died at night."""
+    story = death_message(player, kill_method)
+    if story is not None:
+        return story
+    return NIGHT_DEATH.get(kill_method, NIGHT_DEATH_DEFAULT).render(name=player.name, role=_role(player))
+
+
+def lynch_message(player: Player) -> str:
+    template = LYNCH_TANNER if player.role is ROLES.Tanner else LYNCH
+    return template.render(name=player.name, role=_role(player))
+
+
+def lover_suicide(dead: Player, lover: Player) -> str:
+    """``lover`` finds ``dead`` and follows them."""
+    return LOVER_SUICIDE.render(lover=dead.name, name=lover.name, role=_role(lover))
+
+
+def hunter_final_shot(hunter: Player, kill_method: KillMethod, outcome: str, target: Optional[Player] = None) -> str:
+    """``outcome`` is one of ``timeout``, ``skip``, ``shot`` and ``elder``."""
+    values = {'hunter': hunter.name}
+    if target is not None:
+        values['target'] = target.name
+        values['role'] = _role(target)
+    if outcome == 'elder':
+        return HUNTER_ELDER.render(hunter=hunter.name, target=target.name)
+    return HUNTER[kill_method == KillMethod.Lynch, outcome].render(**values)
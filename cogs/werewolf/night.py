@@ -0,0 +1,352 @@
+"""Resolve what everyone chose during a night, in one ordered pass.
+
+:class:`NightResolver` reads each living player's answered night question once,
+building the actions by :class:`QuestionType` and a map from every house to the
+players who visited it. The steps then run in a fixed order: freeze, cupid,
+guard, harlot visits, the wolves' majority kill, the serial killer, cult
+conversion, the cultist hunter, the chemist, the arsonist, the seers and the
+thief. Seers and the thief come last, so they see and steal the roles the night
+left behind. Each step looks its targets up in those
+maps instead of scanning the players again, so a night costs O(players) however
+the roles are mixed.
+
+The resolver changes roles and flags as it goes but kills nobody. The deaths it
+decides are returned in :attr:`Night.deaths` for :meth:`Session.resolve_night`
+to hand to :meth:`Session.kill_players` in one batch.
+"""
+from __future__ import annotations
+
+import random
+from dataclasses import dataclass, field
+from typing import Any, Dict, FrozenSet, List, Optional, Set, Tuple, TYPE_CHECKING
+
+import qq
+from qq.utils import MISSING
+
+from cogs.werewolf.cascade import Death
+from cogs.werewolf.enum import KillMethod, QuestionType
+from cogs.werewolf.roles import ROLES, Role
+
+if TYPE_CHECKING:
+    from cogs.werewolf.session import Player, Session
+
+__all__ = (
+    'IGNITE',
+    'Night',
+    'NightResolver',
+)
+
+WOLVES: FrozenSet[Role] = ROLES.wolves
+PACK: FrozenSet[Role] = ROLES.pack
+# Roles a cultist cannot baptise; the conversion just fails.
+UNCONVERTIBLE: FrozenSet[Role] = PACK | {ROLES.SerialKiller, ROLES.Arsonist, ROLES.Doppelganger}
+# Actions that take a player out of their own house and into the target's.
+VISITS: FrozenSet[QuestionType] = frozenset((
+    QuestionType.Visit, QuestionType.Guard, QuestionType.Hunt, QuestionType.SerialKill, QuestionType.Convert,
+))
+
+FROZEN = "昨晚一阵寒风吹过，你被冻在了家里，什么也没能做。"
+
+
+class _Ignite:
+    """The arsonist's menu entry for setting every doused house on fire."""
+    name = "🔥 放火"
+
+    def __repr__(self):
+        return '<IGNITE>'
+
+
+IGNITE = _Ignite()
+
+
+@dataclass
+class Night:
+    """What a night came to: who dies, and the private messages telling players about it."""
+    deaths: List[Death] = field(default_factory=list)
+    messages: List[Tuple[qq.Member, str]] = field(default_factory=list)
+    saved: int = 0
+
+
+class NightResolver:
+    def __init__(self, session: Session, rng: Any = random):
+        self.session: Session = session
+        self.rng = rng
+        self.night: Night = Night()
+        self.actions: Dict[QuestionType, List[Tuple[Player, Any]]] = {}
+        self.visitors: Dict[Player, List[Player]] = {}
+        self.frozen: Set[Player] = set()
+        self.guarded: Dict[Player, Player] = {}
+        self.away: Set[Player] = set()
+        self.dying: Set[Player] = set()
+
+    def resolve(self) -> Night:
+        self._collect()
+        self._cupid()
+        self._guard()
+        self._visit()
+        self._eat()
+        self._serial_kill()
+        self._convert()
+        self._hunt()
+        self._brew()
+        self._burn()
+        self._see()
+        self._steal()
+        self._role_model()
+        return self.night
+
+    def tell(self, player: Player, content: str):
+        self.night.messages.append((player.member, content))
+
+    def kill(self, player: Player, method: KillMethod, killer: Optional[Player] = None, final_shot: bool = True):
+        if player in self.dying:
+            return
+        self.dying.add(player)
+        self.night.deaths.append(Death(player, method, killer, final_shot))
+
+    def at_home(self, player: Player) -> bool:
+        return player not in self.away and player not in self.dying
+
+    def _collect(self):
+        """One pass over the players: answered questions, then the snow wolf's freeze."""
+        chosen: List[Tuple[Player, QuestionType, Any]] = []
+        for p in self.session.players.values():
+            if p.drunk:
+                # Whoever was too drunk to act tonight is sober by the next one.
+                p.drunk = False
+                continue
+            question = p.current_question
+            if p.dead or question is MISSING or question is None:
+                continue
+            target = question.answer
+            if target is None:
+                continue
+            if question.q_type is QuestionType.Freeze:
+                self.frozen.add(target)
+            else:
+                chosen.append((p, question.q_type, target))
+        for target in self.frozen:
+            if target.current_question is not MISSING:
+                self.tell(target, target.role.frozen or FROZEN)
+        for p, q_type, target in chosen:
+            if p in self.frozen:
+                continue
+            self.actions.setdefault(q_type, []).append((p, target))
+            if q_type in VISITS:
+                self.visitors.setdefault(target, []).append(p)
+
+    def _majority(self, votes: List[Tuple[Player, Player]]) -> Optional[Player]:
+        """The most chosen target; a tie is broken at random."""
+        tally: Dict[Player, int] = {}
+        for _, target in votes:
+            tally[target] = tally.get(target, 0) + 1
+        if not tally:
+            return None
+        top = max(tally.values())
+        leaders = [n for n, count in tally.items() if count == top]
+        return leaders[0] if len(leaders) == 1 else self.rng.choice(leaders)
+
+    def _cupid(self):
+        """Cupid picks one lover; the other is whoever fate pairs them with."""
+        for cupid, first in self.actions.get(QuestionType.Lover1, ()):
+            others = [n for n in self.session.alive_players if n is not first and not n.in_love]
+            if first.in_love or not others:
+                continue
+            second = self.rng.choice(others)
+            first.in_love, second.in_love = second, first
+            self.tell(cupid, f"你的箭射中了 {first.name} 和 {second.name}，他们成为了情侣。")
+            self.tell(first, f"你被爱神之箭射中，爱上了 {second.name}（{second.role.emoji}{second.role.name}）。")
+            self.tell(second, f"你被爱神之箭射中，爱上了 {first.name}（{first.role.emoji}{first.role.name}）。")
+
+    def _guard(self):
+        for angel, target in self.actions.get(QuestionType.Guard, ()):
+            self.guarded[target] = angel
+            if target.role in PACK and self.rng.random() < 0.5:
+                self.kill(angel, KillMethod.GuardWolf, target)
+            elif target.role is ROLES.SerialKiller and self.rng.random() < 0.5:
+                self.kill(angel, KillMethod.GuardKiller, target)
+
+    def _visit(self):
+        for harlot, target in self.actions.get(QuestionType.Visit, ()):
+            self.away.add(harlot)
+            if target.role in PACK:
+                self.kill(harlot, KillMethod.VisitWolf, target)
+            elif target.role is ROLES.SerialKiller:
+                self.kill(harlot, KillMethod.VisitKiller, target)
+            elif target.role is ROLES.Cultist:
+                self.tell(harlot, f"你在 {target.name} 家里隐约看到了一座邪教祭坛，{target.name} 是👤邪教徒！")
+            else:
+                self.tell(harlot, f"你在 {target.name} 家里度过了平静的一夜，{target.name} 不是狼人。")
+
+    def _eat(self):
+        votes = [(p, t) for p, t in self.actions.get(QuestionType.Kill, ()) if p.role in WOLVES]
+        victim = self._majority(votes)
+        if victim is None or victim.dead or victim in self.dying:
+            return
+        wolves = [p for p, _ in votes]
+        if victim in self.away:
+            for wolf in wolves:
+                self.tell(wolf, f"你们闯进了 {victim.name} 的家，可是屋里空无一人。")
+            return
+        angel = self.guarded.get(victim)
+        if angel is not None and angel not in self.dying:
+            self.night.saved += 1
+            self.tell(angel, f"昨晚狼人袭击了 {victim.name}，幸好有你守护，{victim.name} 逃过一劫！")
+            for wolf in wolves:
+                self.tell(wolf, f"你们扑向 {victim.name} 时，守护天使挡在了门前。")
+            return
+        # Harlots who spent the night at the victim's house are eaten too.
+        for guest in self.visitors.get(victim, ()):
+            if guest.role is ROLES.Harlot:
+                self.kill(guest, KillMethod.VisitVictim, wolves[0])
+        role = victim.role
+        if role is ROLES.SerialKiller:
+            self.kill(self.rng.choice(wolves), KillMethod.SerialKilled, victim)
+            self.tell(victim, "昨晚狼人闯进了你家，你反手就解决了其中一只。")
+        elif role is ROLES.Hunter and self.rng.random() < 0.1 + 0.2 * len(wolves):
+            self.kill(self.rng.choice(wolves), KillMethod.HunterShot, victim)
+            if len(wolves) > 1:
+                self.kill(victim, KillMethod.Eat, wolves[0], final_shot=False)
+        elif role is ROLES.WiseElder and not victim.used_ability:
+            victim.used_ability = True
+            self.tell(victim, "昨晚狼人袭击了你，你凭借多年的智慧躲过了这一次。")
+        elif role is ROLES.Cursed:
+            victim.role = ROLES.Wolf
+            victim.changed_role_count += 1
+            self.tell(victim, "你被狼人咬了一口……诅咒应验了，现在你是🐺狼人了！")
+        elif self.session.index.alive_count(ROLES.AlphaWolf) and self.rng.random() < 0.2:
+            victim.bitten = True
+            self.tell(victim, "昨晚你被头狼咬了一口，却活了下来……你感觉身体正在发生变化。")
+        else:
+            self.kill(victim, KillMethod.Eat, wolves[0])
+            if role is ROLES.Drunk:
+                for wolf in wolves:
+                    wolf.drunk = True
+                    self.tell(wolf, "你们吃掉了酒鬼，现在醉得东倒西歪，明晚无法行动了。")
+
+    def _serial_kill(self):
+        for killer, victim in self.actions.get(QuestionType.SerialKill, ()):
+            if killer in self.dying or victim.dead or victim in self.dying:
+                continue
+            if victim in self.away:
+                self.tell(killer, f"你摸进了 {victim.name} 的家，可是屋里空无一人。")
+            elif victim in self.guarded:
+                self.night.saved += 1
+                self.tell(killer, f"你正要对 {victim.name} 下手，守护天使挡在了你面前。")
+            else:
+                self.kill(victim, KillMethod.SerialKilled, killer)
+
+    def _convert(self):
+        votes = [(p, t) for p, t in self.actions.get(QuestionType.Convert, ()) if p.role is ROLES.Cultist]
+        target = self._majority(votes)
+        if target is None or target.dead:
+            return
+        cultists = [p for p, _ in votes]
+        if not self.at_home(target) or target in self.guarded:
+            for cultist in cultists:
+                self.tell(cultist, f"你们没能找到 {target.name}，今晚的施洗失败了。")
+            return
+        if target.role is ROLES.CultistHunter:
+            newest = [p for p in cultists if p.converted_to_cult] or cultists
+            self.kill(newest[-1], KillMethod.HunterCult, target)
+        elif target.role in UNCONVERTIBLE:
+            for cultist in cultists:
+                self.tell(cultist, f"{target.name} 拒绝了你们的邀请，今晚的施洗失败了。")
+        elif target.role is ROLES.Hunter and self.rng.random() < 0.5:
+            # The hunter fends them off, and half the time shoots one of them.
+            if self.rng.random() < 0.5:
+                self.kill(self.rng.choice(cultists), KillMethod.HunterShot, target)
+            for cultist in cultists:
+                self.tell(cultist, f"🎯猎人 {target.name} 举枪把你们赶了出去，今晚的施洗失败了。")
+        else:
+            target.role = ROLES.Cultist
+            target.converted_to_cult = True
+            target.changed_role_count += 1
+            self.tell(target, "你被带去了邪教的入会仪式，现在你是👤邪教徒了！同伴：" + ', '.join(n.name for n in cultists))
+            for cultist in cultists:
+                self.tell(cultist, f"{target.name} 已受洗成为👤邪教徒。")
+
+    def _hunt(self):
+        for hunter, target in self.actions.get(QuestionType.Hunt, ()):
+            if hunter in self.dying or target.dead or target in self.dying:
+                continue
+            if target.role is ROLES.Cultist:
+                self.kill(target, KillMethod.Hunt, hunter)
+            else:
+                self.tell(hunter, f"{target.name} 不是邪教徒。")
+
+    def _brew(self):
+        """The chemist and their guest each swallow one pill; one of the two is poison."""
+        for chemist, target in self.actions.get(QuestionType.Chemistry, ()):
+            chemist.used_ability = False
+            if chemist in self.dying or target.dead or target in self.dying:
+                continue
+            if not self.at_home(target):
+                self.tell(chemist, f"你带着药去了 {target.name} 家，可是屋里空无一人。")
+                continue
+            loser, winner = (chemist, target) if self.rng.random() < 0.5 else (target, chemist)
+            self.kill(loser, KillMethod.Chemistry, chemist)
+            self.tell(winner, f"你和 {loser.name} 各吞下了一片药，你吃到的是糖。")
+
+    def _burn(self):
+        for arsonist, target in self.actions.get(QuestionType.Douse, ()):
+            if arsonist in self.dying:
+                continue
+            if target is not IGNITE:
+                target.doused = True
+                self.tell(arsonist, f"你悄悄给 {target.name} 的房子浇上了汽油。")
+                continue
+            for house in self.session.alive_players:
+                if not house.doused:
+                    continue
+                house.doused = False
+                if house is not arsonist and house not in self.away:
+                    self.kill(house, KillMethod.Burn, arsonist)
+                for guest in self.visitors.get(house, ()):
+                    if guest is not arsonist:
+                        self.kill(guest, KillMethod.VisitBurning, arsonist)
+
+    def _seen_as(self, p: Player, target: Player) -> Optional[str]:
+        role = target.role
+        if p.role is ROLES.Fool:
+            role = self.rng.choice([n for n in ROLES.all_role.values() if n is not ROLES.Fool])
+        elif p.role is ROLES.Sorcerer:
+            if role not in PACK and role is not ROLES.Seer:
+                return f"你没能从 {target.name} 身上感知到什么，{target.name} 既不是狼人也不是先知。"
+        elif p.role is ROLES.Oracle:
+            dealt = {n.role for n in self.session.players.values()} - {role}
+            role = self.rng.choice(list(dealt)) if dealt else ROLES.Villager
+            return f"{target.name} 不是{role.emoji}{role.name}。"
+        elif role is ROLES.Lycan:
+            role = ROLES.Villager
+        elif role is ROLES.WolfMan or (role is ROLES.Traitor and self.rng.random() < 0.5):
+            role = ROLES.Wolf
+        return f"{target.name} 是{role.emoji}{role.name}。"
+
+    def _see(self):
+        for p, target in self.actions.get(QuestionType.See, ()):
+            if p in self.dying or target.dead:
+                continue
+            self.tell(p, self._seen_as(p, target))
+
+    def _steal(self):
+        """The thief takes the target's role; in the full mode it is a coin flip and the two swap."""
+        full = self.session.setting.thief_full
+        for thief, target in self.actions.get(QuestionType.Thief, ()):
+            if thief in self.dying or target.dead or target in self.dying or target is thief:
+                continue
+            if full and self.rng.random() < 0.5:
+                self.tell(thief, f"你没能偷到 {target.name} 的能力。")
+                continue
+            role = target.role
+            target.role = ROLES.Thief if full else ROLES.Villager
+            target.changed_role_count += 1
+            thief.role = role
+            thief.changed_role_count += 1
+            self.tell(thief, f"你偷走了 {target.name} 的能力，现在你是{role.emoji}{role.name}了！")
+            self.tell(target, f"你的能力被偷走了，现在你是{target.role.emoji}{target.role.name}。")
+
+    def _role_model(self):
+        for p, target in self.actions.get(QuestionType.RoleModel, ()):
+            p.role_model = target
+            self.tell(p, f"你选择了 {target.name}。")
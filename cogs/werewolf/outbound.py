@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, List, Optional, Tuple
+
+import qq
+
+__all__ = (
+    'MESSAGE_LIMIT',
+    'split_message',
+    'TokenBucket',
+    'QueueStats',
+    'ChannelQueue',
+    'OutboundQueue',
+)
+
+log = logging.getLogger(__name__)
+
+MESSAGE_LIMIT = 2000
+
+
+def split_message(content: str, limit: int = MESSAGE_LIMIT) -> List[str]:
+    """Cut ``content`` into pieces of at most ``limit`` characters, at line breaks where it can."""
+    if len(content) <= limit:
+        return [content]
+    pieces: List[str] = []
+    current = ''
+    for line in content.split('\n'):
+        while len(line) > limit:
+            if current:
+                pieces.append(current)
+                current = ''
+            pieces.append(line[:limit])
+            line = line[limit:]
+        if not current:
+            current = line
+        elif len(current) + 1 + len(line) <= limit:
+            current += '\n' + line
+        else:
+            pieces.append(current)
+            current = line
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: int):
+        self.rate: float = rate
+        self.capacity: int = capacity
+        self.tokens: float = capacity
+        self.updated: float = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        self._refill()
+        while self.tokens < 1:
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+            self._refill()
+        self.tokens -= 1
+
+
+@dataclass
+class QueueStats:
+    depth: int = 0
+    posted: int = 0
+    sent: int = 0
+    failed: int = 0
+    last_latency: float = 0.0
+    max_latency: float = 0.0
+    total_latency: float = 0.0
+
+    @property
+    def merged(self) -> int:
+        return self.posted - self.depth - self.sent - self.failed
+
+    @property
+    def avg_latency(self) -> float:
+        done = self.posted - self.depth
+        return self.total_latency / done if done else 0.0
+
+
+class ChannelQueue:
+    """Posts to one channel in order, paced by a :class:`TokenBucket`.
+
+    Messages that are still waiting for a token when the next one arrives are merged
+    into a single send, as long as the result stays within ``limit`` characters. A
+    message longer than ``limit`` is split at line breaks into several sends.
+    """
+
+    def __init__(self, channel: qq.abc.Messageable, bucket: TokenBucket, limit: int = MESSAGE_LIMIT):
+        self.channel = channel
+        self.bucket: TokenBucket = bucket
+        self.limit: int = limit
+        self.pending: Deque[Tuple[str, float]] = deque()
+        self.stats: QueueStats = QueueStats()
+        self.idle: asyncio.Event = asyncio.Event()
+        self.idle.set()
+        self._task: Optional[asyncio.Task] = None
+
+    def post(self, content: str):
+        if not content:
+            return
+        now = time.monotonic()
+        for piece in split_message(content, self.limit):
+            self.pending.append((piece, now))
+            self.stats.posted += 1
+        self.stats.depth = len(self.pending)
+        self.idle.clear()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def _take(self) -> Tuple[str, int]:
+        content, _ = self.pending[0]
+        count = 1
+        while count < len(self.pending):
+            merged = content + '\n' + self.pending[count][0]
+            if len(merged) > self.limit:
+                break
+            content = merged
+            count += 1
+        return content, count
+
+    async def _run(self):
+        while self.pending:
+            await self.bucket.acquire()
+            content, count = self._take()
+            try:
+                await self.channel.send(content)
+            except Exception as e:
+                self.stats.failed += 1
+                log.warning('Failed to post to %s: %r', self.channel, e)
+            else:
+                self.stats.sent += 1
+            now = time.monotonic()
+            for _ in range(count):
+                _, queued = self.pending.popleft()
+                latency = now - queued
+                self.stats.total_latency += latency
+                self.stats.max_latency = max(self.stats.max_latency, latency)
+                self.stats.last_latency = latency
+            self.stats.depth = len(self.pending)
+        self.idle.set()
+
+    async def flush(self):
+        await self.idle.wait()
+
+    @property
+    def is_idle(self) -> bool:
+        return not self.pending and (self._task is None or self._task.done())
+
+
+class OutboundQueue:
+    """Per-channel outbound queues shared by every :class:`Session` of the cog.
+
+    ``rate`` and ``burst`` configure each channel's token bucket. A channel's queue
+    is dropped once a flush finds it idle, so only channels with games running keep
+    one; the next post to it starts a fresh queue.
+    """
+
+    def __init__(self, rate: float = 1.0, burst: int = 5, limit: int = MESSAGE_LIMIT):
+        self.rate: float = rate
+        self.burst: int = burst
+        self.limit: int = limit
+        self.queues: Dict[int, ChannelQueue] = {}
+
+    @staticmethod
+    def _key(channel: qq.abc.Messageable) -> int:
+        return getattr(channel, 'id', id(channel))
+
+    def queue(self, channel: qq.abc.Messageable) -> ChannelQueue:
+        key = self._key(channel)
+        queue = self.queues.get(key)
+        if queue is None:
+            queue = self.queues[key] = ChannelQueue(channel, TokenBucket(self.rate, self.burst), self.limit)
+        return queue
+
+    def post(self, channel: qq.abc.Messageable, content: str):
+        self.queue(channel).post(content)
+
+    async def flush(self, channel: Optional[qq.abc.Messageable] = None):
+        if channel is not None:
+            keys = [self._key(channel)]
+        else:
+            keys = list(self.queues)
+        await asyncio.gather(*(self.queues[n].flush() for n in keys if n in self.queues))
+        for key in keys:
+            queue = self.queues.get(key)
+            if queue is not None and queue.is_idle:
+                del self.queues[key]
+
+    @property
+    def depth(self) -> int:
+        return sum(n.stats.depth for n in self.queues.values())
+
+    def metrics(self) -> Dict[int, QueueStats]:
+        return {k: n.stats for k, n in self.queues.items()}
@@ -0,0 +1,105 @@
+"""cProfile for the phases of one live session, leaving every other game on the loop alone.
+
+The profiler is switched on only while the profiled session's own coroutine runs:
+:func:`_stepped` drives the phase one ``send`` at a time and enables the profiler
+just around each step. Whatever other guilds do while the phase waits is never
+recorded.
+"""
+from __future__ import annotations
+
+import cProfile
+import datetime
+import os
+import pstats
+import types
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Generator, List, Optional
+
+__all__ = (
+    'PhaseProfiler',
+    'hot_functions',
+)
+
+
+@types.coroutine
+def _stepped(coro, profile: cProfile.Profile) -> Generator[Any, Any, Any]:
+    value, error = None, None
+    while True:
+        profile.enable()
+        try:
+            if error is not None:
+                future = coro.throw(error)
+            else:
+                future = coro.send(value)
+        except StopIteration as e:
+            return e.value
+        finally:
+            profile.disable()
+        try:
+            value, error = (yield future), None
+        except BaseException as e:  # noqa, handed to the phase like asyncio would
+            value, error = None, e
+
+
+def hot_functions(stats: pstats.Stats, limit: int = 15) -> List[str]:
+    """The ``limit`` functions with the most own time, one line each."""
+    rows = sorted(stats.stats.items(), key=lambda n: n[1][2], reverse=True)[:limit]
+    lines = []
+    for (filename, line, name), (_, calls, own, total, _) in rows:
+        where = f'{os.path.basename(filename)}:{line}' if line else filename
+        lines.append(f'{own * 1000:8.1f} {total * 1000:8.1f} {calls:7d}  {name} ({where})')
+    return lines
+
+
+class PhaseProfiler:
+    """Profiles the next ``phases`` phases of a session, then writes a pstats file.
+
+    ``on_done(path, summary)`` is called once with the file written and a text
+    table of the hottest functions. The file opens with :mod:`pstats`, snakeviz or
+    flameprof.
+    """
+
+    def __init__(
+            self,
+            guild_id: int,
+            phases: int,
+            directory: str,
+            on_done: Callable[[Path, str], Any] = lambda path, summary: None,
+    ):
+        self.guild_id: int = guild_id
+        self.remaining: int = max(phases, 1)
+        self.directory: Path = Path(directory)
+        self.on_done = on_done
+        self.profile: cProfile.Profile = cProfile.Profile()
+        self.phases: List[str] = []
+        self.path: Optional[Path] = None
+
+    @property
+    def done(self) -> bool:
+        return self.path is not None
+
+    async def run(self, name: str, phase: Awaitable):
+        if self.done:
+            return await phase
+        try:
+            return await _stepped(phase.__await__(), self.profile)
+        finally:
+            self.phases.append(name)
+            self.remaining -= 1
+            if self.remaining <= 0:
+                self.finish()
+
+    def finish(self):
+        if self.done:
+            return
+        stamp = datetime.datetime.now().strftime('%Y%m%d-%H%M%S')
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.path = self.directory / f'{self.guild_id}-{stamp}.pstats'
+        self.profile.dump_stats(self.path)
+        stats = pstats.Stats(str(self.path))
+        summary = '\n'.join([
+            f'{len(self.phases)} phases ({", ".join(self.phases) or "none"}), {stats.total_tt * 1000:.1f} ms',
+            f'{"own ms":>8} {"cum ms":>8} {"calls":>7}  function',
+            *hot_functions(stats),
+        ])
+        self.on_done(self.path, summary)
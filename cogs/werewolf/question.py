@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Dict, List, Optional
+
+import qq
+
+from cogs.werewolf.enum import QuestionType
+
+__all__ = (
+    'Question',
+    'QuestionRouter',
+    'format_menu',
+)
+
+
+def format_menu(msg: str, option_str: List[str]) -> str:
+    msg += '\n请回复机器人其中一个序列号：'
+    for idx, name in enumerate(option_str):
+        msg += f'\n{idx}. {name}'
+    return msg
+
+
+class Question:
+    """A numbered menu sent to one member, answered through :attr:`future`.
+
+    The future resolves to the index of the chosen option, or is cancelled once the
+    question expires. With ``allow_skip`` the member may also answer ``-1``.
+    """
+
+    def __init__(
+            self, member: qq.Member, q_type: QuestionType, options: List[Any], prompt: str, allow_skip: bool = False
+    ):
+        self.member = member
+        self.q_type: QuestionType = q_type
+        self.options: List[Any] = options
+        self.prompt: str = prompt
+        self.allow_skip: bool = allow_skip
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+
+    def __repr__(self):
+        return f'<Question member={self.member} q_type={self.q_type} options={len(self.options)}>'
+
+    @property
+    def done(self) -> bool:
+        return self.future.done()
+
+    @property
+    def choice(self) -> Optional[int]:
+        if self.future.done() and not self.future.cancelled():
+            return self.future.result()
+        return None
+
+    @property
+    def answer(self) -> Any:
+        choice = self.choice
+        return None if choice is None or choice < 0 else self.options[choice]
+
+    def resolve(self, choice: int) -> bool:
+        if self.future.done():
+            return False
+        if not (0 <= choice < len(self.options) or (self.allow_skip and choice == -1)):
+            return False
+        self.future.set_result(choice)
+        return True
+
+    def cancel(self):
+        self.future.cancel()
+
+
+class QuestionRouter:
+    """Routes numeric replies to the pending :class:`Question` of their author.
+
+    There is at most one pending question per member, so a reply is parsed once and
+    resolved with a single dict lookup no matter how many questions are open.
+    """
+
+    def __init__(self):
+        self.pending: Dict[int, Question] = {}
+
+    def __contains__(self, member_id: int) -> bool:
+        return member_id in self.pending
+
+    def ask(
+            self,
+            member: qq.Member,
+            q_type: QuestionType,
+            options: List[Any],
+            prompt: str,
+            *,
+            allow_skip: bool = False,
+            replace: bool = False,
+    ) -> Optional[Question]:
+        """Register a question for ``member``.
+
+        Returns ``None`` if the member already has one pending, unless ``replace`` is
+        set, in which case the old question is cancelled and this one is asked instead.
+        """
+        old = self.pending.get(member.id)
+        if old is not None:
+            if not replace:
+                return None
+            old.cancel()
+        question = Question(member, q_type, options, prompt, allow_skip)
+        self.pending[member.id] = question
+        return question
+
+    def answer(self, member_id: int, choice: int) -> bool:
+        question = self.pending.get(member_id)
+        if question is None or not question.resolve(choice):
+            return False
+        del self.pending[member_id]
+        return True
+
+    def dispatch(self, member_id: int, content: str) -> bool:
+        if member_id not in self.pending:
+            return False
+        try:
+            choice = int(content.strip())
+        except ValueError:
+            return False
+        return self.answer(member_id, choice)
+
+    def expire(self, question: Question):
+        question.cancel()
+        if self.pending.get(question.member.id) is question:
+            del self.pending[question.member.id]
+
+    async def wait(self, question: Question, timeout: Optional[float] = None) -> Optional[int]:
+        try:
+            return await asyncio.wait_for(asyncio.shield(question.future), timeout)
+        except asyncio.TimeoutError:
+            return None
+        except asyncio.CancelledError:
+            if question.future.cancelled():
+                return None
+            raise
+        finally:
+            if not question.done:
+                self.expire(question)
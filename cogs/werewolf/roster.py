@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+from typing import Dict, Optional, TYPE_CHECKING
+
+from cogs.werewolf.roles import Role
+
+if TYPE_CHECKING:
+    from cogs.werewolf.session import Player
+
+__all__ = (
+    'Roster',
+)
+
+
+class _View:
+    """One rendered list: a line per player, their joined body and the full text.
+
+    Appending a line extends the cached body in place. Removing or changing a line
+    drops the body, which is joined again from the per-player lines on the next read.
+    """
+    __slots__ = ('lines', 'body', 'text')
+
+    def __init__(self):
+        self.lines: Dict[int, str] = {}
+        self.body: Optional[str] = ''
+        self.text: Optional[str] = None
+
+    def __len__(self):
+        return len(self.lines)
+
+    def add(self, key: int, line: str):
+        if key in self.lines:
+            self.replace(key, line)
+            return
+        self.lines[key] = line
+        if self.body is not None:
+            self.body = f'{self.body}\n{line}' if self.body else line
+        self.text = None
+
+    def remove(self, key: int):
+        line = self.lines.pop(key, None)
+        if line is None:
+            return
+        self.body = None
+        self.text = None
+
+    def replace(self, key: int, line: str):
+        if self.lines.get(key) == line:
+            return
+        self.lines[key] = line
+        self.body = None
+        self.text = None
+
+    def render(self, header: str) -> str:
+        if self.text is None:
+            if self.body is None:
+                self.body = '\n'.join(self.lines.values())
+            self.text = f'{header}: {len(self.lines)}\n{self.body}' if self.body else f'{header}: 0'
+        return self.text
+
+
+class Roster:
+    """The player lists of one :class:`Session`, rendered once and kept up to date.
+
+    :meth:`Session.join` and :meth:`Session.leave` add and remove players, and
+    ``Player.role`` and ``Player.dead`` report every change here, so reading a list
+    costs nothing until one of those happens.
+    """
+
+    def __init__(self):
+        self.lobby: _View = _View()
+        self.alive: _View = _View()
+        self.dead: _View = _View()
+
+    def __contains__(self, player: Player) -> bool:
+        return player.member.id in self.lobby.lines
+
+    @staticmethod
+    def dead_line(player: Player) -> str:
+        role = player.role
+        if isinstance(role, Role):
+            return f'{player.member.mention}: {role.emoji}{role.name}'
+        return player.member.mention
+
+    def add(self, player: Player):
+        key = player.member.id
+        self.lobby.add(key, player.member.mention)
+        if player.dead:
+            self.dead.add(key, self.dead_line(player))
+        else:
+            self.alive.add(key, player.member.mention)
+
+    def remove(self, player: Player):
+        key = player.member.id
+        for view in (self.lobby, self.alive, self.dead):
+            view.remove(key)
+
+    def role_changed(self, player: Player):
+        if player.dead and player in self:
+            self.dead.replace(player.member.id, self.dead_line(player))
+
+    def dead_changed(self, player: Player, old: bool):
+        if player not in self or old == player.dead:
+            return
+        key = player.member.id
+        if player.dead:
+            self.alive.remove(key)
+            self.dead.add(key, self.dead_line(player))
+        else:
+            self.dead.remove(key)
+            self.alive.add(key, player.member.mention)
+
+    def players(self) -> str:
+        return self.lobby.render('玩家')
+
+    def alive_players(self) -> str:
+        return self.alive.render('存活玩家')
+
+    def dead_players(self) -> str:
+        return self.dead.render('死亡玩家')
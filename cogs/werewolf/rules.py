@@ -0,0 +1,172 @@
+"""Win conditions declared as data.
+
+:meth:`Session.check_game_end` puts the living players' role counts, kept by its
+:class:`RoleIndex`, into a :class:`Composition` and walks :data:`RULES` in order.
+The first rule whose condition holds decides: it names the winner, or ``None``
+when the game goes on.
+Rules with an :attr:`Rule.action` need the session to do something first, such
+as the hunter's duel with the last wolf; the session looks the action up by name.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Callable, Dict, FrozenSet, Mapping, Optional, Sequence, Tuple, Union, TYPE_CHECKING
+
+from cogs.werewolf.enum import PlayerFlag, WinType
+from cogs.werewolf.roles import ROLES, Role
+
+if TYPE_CHECKING:
+    from cogs.werewolf.session import Player
+
+__all__ = (
+    'Composition',
+    'Rule',
+    'RULES',
+    'evaluate',
+)
+
+WOLVES: FrozenSet[Role] = ROLES.wolves
+# Wolves for the parity rule, where a Snow Wolf counts as well.
+PACK: FrozenSet[Role] = ROLES.pack
+# Neutrals that cannot win alone; when only they are left nobody wins.
+LONERS: FrozenSet[Role] = frozenset((ROLES.Tanner, ROLES.Sorcerer, ROLES.Thief, ROLES.Doppelganger))
+EVIL: FrozenSet[Role] = WOLVES | {ROLES.SnowWolf, ROLES.Cultist, ROLES.SerialKiller, ROLES.Arsonist}
+
+HUNTER_DUEL = 'hunter_duel'
+CULT_HUNTER = 'cult_hunter'
+CONVERT = 'convert'
+
+_BITTEN = int(PlayerFlag.Bitten)
+
+
+class Composition:
+    """The living players of a session, counted by role and party.
+
+    ``roles`` and ``parties`` can be passed in from maintained counters such as
+    :meth:`RoleIndex.alive_role_counts` and :attr:`RoleIndex.party_count`; otherwise
+    the players are counted in one pass. Facts about single players (lovers, bites, the gunner's bullets) are only
+    looked up when a rule asks for them.
+    """
+
+    def __init__(
+            self,
+            players: Sequence[Player],
+            check_bitten: bool = False,
+            roles: Optional[Mapping[Role, int]] = None,
+            parties: Optional[Mapping[WinType, int]] = None,
+    ):
+        if roles is None:
+            counted: Dict[Role, int] = {}
+            for p in players:
+                counted[p.role] = counted.get(p.role, 0) + 1
+            roles = counted
+        if parties is None:
+            parties = {}
+            for role, count in roles.items():
+                parties[role.party] = parties.get(role.party, 0) + count
+        self.players: Sequence[Player] = players
+        self.check_bitten: bool = check_bitten
+        self.roles: Mapping[Role, int] = roles
+        self.parties: Mapping[WinType, int] = parties
+        self.alive: int = len(players)
+        self.pack: int = sum(roles.get(r, 0) for r in PACK)
+        self.duo: Tuple[Role, ...] = tuple(p.role for p in players) if self.alive == 2 else ()
+
+    def has(self, *roles: Role) -> bool:
+        return any(self.roles.get(r) for r in roles)
+
+    def party(self, party: WinType) -> int:
+        return self.parties.get(party, 0)
+
+    def only(self, roles: FrozenSet[Role]) -> bool:
+        return sum(self.roles.get(r, 0) for r in roles) == self.alive
+
+    def pair(self, role: Role) -> Optional[Role]:
+        """With two players left, one of them ``role``: the other one's role."""
+        if not self.duo:
+            return None
+        first, second = self.duo
+        if first is role:
+            return second
+        if second is role:
+            return first
+        return None
+
+    @property
+    def lovers(self) -> int:
+        return sum(1 for p in self.players if p.in_love)
+
+    @property
+    def bitten(self) -> int:
+        return sum(1 for p in self.players if p.flags & _BITTEN)
+
+    @property
+    def pack_in_love(self) -> int:
+        return sum(1 for p in self.players if p.role in PACK and p.in_love)
+
+    @property
+    def gunner_loaded(self) -> bool:
+        for p in self.players:
+            if p.role is ROLES.Gunner:
+                return p.bullet > 0
+        return False
+
+
+@dataclass(frozen=True)
+class Rule:
+    """``when`` is only asked if exactly ``alive`` players are left, or always if ``alive`` is None."""
+    name: str
+    alive: Optional[int]
+    when: Callable[[Composition], bool]
+    winner: Union[None, WinType, Callable[[Composition], WinType]]
+    action: Optional[str] = None
+
+    def outcome(self, composition: Composition) -> Optional[WinType]:
+        return self.winner(composition) if callable(self.winner) else self.winner
+
+
+def _gunner_holds(c: Composition) -> bool:
+    # A loaded gunner keeps the village alive at parity, or one wolf short when two wolves are lovers.
+    others = c.alive - c.pack
+    return c.gunner_loaded and (c.pack == others or (c.pack == others + 1 and c.pack_in_love == 2))
+
+
+RULES: Tuple[Rule, ...] = (
+    Rule('everyone dead', 0, lambda c: True, WinType.NoOne),
+    Rule('lone neutral', 1, lambda c: c.only(LONERS), WinType.NoOne),
+    Rule('last survivor', 1, lambda c: True, lambda c: c.players[0].role.party),
+    Rule('lovers', 2, lambda c: c.lovers == 2, WinType.Lovers),
+    Rule('neutral pair', 2, lambda c: c.only(LONERS), WinType.NoOne),
+    Rule('two hunters', 2, lambda c: c.pair(ROLES.Hunter) is ROLES.Hunter, WinType.Villager),
+    Rule('hunter and serial killer', 2, lambda c: c.pair(ROLES.Hunter) is ROLES.SerialKiller, WinType.SKHunter),
+    Rule('hunter and wolf', 2, lambda c: c.pair(ROLES.Hunter) in WOLVES, None, HUNTER_DUEL),
+    Rule('serial killer', 2, lambda c: c.has(ROLES.SerialKiller), WinType.SerialKiller),
+    Rule('arsonist', 2, lambda c: c.has(ROLES.Arsonist), WinType.Arsonist),
+    Rule('two cultists', 2, lambda c: c.pair(ROLES.Cultist) is ROLES.Cultist, WinType.Cult),
+    Rule('cultist and wolf', 2, lambda c: c.pair(ROLES.Cultist) in WOLVES, WinType.Wolf),
+    Rule('cultist and cult hunter', 2, lambda c: c.pair(ROLES.Cultist) is ROLES.CultistHunter, WinType.Villager,
+         CULT_HUNTER),
+    Rule('cultist converts the last one', 2, lambda c: c.pair(ROLES.Cultist) is not None, WinType.Cult, CONVERT),
+    Rule('neutral trio', 3, lambda c: c.only(LONERS), WinType.NoOne),
+    Rule('killer still out there', None,
+         lambda c: c.party(WinType.SerialKiller) or c.party(WinType.Arsonist), None),
+    Rule('all cult', None, lambda c: c.party(WinType.Cult) == c.alive, WinType.Cult),
+    Rule('gunner holds the wolves off', None, lambda c: c.pack >= c.alive - c.pack and _gunner_holds(c), None),
+    Rule('wolf parity', None, lambda c: c.pack >= c.alive - c.pack, WinType.Wolf),
+    Rule('village cleared', None,
+         lambda c: not c.has(*EVIL) and (not c.check_bitten or c.bitten == c.alive), WinType.Villager),
+)
+
+# RULES narrowed down to the ones that can apply for each number of survivors, in the same order.
+_ANY: Tuple[Rule, ...] = tuple(r for r in RULES if r.alive is None)
+_BY_ALIVE: Dict[int, Tuple[Rule, ...]] = {
+    n: tuple(r for r in RULES if r.alive in (None, n)) for n in {r.alive for r in RULES if r.alive is not None}
+}
+
+
+def evaluate(composition: Composition) -> Optional[Rule]:
+    """The first rule that applies to ``composition``, or ``None`` if none does."""
+    for rule in _BY_ALIVE.get(composition.alive, _ANY):
+        if rule.when(composition):
+            return rule
+    return None
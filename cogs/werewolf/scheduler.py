@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import logging
+from typing import Any, Callable, List, Optional, Tuple
+
+__all__ = (
+    'Timer',
+    'Scheduler',
+)
+
+log = logging.getLogger(__name__)
+
+
+class Timer:
+    __slots__ = ('when', 'callback', 'args', 'cancelled')
+
+    def __init__(self, when: float, callback: Callable[..., Any], args: Tuple[Any, ...]):
+        self.when: float = when
+        self.callback = callback
+        self.args = args
+        self.cancelled: bool = False
+
+    def __repr__(self):
+        return f'<Timer when={self.when:.3f} callback={self.callback} cancelled={self.cancelled}>'
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class Scheduler:
+    """A heap of timers shared by every lobby of the cog.
+
+    A single task sleeps until the earliest deadline, so idle lobbies cost nothing
+    between their reminders. Callbacks may be plain functions or coroutine functions;
+    coroutines are started as tasks. Times are in ``loop.time()`` seconds.
+    """
+
+    def __init__(self):
+        self._heap: List[Tuple[float, int, Timer]] = []
+        self._counter = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.wakeups: int = 0
+
+    def __len__(self):
+        return sum(1 for _, _, n in self._heap if not n.cancelled)
+
+    @staticmethod
+    def time() -> float:
+        return asyncio.get_running_loop().time()
+
+    def call_at(self, when: float, callback: Callable[..., Any], *args: Any) -> Timer:
+        timer = Timer(when, callback, args)
+        earliest = self._heap[0][0] if self._heap else None
+        heapq.heappush(self._heap, (when, next(self._counter), timer))
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+        elif earliest is None or when < earliest:
+            self._wakeup.set()
+        return timer
+
+    def call_later(self, delay: float, callback: Callable[..., Any], *args: Any) -> Timer:
+        return self.call_at(self.time() + delay, callback, *args)
+
+    async def _run(self):
+        while self._heap:
+            when, _, timer = self._heap[0]
+            if timer.cancelled:
+                heapq.heappop(self._heap)
+                continue
+            delay = when - self.time()
+            if delay > 0:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                self.wakeups += 1
+                continue
+            heapq.heappop(self._heap)
+            try:
+                result = timer.callback(*timer.args)
+                if asyncio.iscoroutine(result):
+                    asyncio.create_task(result)
+            except Exception:
+                log.exception('Timer callback %r failed', timer.callback)
+
+    def close(self):
+        for _, _, timer in self._heap:
+            timer.cancel()
+        self._heap.clear()
+        if self._task is not None:
+            self._task.cancel()
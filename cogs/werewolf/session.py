@@ -2,8 +2,10 @@ from __future__ import annotations
 
 import asyncio
 import datetime
+import functools
+import logging
 import random
-from typing import List, Dict, Optional, Union, TYPE_CHECKING
+from typing import Awaitable, Iterable, List, Dict, Optional, Tuple, Union, TYPE_CHECKING
 
 import qq
 
@@ -15,40 +17,79 @@ __all__ = (
 from qq.ext import commands
 from qq.utils import MISSING, get
 
-from cogs.werewolf.enum import WinType, KillMethod, QuestionType
+from cogs.werewolf.balance import balance_roles, role_pool
+from cogs.werewolf.enum import WinType, KillMethod, QuestionType, PlayerFlag
+from cogs.werewolf.history import DeathRecord, GameRecord, HistoryStore
+from cogs.werewolf import cascade, metrics, narrative, rules
+from cogs.werewolf.cascade import Cascade, Death, DeathEvent
+from cogs.werewolf.night import IGNITE, NightResolver
+from cogs.werewolf.index import RoleIndex
+from cogs.werewolf.profiling import PhaseProfiler
+from cogs.werewolf.question import Question, format_menu
+from cogs.werewolf.roster import Roster
+from cogs.werewolf.scheduler import Scheduler, Timer
+from cogs.werewolf.snapshot import SnapshotStore
+from cogs.werewolf.transport import Transport, QQTransport
+from cogs.werewolf.vote import LynchTally
 from cogs.werewolf.roles import ROLES, Role
 
 if TYPE_CHECKING:
     from cogs.werewolf import Werewolf
 
-WOLF_ROLES = [ROLES.Wolf, ROLES.AlphaWolf, ROLES.WolfCub, ROLES.Lycan]
+log = logging.getLogger(__name__)
+
+
+def _flag(flag: PlayerFlag) -> property:
+    mask = int(flag)
+
+    def getter(self: Player) -> bool:
+        return not not self.flags & mask
+
+    def setter(self: Player, value: bool):
+        self.flags = self.flags | mask if value else self.flags & ~mask
+
+    return property(getter, setter)
+
+
+DEAD_FLAG = int(PlayerFlag.Dead)
+NIGHT_FLAGS = int(PlayerFlag.DiedLastNight)
 
 
 class Player:
+    __slots__ = (
+        'member', '_role', 'flags', 'role_model', 'in_love', 'session', 'changed_role_count', 'time_died', 'bullet',
+        'current_question', 'choice', 'choice2', 'votes', 'being_visited_same_night_count', 'kill_by_role',
+        'kill_method', 'final_shot_delay',
+    )
+
     def __init__(self, player: qq.Member, session: Session):
         self.member = player
-        self.role: Optional[Role] = MISSING
-        self.cult_leader: bool = False
-        self.dead: bool = False
-        self.died_last_night: bool = False
-        self.win: bool = False
-        self.bitten: bool = False
+        self._role: Optional[Role] = MISSING
+        self.flags: int = 0
         self.role_model: Optional[Player] = MISSING
         self.in_love: Optional[Player] = MISSING
         self.session: Session = session
-        self.changed_role_count = 0
+        self.changed_role_count: int = 0
         self.time_died: Optional[int] = 0
         self.bullet: int = 2
-        self.current_questions: Optional[str] = None
+        self.current_question: Optional[Question] = MISSING
         self.choice: int = 0
-        self.drunk: bool = False
+        self.choice2: int = 0
+        self.votes: int = 0
+        self.being_visited_same_night_count: int = 0
         self.kill_by_role: Optional[Role] = MISSING
         self.kill_method: Optional[KillMethod] = MISSING
         self.final_shot_delay: Optional[KillMethod] = MISSING
-        self.converted_to_cult: bool = False
-        self.flee: bool = False
-        self.used_ability: bool = False
-        self.doused: bool = False
+
+    cult_leader = _flag(PlayerFlag.CultLeader)
+    died_last_night = _flag(PlayerFlag.DiedLastNight)
+    win = _flag(PlayerFlag.Win)
+    bitten = _flag(PlayerFlag.Bitten)
+    drunk = _flag(PlayerFlag.Drunk)
+    converted_to_cult = _flag(PlayerFlag.ConvertedToCult)
+    flee = _flag(PlayerFlag.Flee)
+    used_ability = _flag(PlayerFlag.UsedAbility)
+    doused = _flag(PlayerFlag.Doused)
 
     def __repr__(self):
         return f'<Player member={self.member}, role={self.role}, cult_leader={self.cult_leader}>'
@@ -56,6 +97,33 @@ class Player:
     def set_role(self, role: Role):
         self.role = role
 
+    def reset_night(self):
+        self.flags &= ~NIGHT_FLAGS
+        self.choice = self.choice2 = self.votes = self.being_visited_same_night_count = 0
+        self.current_question = MISSING
+
+    @property
+    def role(self) -> Optional[Role]:
+        return self._role
+
+    @role.setter
+    def role(self, role: Optional[Role]):
+        old, self._role = self._role, role
+        if old is not role:
+            self.session.index.role_changed(self, old)
+            self.session.roster.role_changed(self)
+
+    @property
+    def dead(self) -> bool:
+        return not not self.flags & DEAD_FLAG
+
+    @dead.setter
+    def dead(self, dead: bool):
+        old = self.dead
+        self.flags = self.flags | DEAD_FLAG if dead else self.flags & ~DEAD_FLAG
+        self.session.index.dead_changed(self, old)
+        self.session.roster.dead_changed(self, old)
+
     @property
     def name(self):
         return self.member.display_name
@@ -74,22 +142,24 @@ class Player:
             if seer.dead:
                 self.role = ROLES.Seer
                 self.changed_role_count += 1
-                await self.member.send(f"{seer.name} 曾是先知。作为学徒，你挺身而出，成为新一代先知。")
+                messages = [(self.member, f"{seer.name} 曾是先知。作为学徒，你挺身而出，成为新一代先知。")]
                 beholder = self.session.get_survived_player_with_role(ROLES.Beholder)
                 if beholder and not beholder.dead:
-                    await beholder.member.send(f"{self.name} 曾是先知的学徒，现在他代替 {seer.name} 成为新一代先知。")
+                    messages.append((beholder.member, f"{self.name} 曾是先知的学徒，现在他代替 {seer.name} 成为新一代先知。"))
+                await self.session.transport.send_all(messages)
 
     async def process_wc(self):
-        if not self.dead and self.role_model.dead:
+        if not self.dead and self.role_model and self.role_model.dead:
             self.role = ROLES.Wolf
             self.changed_role_count += 1
-            wolves = self.session.get_player_with_roles(ROLES.wolf.values())
-            for wolf in wolves:
-                if wolf.dead:
-                    continue
-                await wolf.member.send(f"{self.name} 的偶像死了，他成了狼人！")
-            await self.member.send(f"你的偶像 %s 死了！所以你成为了狼人！你的新队友是：\n") + '\n'.join(
-                [n.member.display_name for n in wolves if not n.dead]
+            wolves = [n for n in self.session.get_player_with_roles(ROLES.wolf_list) if not n.dead]
+            await self.session.transport.send_all(
+                [(wolf.member, f"{self.name} 的偶像死了，他成了狼人！") for wolf in wolves if wolf is not self] + [(
+                    self.member,
+                    f"你的偶像 {self.role_model.name} 死了！所以你成为了狼人！你的新队友是：\n" + '\n'.join(
+                        [n.member.display_name for n in wolves]
+                    )
+                )]
             )
 
     async def process_dg(self):
@@ -97,40 +167,47 @@ class Player:
             self.role = self.role_model.role
             self.changed_role_count += 1
             if self.role is ROLES.Mason:
-                masons = self.session.get_player_with_role(ROLES.Mason)
-                for mason in masons:
-                    if not mason.dead:
-                        await mason.member.send(f"替身 {self.name} 已变成共济会会员，一起互帮互助。")
-                return await self.member.send(
-                    f"你所选择的 {self.role_model.name} 已死，所以你变成了共济会会员。"
-                    f"你的队友（如果有的话）是 :" + '\n'.join([n.name for n in masons if not n.dead])
+                masons = [n for n in self.session.get_player_with_role(ROLES.Mason) if not n.dead]
+                await self.session.transport.send_all(
+                    [(mason.member, f"替身 {self.name} 已变成共济会会员，一起互帮互助。") for mason in masons] + [(
+                        self.member,
+                        f"你所选择的 {self.role_model.name} 已死，所以你变成了共济会会员。"
+                        f"你的队友（如果有的话）是 :" + '\n'.join([n.name for n in masons])
+                    )]
                 )
+                return
             if self.role is ROLES.Seer:
                 beholder = self.session.get_survived_player_with_role(ROLES.Beholder)
                 if beholder:
-                    await beholder.member.send(f"{self.name} 曾是替身，现在他代替 {self.role_model.name} 成为新一代先知。")
-            if self.role in ROLES.wolf:
-                wolves = self.session.get_player_with_roles(ROLES.wolf.values())
-                for wolf in wolves:
-                    if wolf.dead:
-                        continue
-                    await wolf.member.send(f"替身 {self.name} 已变成{self.role.emoji}{self.role.name}，就像你一样。")
-                return await self.member.send(
-                    f"你所选择的 {self.role_model.name} 已死，所以你变成了{self.role.emoji}{self.role.name}。"
-                    f"你的队友（如果有的话）是: \n" + '\n'.join([n.member.display_name for n in wolves if not n.dead])
+                    await self.session.transport.send(
+                        beholder.member, f"{self.name} 曾是替身，现在他代替 {self.role_model.name} 成为新一代先知。"
+                    )
+            if ROLES.is_wolf(self.role):
+                wolves = [n for n in self.session.get_player_with_roles(ROLES.wolf_list) if not n.dead]
+                await self.session.transport.send_all(
+                    [
+                        (wolf.member, f"替身 {self.name} 已变成{self.role.emoji}{self.role.name}，就像你一样。")
+                        for wolf in wolves
+                    ] + [(
+                        self.member,
+                        f"你所选择的 {self.role_model.name} 已死，所以你变成了{self.role.emoji}{self.role.name}。"
+                        f"你的队友（如果有的话）是: \n" + '\n'.join([n.member.display_name for n in wolves])
+                    )]
                 )
+                return
             if self.role is ROLES.Cultist:
-                cultists = self.session.get_player_with_role(ROLES.Cultist)
-                for cultist in cultists:
-                    if cultist.dead:
-                        continue
-                    await cultist.member.send(f"替身 {self.name} 已变成邪教徒，就像你一样。")
-                return await self.member.send(
-                    f"你所选择的 {self.role_model.name} 已死，所以你变成了邪教徒。你的队友（如果有的话）是 :\n" + "\n".join(
-                        [n.member.display_name for n in cultists if not n.dead]
-                    )
+                cultists = [n for n in self.session.get_player_with_role(ROLES.Cultist) if not n.dead]
+                await self.session.transport.send_all(
+                    [(cultist.member, f"替身 {self.name} 已变成邪教徒，就像你一样。") for cultist in cultists] + [(
+                        self.member,
+                        f"你所选择的 {self.role_model.name} 已死，所以你变成了邪教徒。你的队友（如果有的话）是 :\n" + "\n".join(
+                            [n.member.display_name for n in cultists]
+                        )
+                    )]
                 )
-            return await self.member.send(
+                return
+            return await self.session.transport.send(
+                self.member,
                 f"你所选择的 {self.role_model.name} 已死，所以你变成了{self.role.emoji}{self.role.name}" +
                 self.session.get_role_info(self.role)
             )
@@ -143,98 +220,207 @@ class Setting:
     burning_overkill: bool = True
     thief_full: bool = False
     night_time: int = 120
+    night_warning: int = 30
+    day_time: int = 90
+    lynch_time: int = 60
+    dm_concurrency: int = 10
+    start_delay: float = 2
+    max_days: int = 0
 
 
 class Session:
 
     def __init__(
             self,
-            ctx: commands.Context,
+            ctx: Optional[commands.Context],
             chaos: bool,
-            cog: Werewolf
+            cog: Optional[Werewolf],
+            *,
+            transport: Optional[Transport] = None,
+            channel: Optional[qq.abc.Messageable] = None,
+            guild: Optional[qq.Guild] = None,
     ):
         self.cog = cog
-        self.channel = ctx.channel
-        self.guild = ctx.guild
+        self.channel = ctx.channel if ctx is not None else channel
+        self.guild = ctx.guild if ctx is not None else guild
         self.ctx = ctx
-        self.bot: commands.Bot = ctx.bot
+        self.bot: commands.Bot = ctx.bot if ctx is not None else getattr(cog, 'bot', None)
         self.players: Dict[int, Player] = {}
         self.is_joining: bool = True
         self.is_running: bool = False
-        self.force_start: bool = False
         self.wolf_cub_killed: bool = True
         self.sandman_sleep: bool = False
         self.silver_spread: bool = False
         self.setting: Setting = Setting()
-        self.join_time: int = self.setting.game_join_time
+        self.index: RoleIndex = RoleIndex()
+        self.roster: Roster = Roster()
+        self.transport: Transport = transport or QQTransport(self.channel, cog, self.setting)
+        if metrics.ENABLED:
+            self.transport = metrics.MeteredTransport(self.transport, str(self.guild.id) if self.guild else '')
+        self.scheduler: Scheduler = self.transport.scheduler
+        self.history: Optional[HistoryStore] = cog.history if cog is not None else None
+        self.deaths: List[DeathRecord] = []
+        self.snapshots: Optional[SnapshotStore] = cog.snapshots if cog is not None else None
+        self.profiler: Optional[PhaseProfiler] = None
+        self.join_deadline: float = 0.0
+        self._lobby_timers: List[Timer] = []
+        self._lobby_closed: Optional[asyncio.Future] = None
+        self._force_start: bool = False
         self.chaos: bool = chaos
         self.day: int = 0
         self.night: bool = True
         self.end_time: Optional[datetime.datetime] = MISSING
         self.start_time: Optional[datetime.datetime] = MISSING
 
+    def post(self, content: str):
+        self.transport.post(content)
+
+    def snapshot(self):
+        if self.snapshots is None or self.guild is None or self.channel is None:
+            return
+        try:
+            self.snapshots.save(self)
+        except Exception:
+            log.exception('Failed to snapshot the session of guild %s', self.guild.id)
+
     def join(self, player: Union[qq.Member, Player]):
         if not isinstance(player, Player):
             player = Player(player, self)
         self.players[player.member.id] = player
+        self.index.add(player)
+        self.roster.add(player)
+        if self.is_joining and self._lobby_closed is not None:
+            self.snapshot()
 
     def leave(self, player: qq.Member):
-        if player.id in self.players:
+        if player.id not in self.players:
             return False
-        self.players.pop(player.id)
+        player = self.players.pop(player.id)
+        self.index.remove(player)
+        self.roster.remove(player)
+        if self.is_joining and self._lobby_closed is not None:
+            self.snapshot()
 
-    async def main_game_loop(self):
-        while True:
-            if self.force_start:
-                break
-            if self.join_time in [10, 30, 60]:
-                if self.join_time == 60:
-                    await self.ctx.send("还有 1 分钟")
-                else:
-                    await self.ctx.send("还剩 %d 秒" % self.join_time)
-            if self.join_time:
-                self.join_time -= 1
-                await asyncio.sleep(1)
-            else:
-                break
+    @property
+    def join_time(self) -> int:
+        if not self.is_joining or not self.join_deadline:
+            return 0
+        return max(round(self.join_deadline - self.scheduler.time()), 0)
+
+    @property
+    def force_start(self) -> bool:
+        return self._force_start or (self._lobby_closed is not None and self._lobby_closed.done())
+
+    @force_start.setter
+    def force_start(self, value: bool):
+        # Kept until the lobby opens, so a force start sent right after /start isn't lost.
+        self._force_start = value
+        if value:
+            self._close_lobby()
+
+    def extend_join_time(self, seconds: int):
+        if self.is_joining and self._lobby_closed is not None and not self._lobby_closed.done():
+            self._schedule_lobby(self.join_time + seconds)
+
+    def _schedule_lobby(self, remaining: float):
+        for timer in self._lobby_timers:
+            timer.cancel()
+        self.join_deadline = self.scheduler.time() + remaining
+        self._lobby_timers = [
+            self.scheduler.call_at(self.join_deadline - mark, self._remind_join, mark)
+            for mark in (60, 30, 10) if remaining >= mark
+        ]
+        self._lobby_timers.append(self.scheduler.call_at(self.join_deadline, self._close_lobby))
+        self.snapshot()
+
+    def _remind_join(self, remaining: int):
+        if remaining == 60:
+            self.post("还有 1 分钟")
+        else:
+            self.post("还剩 %d 秒" % remaining)
+
+    def _close_lobby(self):
+        for timer in self._lobby_timers:
+            timer.cancel()
+        self._lobby_timers = []
+        if self._lobby_closed is not None and not self._lobby_closed.done():
+            self._lobby_closed.set_result(None)
+
+    async def wait_for_players(self, join_time: Optional[float] = None):
+        self._lobby_closed = asyncio.get_running_loop().create_future()
+        if self._force_start:
+            self._lobby_closed.set_result(None)
+        else:
+            self._schedule_lobby(self.setting.game_join_time if join_time is None else join_time)
+        await self._lobby_closed
+
+    async def main_game_loop(self, join_time: Optional[float] = None):
+        await self.wait_for_players(join_time)
         self.is_joining = False
         self.start_time = datetime.datetime.now()
 
-        await asyncio.sleep(2)
+        await asyncio.sleep(self.setting.start_delay)
         if self.player_count < self.setting.min_players:
-            return await self.ctx.send("人数不足，游戏取消。")
-        await self.ctx.send("游戏启动中，正在分配角色及更新数据库，请稍等片刻。")
+            return self.post("人数不足，游戏取消。")
+        self.post("游戏启动中，正在分配角色及更新数据库，请稍等片刻。")
 
         self.is_running = True
+        await self.phase('deal', self.deal_roles())
+        await self.run_days()
+
+    async def deal_roles(self):
         self.assign_role()
         await self.notify_roles()
 
+    async def phase(self, name: str, coro: Awaitable):
+        """Run one phase of the game, under :attr:`profiler` if an admin attached one."""
+        if self.profiler is None:
+            return await coro
+        return await self.profiler.run(name, coro)
+
+    async def resume(self, join_time: float = 0):
+        """Continue a session restored from a snapshot at the phase it was saved in."""
+        self.post("机器人刚刚重启，游戏将从上一阶段继续。")
+        self.post(self.player_list_string)
+        if self.is_joining:
+            await self.main_game_loop(join_time)
+        elif self.is_running:
+            await self.run_days()
+
+    async def run_days(self):
         while self.is_running:
+            self.snapshot()
+            if self.setting.max_days and self.day >= self.setting.max_days:
+                await self.phase('end', self.end(WinType.NoOne))
+                break
             self.day += 1
-            await self.check_role_changes()
-            await self.night_loop()
+            await self.phase(f'day {self.day}', self.play_day())
+
+    async def play_day(self):
+        await self.check_role_changes()
+        await self.night_loop()
+        await self.day_loop()
 
+    @metrics.instrument('night_loop')
     async def night_loop(self):
         self.night = True
         if not self.is_running or await self.check_game_end(True):
             return
         for p in self.players.values():
-            p.choice = 0
-            p.choice2 = 0
-            p.current_question = MISSING
-            p.votes = 0
-            p.died_last_night = False
-            p.being_visited_same_night_count = 0
+            p.reset_night()
             if p.bitten:
                 p.bitten = False
-                if not p.dead and p.role not in WOLF_ROLES + ROLES.SnowWolf:
+                if not p.dead and p.role not in ROLES.pack:
+                    messages = []
                     if p.role == ROLES.Cultist:
-                        for cultist in [n for n in self.alive_players if n.role == ROLES.Cultist]:
-                            await cultist.member.send(f"奇怪，当你们决定今晚让谁入会时，邪教徒{p.name}好像不在家。")
+                        messages += [
+                            (cultist.member, f"奇怪，当你们决定今晚让谁入会时，邪教徒{p.name}好像不在家。")
+                            for cultist in self.get_survived_player_with_roles([ROLES.Cultist]) if cultist is not p
+                        ]
                     p.role = ROLES.Wolf
-                    await p.member.send("现在你已经是🐺狼人了!")
-                    wolfs = self.get_survived_player_with_roles(WOLF_ROLES + ROLES.SnowWolf)
-                    await p.member.send("当前狼群:" + ', '.join([n.name for n in wolfs]))
+                    wolfs = self.get_survived_player_with_roles(ROLES.pack)
+                    messages.append((p.member, "现在你已经是🐺狼人了!\n当前狼群:" + ', '.join([n.name for n in wolfs])))
+                    await self.transport.send_all(messages)
                     await self.check_role_changes()
         if await self.check_game_end():
             return
@@ -243,127 +429,220 @@ class Session:
             self.sandman_sleep = False
             self.silver_spread = False
             self.wolf_cub_killed = False
-            for player in self.players:
+            for player in self.players.values():
                 player.drunk = False
-            await self.ctx.send(
+            self.post(
                 "💤奇怪，天怎么突然这么黑，好像也停电了，火也点不燃，该回家睡觉了"
                 "，今晚注定是个宁静的夜晚。今晚没有人会活动"
             )
             return
 
-        await self.ctx.send(
+        self.post(
             "夜幕降临，人们都活在恐惧中，彻夜难眠。这漫长的夜晚竟然有 %s 秒！\n"
             "请所有夜晚（主动）行动的角色，私聊机器人以使用自己能力。" % night_time
         )
-        await self.ctx.send(self.player_list_string)
-        await asyncio.sleep(night_time)
-
+        self.post(self.player_list_string)
+        questions = await self.send_night_action()
+        await self.wait_for_answers(questions, night_time)
+        await self.resolve_night()
+
+    @metrics.instrument('resolve_night')
+    async def resolve_night(self):
+        """Carry out the night's choices, then tell the village at dawn who did not make it."""
+        night = NightResolver(self).resolve()
+        await self.transport.send_all(night.messages)
+        events = await self.kill_players(night.deaths)
+        self.night = False
+        dead = [n for n in events if n.kind == cascade.DIED]
+        if dead:
+            self.post('\n'.join(
+                narrative.lover_suicide(n.other, n.player) if n.method is KillMethod.LoverDied
+                else narrative.night_death(n.player, n.method)
+                for n in dead
+            ))
+        elif night.saved:
+            self.post("昨晚有人遭到了袭击，所幸有惊无险，大家都平安地迎来了清晨。")
+        else:
+            self.post("昨晚风平浪静，村里没有人死去。")
+        shots = []
+        for n in events:
+            if n.kind == cascade.SHOT_DELAYED and n.player.final_shot_delay:
+                shots.append((n.player, n.player.final_shot_delay))
+                n.player.final_shot_delay = MISSING
+        if shots:
+            await self.kill_players(shots=shots, is_night=False)
+
+    @metrics.instrument('day_loop')
+    async def day_loop(self):
+        if not self.is_running or await self.check_game_end():
+            return
+        self.night = False
+        day_time = self.setting.day_time
+        self.post(narrative.DAY.render(day=self.day, time=day_time, alive=self.alive_list_string))
+        abilities = await self.send_day_abilities()
+        await asyncio.sleep(day_time)
+        pacifist = None
+        for question in abilities:
+            p = self.players.get(question.member.id)
+            if question.choice == 0 and p is not None and not p.dead and not p.used_ability:
+                p.used_ability = True
+                if p.role is ROLES.Mayor:
+                    self.post(narrative.MAYOR.render(name=p.name))
+                elif p.role is ROLES.Pacifist:
+                    pacifist = p
+            if not question.done:
+                self.transport.expire(question)
+        if pacifist is not None:
+            return self.post(narrative.PACIFIST.render(name=pacifist.name))
+        await self.lynch_vote()
+
+    async def send_day_abilities(self) -> List[Question]:
+        """Ask a hidden mayor whether to reveal and a pacifist whether to speak; each can do so once."""
+        questions = []
+        messages = []
+        for role, option, msg in (
+                (ROLES.Mayor, "亮出委任状", "要在今天亮出委任状吗？公开身份后你的一票顶两票。"),
+                (ROLES.Pacifist, "发表和平演说", "要在今天发表和平演说吗？今天将不会处死任何人。"),
+        ):
+            for p in self.index.alive_with_roles([role]):
+                if p.used_ability:
+                    continue
+                question = self.transport.ask(
+                    p.member, QuestionType.Mayor if role is ROLES.Mayor else QuestionType.Pacifist, [p],
+                    format_menu(msg, [option]) + '\n-1. 不了', allow_skip=True,
+                )
+                if question is not None:
+                    questions.append(question)
+                    messages.append((p.member, question.prompt))
+        await self.transport.send_all(messages)
+        return questions
+
+    @metrics.instrument('lynch_vote')
+    async def lynch_vote(self):
+        alive = self.alive_players
+        # A revealed mayor's ballot counts twice.
+        tally = LynchTally({p: 2 if p.role is ROLES.Mayor and p.used_ability else 1 for p in alive})
+        closed = asyncio.get_running_loop().create_future()
+
+        def count(voter: Player, question: Question, future: asyncio.Future):
+            if future.cancelled():
+                return
+            target = question.answer
+            if target is not None and voter.role is ROLES.ClumsyGuy and random.random() < 0.5:
+                target = random.choice(question.options)
+            tally.cast(voter, target)
+            if tally.decided and not closed.done():
+                closed.set_result(None)
+
+        questions = []
+        messages = []
+        for p in alive:
+            targets = [n for n in alive if n is not p]
+            question = self.transport.ask(
+                p.member, QuestionType.Lynch, targets,
+                format_menu("你想处死谁？", [n.name for n in targets]) + '\n-1. 弃权', allow_skip=True,
+            )
+            if question is None:
+                tally.cast(p, None)
+                continue
+            question.future.add_done_callback(functools.partial(count, p, question))
+            questions.append(question)
+            messages.append((p.member, question.prompt))
+        self.post(narrative.LYNCH_START.render(time=self.setting.lynch_time))
+        await self.transport.send_all(messages)
+        if not tally.decided:
+            await asyncio.wait({closed}, timeout=self.setting.lynch_time)
+        for question in questions:
+            if not question.done:
+                self.transport.expire(question)
+
+        target = tally.result()
+        standings = tally.standings()
+        if standings:
+            self.post("投票结果：\n" + '\n'.join(f"{p.name}: {votes} 票" for p, votes in standings))
+        if target is None:
+            return self.post(narrative.LYNCH_NONE)
+        if target.role is ROLES.Prince and not target.used_ability:
+            target.used_ability = True
+            return self.post(narrative.LYNCH_PRINCE.render(name=target.name))
+        self.post(narrative.lynch_message(target))
+        await self.kill_player(target, KillMethod.Lynch, is_night=False)
+        if target.role is ROLES.Tanner:
+            return await self.end(WinType.Tanner)
+        await self.check_game_end()
+
+    async def wait_for_answers(self, questions: List[Question], timeout: float):
+        pending = {q.future for q in questions if not q.done}
+        warning = self.setting.night_warning
+        try:
+            if pending and warning and timeout > warning:
+                _, pending = await asyncio.wait(pending, timeout=timeout - warning)
+                if pending:
+                    self.post(f"天快亮了，还没行动的角色只剩 {warning} 秒！")
+                timeout = warning
+            if pending:
+                await asyncio.wait(pending, timeout=timeout)
+        finally:
+            for question in questions:
+                if not question.done:
+                    self.transport.expire(question)
+
+    @metrics.instrument('check_game_end')
     async def check_game_end(self, check_bitten=False):
         if not self.is_running:
             return True
-        survivor = self.alive_players
-        if all(n.role not in WOLF_ROLES for n in survivor):
-            if not check_bitten or all(not n.bitten for n in survivor):
-                snow_wolf = self.get_survived_player_with_role(ROLES.SnowWolf)
-                if snow_wolf:
-                    snow_wolf.role = ROLES.Wolf
-                    snow_wolf.changed_role_count += 1
-                    await snow_wolf.member.send("你似乎是最后的狼了，为了生存，你不得不变成了只普通🐺狼人。")
-                else:
-                    traitor = self.get_survived_player_with_role(ROLES.Traitor)
-                    if traitor:
-                        traitor.role = ROLES.Wolf
-                        traitor.changed_role_count += 1
-                        await traitor.member.send("现在你已经成为狼人了，你这个叛徒！！！")
-            else:
+        if not self.index.alive_count(*ROLES.wolves):
+            if check_bitten and any(n.bitten for n in self.alive_players):
                 return False
-        if not survivor:
-            return await self.end(WinType.NoOne)
-        elif len(survivor) == 1:
-            p = survivor[0]
-            if p.role in [ROLES.Tanner, ROLES.Sorcerer, ROLES.Thief, ROLES.Doppelganger]:
-                return await self.end(WinType.NoOne)
+            snow_wolf = self.get_survived_player_with_role(ROLES.SnowWolf)
+            if snow_wolf:
+                snow_wolf.role = ROLES.Wolf
+                snow_wolf.changed_role_count += 1
+                await self.transport.send(snow_wolf.member, "你似乎是最后的狼了，为了生存，你不得不变成了只普通🐺狼人。")
             else:
-                return await self.end(p.role.party)
-        elif len(survivor) == 2:
-            if all(n.in_love for n in survivor):
-                return await self.end(WinType.Lovers)
-            if all(n in [ROLES.Tanner, ROLES.Sorcerer, ROLES.Thief, ROLES.Doppelganger] for n in survivor):
-                return await self.end(WinType.NoOne)
-            if any(n.role is ROLES.Hunter for n in survivor):
-                other = [n for n in survivor if n.role != ROLES.Hunter]
-                if not other:
-                    return await self.end(WinType.Village)
-                else:
-                    other = other[0]
-                if other.role is ROLES.SerialKiller:
-                    return await self.end(WinType.SKHunter)
-                if other.role in WOLF_ROLES:
-                    hunter = get(survivor, role=ROLES.Hunter)
-                    if random.random() >= 0.5:
-                        await self.ctx.send(
-                            f"半夜，{hunter.name}拿着枪准备跑出去练枪法，却看见{other.name}正在大嚼特嚼……于是猎人熟练的关保险、"
-                            f"上膛、瞄准。啪~【狼人🐺】被打死了。"
-                        )
-                        return await self.end(WinType.Village)
-                    else:
-                        await self.ctx.send(
-                            f"知道只剩 🎯猎人{hunter.name} 了,🐺狼人 {other.name} 找到了一个好时机，趁机杀死了 {hunter.name}。 #狼人胜"
-                        )
-                        return await self.end(WinType.Wolf)
-            if any(n.role is ROLES.SerialKiller for n in survivor):
-                return await self.end(WinType.SerialKiller)
-            if any(n.role is ROLES.Arsonist for n in survivor):
-                return await self.end(WinType.Arsonist)
-            if any(n.role is ROLES.Cultist for n in survivor):
-                other = [n for n in survivor if n.role != ROLES.Cultist]
-                if not other:
-                    return await self.end(WinType.Cult)
-                else:
-                    other = other[0]
-                if other.role in WOLF_ROLES:
-                    return await self.end(WinType.Wolf)
-                if other.role is ROLES.CultistHunter:
-                    cultist = get(survivor, role=ROLES.Cultist)
-                    await cultist.member.send(
-                        f"最后，村里只剩💂邪教捕手{other.name} 和 👤邪教徒 {cultist.name} 了..."
-                        f"可惜 {cultist.name} 最后的邪教仪式，还是被 {other.name} 发现了... #村民胜 "
-                    )
-                    await self.kill_player(cultist, KillMethod.HunterCult, other)
-                    return await self.end(WinType.Villager)
-                other.converted_to_cult = True
-                other.role = ROLES.Cultist
-                return await self.end(WinType.Cult)
-        elif len(survivor) == 3:
-            if all(n in [ROLES.Tanner, ROLES.Sorcerer, ROLES.Thief, ROLES.Doppelganger] for n in survivor):
-                return await self.end(WinType.NoOne)
-
-        if any(n.role.party in [ROLES.SerialKiller, ROLES.Arsonist] for n in survivor):
+                traitor = self.get_survived_player_with_role(ROLES.Traitor)
+                if traitor:
+                    traitor.role = ROLES.Wolf
+                    traitor.changed_role_count += 1
+                    await self.transport.send(traitor.member, "现在你已经成为狼人了，你这个叛徒！！！")
+
+        survivor = self.alive_players
+        composition = rules.Composition(
+            survivor, check_bitten, self.index.alive_role_counts(), self.index.party_count
+        )
+        rule = rules.evaluate(composition)
+        if rule is None:
             return False
-        if all(x.role.party == ROLES.Cultist for x in survivor):
-            return await self.end(WinType.Cult)
-
-        wolfs = [n for n in survivor if n.role in ROLES.Wolf]
-        others = [n for n in survivor if n.role not in ROLES.Wolf]
-        if wolfs > others:
-            gunner = get(survivor, role=ROLES.Gunner)
-            if (
-                    gunner and gunner.bullet > 0 and
-                    (
-                            len(wolfs) == len(others) or
-                            (len(wolfs) == len(others) + 1 and len([n for n in wolfs if n.in_love]) == 2)
-                    )
-            ):
-                return False
-            return await self.end(WinType.Wolf)
-        if all(
-                n.role not in [
-                    ROLES.SnowWolf, ROLES.Cultist, ROLES.SerialKiller, ROLES.Arsonist
-                ] + WOLF_ROLES for n in survivor
-        ):
-            if not check_bitten or all(n.bitten for n in survivor):
+        if rule.action == rules.HUNTER_DUEL:
+            hunter = get(survivor, role=ROLES.Hunter)
+            other = next(n for n in survivor if n is not hunter)
+            if random.random() >= 0.5:
+                self.post(
+                    f"半夜，{hunter.name}拿着枪准备跑出去练枪法，却看见{other.name}正在大嚼特嚼……于是猎人熟练的关保险、"
+                    f"上膛、瞄准。啪~【狼人🐺】被打死了。"
+                )
                 return await self.end(WinType.Villager)
-        return False
+            self.post(
+                f"知道只剩 🎯猎人{hunter.name} 了,🐺狼人 {other.name} 找到了一个好时机，趁机杀死了 {hunter.name}。 #狼人胜"
+            )
+            return await self.end(WinType.Wolf)
+        if rule.action == rules.CULT_HUNTER:
+            cultist = get(survivor, role=ROLES.Cultist)
+            other = get(survivor, role=ROLES.CultistHunter)
+            await self.transport.send(
+                cultist.member,
+                f"最后，村里只剩💂邪教捕手{other.name} 和 👤邪教徒 {cultist.name} 了..."
+                f"可惜 {cultist.name} 最后的邪教仪式，还是被 {other.name} 发现了... #村民胜 "
+            )
+            await self.kill_player(cultist, KillMethod.HunterCult, other)
+        elif rule.action == rules.CONVERT:
+            other = next(n for n in survivor if n.role is not ROLES.Cultist)
+            other.converted_to_cult = True
+            other.role = ROLES.Cultist
+        winner = rule.outcome(composition)
+        if winner is None:
+            return False
+        return await self.end(winner)
 
     async def kill_player(
             self,
@@ -372,36 +651,79 @@ class Session:
             killer: Optional[Player] = None,
             is_night: bool = True,
             hunter_final_shot: bool = True,
-    ):
+    ) -> List[DeathEvent]:
+        return await self.kill_players([Death(p, kill_method, killer, hunter_final_shot)], is_night)
+
+    @metrics.instrument('kill_player')
+    async def kill_players(
+            self,
+            deaths: Iterable[Death] = (),
+            is_night: bool = True,
+            shots: Iterable[Tuple[Player, KillMethod]] = (),
+    ) -> List[DeathEvent]:
+        """Kill everyone in ``deaths``, then whoever dies because of them, then let ``shots`` hunters shoot.
+
+        Lovers follow their partner and hunters take their final shot (or save it for
+        dawn at night) through one :class:`Cascade`. Role changes caused by the batch
+        are checked once at its end.
+        """
+        work = Cascade(deaths, shots)
+        while work:
+            if not work.deaths:
+                hunter, kill_method = work.shots.popleft()
+                outcome, target = await self.hunter_final_shot(hunter, kill_method)
+                work.emit(cascade.FINAL_SHOT, hunter, kill_method, target, outcome)
+                if outcome == 'shot':
+                    work.deaths.append(Death(target, KillMethod.HunterShot, hunter))
+                continue
+            death = work.deaths.popleft()
+            p, kill_method, killer = death.player, death.method, death.killer
+            if p.dead:
+                continue
+            self._bury(p, kill_method, killer, is_night)
+            work.emit(cascade.DIED, p, kill_method, killer)
+            lover = p.in_love
+            if lover and not lover.dead:
+                if not is_night:
+                    self.post(narrative.lover_suicide(p, lover))
+                work.deaths.append(Death(lover, KillMethod.LoverDied, p))
+            if p.role is ROLES.WolfCub:
+                self.wolf_cub_killed = True
+                work.emit(cascade.WOLF_CUB, p)
+            if p.role is ROLES.Hunter and death.final_shot and kill_method:
+                if is_night:
+                    p.final_shot_delay = kill_method
+                    work.emit(cascade.SHOT_DELAYED, p, kill_method)
+                else:
+                    work.shots.append((p, kill_method))
+        if work.events and self.is_running:
+            for p in await self.check_role_changes():
+                work.emit(cascade.ROLE_CHANGED, p, other=p.role_model or None, detail=p.role.name)
+        return work.events
+
+    def _bury(self, p: Player, kill_method: KillMethod, killer: Optional[Player], is_night: bool):
         p.died_last_night = is_night and kill_method != KillMethod.LoverDied
         p.time_died = self.day
         if killer:
             p.kill_by_role = killer.role
         p.dead = True
         p.kill_method = kill_method
-        if p.in_love and not p.in_love.dead:
-            if not is_night:
-                await self.ctx.send(
-                    f"当看到 {p.in_love.name} 倒在血泊中时， {p.name} 不敢相信眼前发生的一切，撕吼着急急冲到他身边，可他已经断气..."
-                    f"{p.name} 顿时崩溃了，整个人像被掏空一样，趴在另一半身上恸哭不止。"
-                    f"最后他实在无法承受失去另一半的痛苦，找到一把枪自杀了。{p.role_description}"
-                )
-            await self.kill_player(p.in_love, KillMethod.LoverDied, p, is_night=is_night)
-            await self.check_role_changes()
-
-        if p.role is ROLES.WolfCub:
-            self.wolf_cub_killed = True
-        if p.role is ROLES.Hunter:
-            if hunter_final_shot and kill_method:
-                await self.hunter_final_shot(p, kill_method, delay=is_night)
-                pass
+        self.deaths.append(DeathRecord(
+            p.member.id, self.day, is_night, kill_method.value if kill_method else None,
+            killer.member.id if killer else None, killer.role.bit if killer and killer.role else None,
+        ))
 
-    async def send_night_action(self):
+    @metrics.instrument('send_night_action')
+    async def send_night_action(self) -> List[Question]:
         if not self.players:
-            return
+            return []
+        messages = []
+        questions = []
         for p in self.players.values():
-            p.current_questions = None
+            p.current_question = MISSING
             p.choice = 0
+            if p.dead:
+                continue
             msg = ""
             targets = []
             q_type = QuestionType.Trouble
@@ -422,11 +744,11 @@ class Session:
                 targets = target_base
                 msg = "你想守护谁？"
                 q_type = QuestionType.Guard
-            elif p.role in WOLF_ROLES:
+            elif p.role in ROLES.wolves:
                 if self.silver_spread:
-                    break
-                targets = [n for n in target_base if n.role not in WOLF_ROLES and n.role != ROLES.SnowWolf]
-                other = self.get_survived_player_with_roles(WOLF_ROLES)
+                    continue
+                targets = [n for n in target_base if n.role not in ROLES.pack]
+                other = self.get_survived_player_with_roles(ROLES.wolves)
                 msg = "你想要吃掉谁？\n" + "请确定你已与 %s 商量。" % ", ".join([n.name for n in other])
                 q_type = QuestionType.Kill
             elif p.role is ROLES.Cultist:
@@ -455,7 +777,7 @@ class Session:
             elif p.role is ROLES.Cupid:
                 if self.day == 1:
                     targets = target_base
-                    msg = "你想让哪两个玩家成为情侣？请选择第一个玩家"
+                    msg = "你想让谁坠入爱河？另一位情侣将由命运决定。"
                     q_type = QuestionType.Lover1
                 else:
                     p.choice = -1
@@ -472,9 +794,10 @@ class Session:
                     msg = "今晚你想和谁进行博弈？"
                     q_type = QuestionType.Chemistry
                 else:
-                    p.used_ability = False
+                    # Brewing tonight; the next night is spent at someone's table.
+                    p.used_ability = True
                     p.choice = -1
-                    await p.member.send("夜深人静，疯狂的化学家开始制药了，希望不被人发现。")
+                    messages.append((p.member, "夜深人静，疯狂的化学家开始制药了，希望不被人发现。"))
             elif p.role is ROLES.SnowWolf:
                 if not self.silver_spread:
                     targets = target_base
@@ -482,6 +805,8 @@ class Session:
                     q_type = QuestionType.Freeze
             elif p.role is ROLES.Arsonist:
                 targets = [n for n in target_base if not n.doused]
+                if len(targets) < len(target_base):
+                    targets.append(IGNITE)
                 msg = "今天你想浇汽油，还是放一把火，烧掉你曾经浇过汽油的房子？"
                 q_type = QuestionType.Douse
             else:
@@ -491,13 +816,25 @@ class Session:
                 p.choice = -1
                 continue
 
-            await self.cog.send_menu([n.name for n in targets], targets, p.member, msg, q_type)
-
-    async def hunter_final_shot(self, hunter: Player, kill_method: KillMethod, delay: bool = False):
-        if delay:
-            hunter.final_shot_delay = kill_method
-            return
-        target = self.alive_players
+            question = self.transport.build_menu([n.name for n in targets], targets, p.member, msg, q_type)
+            if question is None:
+                continue
+            question.future.add_done_callback(
+                lambda f, ply=p: setattr(ply, 'choice', f.result()) if not f.cancelled() else None
+            )
+            p.current_question = question
+            questions.append(question)
+            messages.append((p.member, question.prompt))
+        await self.transport.send_all(messages)
+        return questions
+
+    async def hunter_final_shot(self, hunter: Player, kill_method: KillMethod) -> Tuple[str, Optional[Player]]:
+        """Ask ``hunter`` whom to take along and tell the village; the caller kills the target.
+
+        Returns the outcome, one of ``timeout``, ``skip``, ``elder`` and ``shot``, and the
+        player aimed at.
+        """
+        target = [n for n in self.alive_players if n is not hunter]
         random.shuffle(target)
 
         if kill_method == KillMethod.Lynch:
@@ -507,67 +844,31 @@ class Session:
         msg += '\n可用的目标：\n' + '-1: 跳过\n' + '\n'.join(f"{idx}: {ply.name}" for idx, ply in enumerate(target))
         msg += '\n发送你要射杀那个人的ID！或者输入 -1 来跳过。'
 
-        def check(message: qq.Message):
-            return (
-                    message.author == hunter.member and
-                    message.content.isnumeric() and
-                    int(message.content) <= len(target)
-            )
-
-        choice = None
         hunter.dead = True
-        try:
-            choice = await self.bot.wait_for('message', check=check, timeout=30)
-        except asyncio.TimeoutError:
-            pass
-
-        if choice is None:
-            if kill_method == KillMethod.Lynch:
-                await self.ctx.send(
-                    f"当绳索快套紧{hunter.name}的脖子时，他摸索着手枪想杀个人来陪葬，但却慢了一步，因为颈部清脆的断裂声已经响起..."
-                )
-            else:
-                await self.ctx.send(
-                    f"似乎对{hunter.name}的打击太大了，以至于他们甚至无法伸手去拿自己的武器，躺在血泊中……"
-                )
-        elif choice == -1:
-            if kill_method == KillMethod.Lynch:
-                await self.ctx.send(
-                    f"{hunter.name}看着围观的一群愚民，拔出手枪，想找人陪葬。最终他没有扣下扳机，而是选择接受上天的安排，坦然面对死亡..."
-                )
-            else:
-                await self.ctx.send(
-                    f"{hunter.name} 躺在地上，还剩下最后一口气，原本还有机会射杀一人来陪葬，"
-                    f"他却放弃了……他决定听天由命……"
-                )
-        else:
-            killed = target[choice]
-            if killed.role is ROLES.WiseElder:
-                await self.ctx.send(
-                    f"🎯猎人{hunter.name} 向长老 {killed.name}开枪 ，但很快就后悔了，"
-                    f"因此{killed.name}放弃了他的身份，成为了一位普通村民。"
-                )
-                killed.role = ROLES.Villager
-                killed.changed_role_count += 1
-                return
-            if kill_method == KillMethod.Lynch:
-                await self.ctx.send(
-                    f"绳索套上 {hunter.name} 的脖子时，不甘被处死的他想找人陪葬，他迅速掏出一把枪，瞄准某处，扣动扳机，"
-                    f"只见 {killed.name} 满脸讶然之色，缓缓倒在地上。 {killed.name} 当场死亡。 {killed.role_description}"
-                )
-            else:
-                await self.ctx.send(
-                    f"{hunter.name}倒在地上快死了…… 但最后一刻他抓住了他的手枪，向{killed.name}开火，{killed.name}在两眼之间中了一枪。"
-                    f"{killed.name} 当场死亡。 {killed.role_description}"
-                )
-            await self.kill_player(killed, KillMethod.HunterShot, killer=hunter, is_night=False)
-            await self.check_role_changes()
-
+        question = self.transport.ask(
+            hunter.member, QuestionType.HunterKill, target, msg, allow_skip=True, replace=True
+        )
+        await self.transport.send(hunter.member, msg)
+        choice = await self.transport.wait(question, timeout=30)
+
+        if choice is None or choice == -1:
+            outcome = 'timeout' if choice is None else 'skip'
+            self.post(narrative.hunter_final_shot(hunter, kill_method, outcome))
+            return outcome, None
+        killed = target[choice]
+        if killed.role is ROLES.WiseElder:
+            self.post(narrative.hunter_final_shot(hunter, kill_method, 'elder', killed))
+            killed.role = ROLES.Villager
+            killed.changed_role_count += 1
+            return 'elder', killed
+        self.post(narrative.hunter_final_shot(hunter, kill_method, 'shot', killed))
+        return 'shot', killed
+
+    @metrics.instrument('end')
     async def end(self, teams: WinType):
         if not self.is_running:
             return False
         self.is_running = False
-        msg = ""
 
         self.end_time = datetime.datetime.now()
         if teams == WinType.Lovers:
@@ -577,11 +878,12 @@ class Session:
         else:
             for k in self.players.values():
                 if k.role.party != teams:
-                    break
-                if teams in [WinType.SerialKiller, WinType.Arsonist]:
+                    continue
+                # A lone killer only wins by being the one left standing.
+                if teams in [WinType.SerialKiller, WinType.Arsonist] and k.dead:
                     continue
 
-                if teams == WinType.Tanner and not k.died_last_night:
+                if teams == WinType.Tanner and k.kill_method is not KillMethod.Lynch:
                     continue
 
                 k.win = True
@@ -589,190 +891,68 @@ class Session:
                     k.in_love.win = True
 
         if teams == WinType.NoOne:
-            survivor = [n for n in self.players.values() if not n.dead]
-            death_message = ""
-            if len(survivor) == 3:
-                doppelganger = self.get_survived_player_with_role(ROLES.Doppelganger)
-                thief = self.get_survived_player_with_role(ROLES.Thief)
-                sorc = self.get_survived_player_with_role(ROLES.Sorcerer)
-
-                if doppelganger and thief and sorc:
-                    death_message = f"清晨的雾气消散，🔮暗黑法师{sorc.name}，寻找下一个繁盛的村庄。 #暗黑法师胜\n" \
-                                    f"啊！一个连自己唯一的任务都无法完成的人，其生活能有多悲惨？夺取他人外表的能力只是一个传说吗？我们永远也不会知道！" \
-                                    "现在村子里只有一个人，没有人可以模仿。他们唯一能做的就是模仿镜子里的人！这就是他们的能力。 #替身胜\n" \
-                                    f"👻小偷{thief.name} 离开了这个落后的小村庄，去追寻 诗和远方 （划去）..更好更多的职业 #小偷胜"
-            elif len(survivor) == 2:
-                if any(n.role == ROLES.Tanner for n in survivor) and any(n.role in [
-                    ROLES.Sorcerer, ROLES.Thief, ROLES.Doppelganger
-                ] for n in survivor):
-                    sorc_thief_dg = [n for n in survivor if n.role in [ROLES.Sorcerer, ROLES.Thief, ROLES.Doppelganger]]
-                    tann = self.get_survived_player_with_role(ROLES.Tanner)
-
-                    if sorc_thief_dg and tann:
-                        sorc_thief_dg = sorc_thief_dg[0]
-                        if sorc_thief_dg.role == ROLES.Doppelganger:
-                            await sorc_thief_dg.process_dg()
-                            if sorc_thief_dg.role == ROLES.Tanner:
-                                await self.kill_player(sorc_thief_dg, KillMethod.Suicide, sorc_thief_dg, False)
-                                death_message += f"胜利还是属于死亡，{sorc_thief_dg.name} " \
-                                                 f"在清晨的阳光中走入了烈火，世界最终会归尽。 #👺皮匠胜。"
-                            else:
-                                death_message += f"啊！一个连自己唯一的任务都无法完成的人，其生活能有多悲惨？" \
-                                                 f"夺取他人外表的能力只是一个传说吗？我们永远也不会知道！" \
-                                                 "现在村子里只有一个人，没有人可以模仿。" \
-                                                 "他们唯一能做的就是模仿镜子里的人！这就是他们的能力。 #替身胜\n"
-                        else:
-                            if sorc_thief_dg.role == ROLES.Sorcerer:
-                                death_message += f"清晨的雾气消散，🔮暗黑法师{sorc_thief_dg.name}" \
-                                                 f"离开这个空无一人村庄，寻找下一个繁盛的村庄。"
-                            if sorc_thief_dg.role == ROLES.Thief:
-                                death_message += f"👻小偷{sorc_thief_dg.name}离开了这个落后的小村庄，" \
-                                                 f"去追寻 诗和远方 （划去）..更好更多的职业 #小偷胜"
-                            if sorc_thief_dg.role == ROLES.Doppelganger:
-                                death_message += f"啊！一个连自己唯一的任务都无法完成的人，其生活能有多悲惨？" \
-                                                 f"夺取他人外表的能力只是一个传说吗？我们永远也不会知道！" \
-                                                 "现在村子里只有一个人，没有人可以模仿。" \
-                                                 "他们唯一能做的就是模仿镜子里的人！这就是他们的能力。 #替身胜\n"
-                elif any(n.role == ROLES.Sorcerer for n in survivor) and any(n.role in [
-                    ROLES.Thief, ROLES.Doppelganger
-                ] for n in survivor):
-                    sorc = self.get_survived_player_with_role(ROLES.Sorcerer)
-                    thief_dg = [n for n in survivor if n.role in [ROLES.Thief, ROLES.Doppelganger]]
-                    if sorc and thief_dg:
-                        thief_dg = thief_dg[0]
-                        death_message = f"清晨的雾气消散，🔮暗黑法师{sorc.name}" \
-                                        f"离开这个空无一人村庄，寻找下一个繁盛的村庄。"
-                        if thief_dg.role == ROLES.Doppelganger:
-                            death_message += f"啊！一个连自己唯一的任务都无法完成的人，其生活能有多悲惨？" \
-                                             f"夺取他人外表的能力只是一个传说吗？我们永远也不会知道！" \
-                                             "现在村子里只有一个人，没有人可以模仿。" \
-                                             "他们唯一能做的就是模仿镜子里的人！这就是他们的能力。 #替身胜\n"
-                        else:
-                            death_message += f"👻小偷{thief_dg.name}离开了这个落后的小村庄，" \
-                                             f"去追寻 诗和远方 （划去）..更好更多的职业 #小偷胜"
-                if all(n.role in [ROLES.Doppelganger, ROLES.Thief] for n in survivor):
-                    thief = self.get_survived_player_with_role(ROLES.Thief)
-                    dg = self.get_survived_player_with_role(ROLES.Doppelganger)
-
-                    if dg and thief:
-                        death_message = f"👻小偷{thief.name}离开了这个落后的小村庄，" \
-                                        f"去追寻 诗和远方 （划去）..更好更多的职业 #小偷胜"
-                        death_message += f"啊！一个连自己唯一的任务都无法完成的人，其生活能有多悲惨？" \
-                                         f"夺取他人外表的能力只是一个传说吗？我们永远也不会知道！" \
-                                         "现在村子里只有一个人，没有人可以模仿。" \
-                                         "他们唯一能做的就是模仿镜子里的人！这就是他们的能力。 #替身胜\n"
-            elif len(survivor) == 1:
-                survivor = survivor[0]
-                if survivor.role is ROLES.Tanner:
-                    await self.kill_player(survivor, KillMethod.Suicide, survivor, False)
-                    death_message = f"胜利还是属于死亡，{survivor.name} " \
-                                    f"在清晨的阳光中走入了烈火，世界最终会归尽。 #👺皮匠胜。"
-                elif survivor.role is ROLES.Sorcerer:
-                    death_message = f"清晨的雾气消散，🔮暗黑法师{survivor.name}" \
-                                    f"离开这个空无一人村庄，寻找下一个繁盛的村庄。"
-                elif survivor.role is ROLES.Thief:
-                    death_message = f"👻小偷{survivor.name}离开了这个落后的小村庄，" \
-                                    f"去追寻 诗和远方 （划去）..更好更多的职业 #小偷胜"
-                elif survivor.role is ROLES.Doppelganger:
-                    death_message = f"啊！一个连自己唯一的任务都无法完成的人，其生活能有多悲惨？" \
-                                    f"夺取他人外表的能力只是一个传说吗？我们永远也不会知道！" \
-                                    "现在村子里只有一个人，没有人可以模仿。" \
-                                    "他们唯一能做的就是模仿镜子里的人！这就是他们的能力。 #替身胜\n"
-            death_message += "所有人都死了。这届人类不行啊。 #无人胜 #空城"
-            await self.ctx.send(death_message)
-        elif teams == WinType.Wolf:
-            msg += "#狼人胜！ 看来这届村民不行啊！"
-            await self.ctx.send(msg)
-        elif teams == WinType.Tanner:
-            msg += "糟糕！你们竟然昏了头脑把皮匠公审了！#皮匠胜。"
-            await self.ctx.send(msg)
-        elif teams == WinType.Arsonist:
-            if len(self.alive_players) > 1:
-                alive = self.alive_players
-                other = [n for n in alive if n.role != ROLES.Arsonist][0]
-                arsonist = [n for n in alive if n.role == ROLES.Arsonist][0]
-                msg = f"只剩🔥纵火犯 {arsonist.name}和 {other.name} ... " \
-                      f"突然 {arsonist.name} 笑起来, 划了一根火柴，" \
-                      f"丢向了了 {other.name}，{other.name} 瞬间燃烧起来了... \n"
-                other.dead = True
-                other.time_died = self.day
-            msg += "最后，除了🔥纵火犯的家，村子里只剩一片火海。#纵火犯胜..."
-            await self.ctx.send(msg)
-        elif teams == WinType.Cult:
-            msg += "次日清晨，所有人👤邪教徒走上街头，最后一个人也受洗成为👤邪教徒 —— #邪教徒胜！"
-            await self.ctx.send(msg)
-        elif teams == WinType.SerialKiller:
-            if len(self.alive_players) > 1:
-                alive = self.alive_players
-                other = [n for n in alive if n.role != ROLES.SerialKiller][0]
-                sk = [n for n in alive if n.role == ROLES.SerialKiller][0]
-                msg = f"这天早上，剩下的两个市民走到广场中央，🔪变态杀人狂 {sk.name} 看了一眼 {other.name} ，" \
-                      f"脸上露出邪恶的笑容，「唰！」的一声抽出一把匕首，手起刀落，只见 {other.name} 已倒下。" \
-                      f"整个城市只剩下 {sk.name} 是活着的…… #杀人狂胜"
+            survivor = self.alive_players
+            told = narrative.endings(survivor)
+            for p in told:
+                if p.role is ROLES.Doppelganger and len(survivor) == 2 and any(n.role is ROLES.Tanner for n in survivor):
+                    await p.process_dg()
+                if p.role is ROLES.Tanner:
+                    await self.kill_player(p, KillMethod.Suicide, p, False)
+            self.post(narrative.no_one_message(told))
+        elif teams == WinType.SKHunter:
+            h = self.get_survived_player_with_role(ROLES.Hunter)
+            sk = self.get_survived_player_with_role(ROLES.SerialKiller)
+            if sk and h:
+                await self.kill_player(sk, KillMethod.HunterCult, h, False)
+                await self.kill_player(h, KillMethod.SerialKilled, sk, False, hunter_final_shot=False)
+            self.post(narrative.sk_hunter_message(sk, h))
+        elif teams in (WinType.Arsonist, WinType.SerialKiller):
+            alive = self.alive_players
+            winner = other = None
+            if len(alive) > 1:
+                role = ROLES.Arsonist if teams == WinType.Arsonist else ROLES.SerialKiller
+                other = [n for n in alive if n.role != role][0]
+                winner = [n for n in alive if n.role == role][0]
                 other.dead = True
                 other.time_died = self.day
-            msg += "唯一活着的竟然是🔪变态杀人狂！！ #杀人魔胜"
-            await self.ctx.send(msg)
-        elif teams == WinType.Lovers:
-            msg += "胜利属于爱神！ #情侣胜！"
-            await self.ctx.send(msg)
-        elif teams == WinType.SKHunter:
-            h = [n for n in self.alive_players if n.role == ROLES.Hunter]
-            sk = [n for n in self.alive_players if n.role == ROLES.SerialKiller]
-            msg += "所有人都死了。这届人类不行啊。 #无人胜 #空城"
-            if sk:
-                await self.kill_player(sk[0], KillMethod.HunterCult, h[0], False)
-                if h:
-                    await self.kill_player(sk[0], KillMethod.HunterCult, h[0], False)
-                    msg += f"曙光乍现， {sk[0].name} 和 {h[0].name} 并排前行，忽然🔪变态杀人狂 {sk[0].name} 拔出了匕首，" \
-                           f"跳到 {h[0].name} 身上，把匕首狠狠刺入 {h[0].name} 胸部的同时，猎人 {h[0].name} 也反应迅敏地拔出枪，" \
-                           f"对着 {sk[0].name} 的脸就是一枪，把 {sk[0].name} 的头打爆了。\n {h[0].name} 也好不到哪儿去，" \
-                           f"匕首已经刺穿了他的心脏……最后两人都死了……\n这就是传说中的相爱相杀？ #空城"
-            await self.ctx.send(msg)
+            self.post(narrative.win_message(teams, winner, other))
         else:
-            msg += "#人类胜！ "
-            await self.ctx.send(msg)
-        survivor = self.alive_players
-        msg = f"幸存者们: {len(survivor)}/{len(self.players)}\n"
-        for p in sorted(self.players.values(), key=lambda a: a.time_died):
-            msg += f"{p.member.mention}: {'❌ 死亡' if p.dead else '✅ 存活'}{'(🏳️ 已逃跑)' if p.flee else ''}"
-            msg += f"{'❤️' if p.in_love else ''} {'胜利' if p.win else '失败'}\n"
-        time_played = self.end_time - self.start_time
-        msg += f"游戏进行了：{time_played}"
-        await self.ctx.send(msg)
-
-    async def check_role_changes(self):
-        aps = self.get_survived_player_with_role(ROLES.ApprenticeSeer)
-        if aps:
-            await aps.process_aps()
-
-        wc = self.get_survived_player_with_role(ROLES.WildChild)
-        if wc:
-            await wc.process_wc()
-
-        dg = self.get_survived_player_with_role(ROLES.Doppelganger)
-        if dg:
-            await dg.process_dg()
+            self.post(narrative.win_message(teams))
+        self.post(narrative.survivors_message(
+            sorted(self.players.values(), key=lambda a: a.time_died),
+            len(self.alive_players),
+            self.end_time - self.start_time,
+        ))
+        if self.history is not None:
+            self.history.record(GameRecord.from_session(self, teams))
+        return True
+
+    async def check_role_changes(self) -> List[Player]:
+        """Promote an apprentice seer, wild child or doppelganger whose moment has come; returns who changed."""
+        changed = []
+        for role, process in (
+                (ROLES.ApprenticeSeer, Player.process_aps),
+                (ROLES.WildChild, Player.process_wc),
+                (ROLES.Doppelganger, Player.process_dg),
+        ):
+            p = self.get_survived_player_with_role(role)
+            if p:
+                await process(p)
+                if p.role is not role:
+                    changed.append(p)
+        return changed
 
     def get_survived_player_with_role(self, role: Role) -> Optional[Player]:
-        ts = self.get_player_with_role(role)
-        for t in ts:
-            if not t.dead:
-                return t
-        else:
-            return None
+        return self.index.alive_with_role(role)
 
-    def get_survived_player_with_roles(self, roles: List[Role]) -> List[Player]:
-        players = [n for n in self.players.values() if n.role in roles and not n.dead]
-        return players if players else []
+    def get_survived_player_with_roles(self, roles: Iterable[Role]) -> List[Player]:
+        return self.index.alive_with_roles(roles)
 
     def get_player_with_role(self, role: Role) -> List[Player]:
-        players = [n for n in self.players.values() if n.role is role]
-        return players if players else []
+        return self.index.with_role(role)
 
     def get_player_with_roles(self, roles: List[Role]) -> List[Player]:
-        players = [n for n in self.players.values() if n.role in roles]
-        return players if players else [None]
+        return self.index.with_roles(roles)
 
     @property
     def player_count(self) -> int:
@@ -781,16 +961,24 @@ class Session:
 
     @property
     def player_list_string(self) -> str:
-        players = "\n".join([m.member.mention for n, m in self.players.items()])
-        return f'玩家: {self.player_count}\n{players}'
+        return self.roster.players()
+
+    @property
+    def alive_list_string(self) -> str:
+        return self.roster.alive_players()
+
+    @property
+    def dead_list_string(self) -> str:
+        return self.roster.dead_players()
 
     @property
     def alive_players(self) -> List[Player]:
-        return [n for n in self.players.values() if not n.dead]
+        return self.index.alive_players()
 
     def is_disabled(self, role: Role) -> bool:
         return not not (self.setting.disabled_role & (1 << role.bit))
 
+    @metrics.instrument('assign_role')
     def assign_role(self) -> None:
         role_to_assign = self.balance()
         player = list(self.players.values())
@@ -804,103 +992,22 @@ class Session:
             ply.cult_leader = ply.role == ROLES.Cultist
 
     def balance(self) -> List[Role]:
-        role_to_assign = self.get_role_list()
-        if self.player_count > len(role_to_assign):
-            role_to_assign += [ROLES.Villager] * (self.player_count - len(role_to_assign))
-        count = 0
-        while True:
-            count += 1
-            roles = random.choices(role_to_assign, k=self.player_count)
-            if count >= 500:
-                break
-            pointless_role = [
-                x for x in roles if
-                x in [ROLES.Traitor, ROLES.SnowWolf, ROLES.Sorcerer]
-            ]
-
-            if pointless_role and ROLES.Wolf not in roles:
-                roles[roles.index(pointless_role[0])] = ROLES.Wolf
-
-            if (
-                    ROLES.Cultist in roles and
-                    ROLES.CultistHunter not in roles and
-                    not self.is_disabled(ROLES.CultistHunter)
-            ):
-                if ROLES.Villager in roles:
-                    roles[roles.index(ROLES.Villager)] = ROLES.CultistHunter
-                else:
-                    roles[roles.index(ROLES.Cultist)] = ROLES.Villager
-
-            if (
-                    not self.setting.burning_overkill and
-                    ROLES.Arsonist in roles and
-                    ROLES.SerialKiller in roles
-            ):
-                roles[roles.index(ROLES.Arsonist)] = ROLES.Villager
-
-            if ROLES.ApprenticeSeer in roles and ROLES.Seer not in roles:
-                roles[roles.index(ROLES.ApprenticeSeer)] = ROLES.Seer
-
-            villagers = [x for x in roles if x in ROLES.not_evil_list]
-            baddies = [x for x in roles if x in ROLES.evil_list]
-            if not (villagers and baddies):
-                continue
-
-            if len(villagers) < len(baddies):
-                continue
-
-            if self.chaos:
-                break
-
-            villager_strength = sum([n.strength for n in villagers])
-            enemy_strength = sum([n.strength for n in baddies])
-            variance = self.player_count // 4 + 1
-            if abs(villager_strength - enemy_strength) <= variance:
-                break
-        return roles
+        return balance_roles(
+            self.get_role_list(),
+            self.player_count,
+            chaos=self.chaos,
+            burning_overkill=self.setting.burning_overkill,
+            cult_hunter=not self.is_disabled(ROLES.CultistHunter),
+        ).roles
 
     def get_role_list(self) -> List[Role]:
-        possible_wolf = [n for m, n in ROLES.wolf.items() if not self.is_disabled(n)]
-        role_to_assign: List[Role] = []
-
-        wolf_count = min(max(self.player_count // 5, 1), 5)
-        if wolf_count == 1:
-            if ROLES.SnowWolf in possible_wolf:
-                possible_wolf.remove(ROLES.SnowWolf)
-        for n in range(wolf_count):
-            role = random.choice(possible_wolf)
-            if role is not ROLES.Wolf:
-                possible_wolf.remove(role)
-            role_to_assign.append(role)
-
-        for name, role in ROLES.not_wolf.items():
-            if self.is_disabled(role):
-                continue
-            if role is ROLES.Cultist:
-                if self.player_count > 10:
-                    role_to_assign.append(role)
-                continue
-            role_to_assign.append(role)
-
-        if not self.is_disabled(ROLES.Mason):
-            role_to_assign.append(ROLES.Mason)
-            role_to_assign.append(ROLES.Mason)
-
-        if ROLES.CultistHunter in role_to_assign and not self.is_disabled(ROLES.Cultist):
-            role_to_assign.append(ROLES.Cultist)
-            role_to_assign.append(ROLES.Cultist)
-
-        for n in range(self.player_count // 4):
-            role_to_assign.append(ROLES.Villager)
-
-        return role_to_assign
+        return role_pool(self.player_count, self.setting.disabled_role)
 
+    @metrics.instrument('notify_roles')
     async def notify_roles(self) -> None:
-        for ply in self.players.values():
-            if ply.role is MISSING:
-                continue
-        for ply in self.players.values():
-            await ply.member.send(self.get_role_info(ply.role))
+        await self.transport.send_all(
+            (ply.member, self.get_role_info(ply.role)) for ply in self.players.values() if ply.role is not MISSING
+        )
 
     def get_role_info(self, role: Role) -> str:
         if role is ROLES.Thief:
@@ -916,57 +1023,12 @@ class Session:
             msg += "\n其他共济会会员是：\n" + '\n'.join(
                 [n.member.display_name for n in self.players.values() if n.role is ROLES.Mason]
             )
-        if role in ROLES.wolf.values():
+        if ROLES.is_wolf(role):
             msg += "\n当前狼群：\n" + '\n'.join(
-                [n.member.display_name for n in self.players.values() if n.role in ROLES.wolf.values()]
+                [n.member.display_name for n in self.players.values() if ROLES.is_wolf(n.role)]
             )
         if role is ROLES.Cultist:
             msg += "\n目前邪教教会成员: \n" + '\n'.join(
                 [n.member.display_name for n in self.players.values() if n.role is ROLES.Cultist]
             )
         return msg
-
-# if __name__ == '__main__':
-#     import timeit
-#     number = 10000
-#     time = timeit.timeit(
-#         'sess.assign_role()',
-#         setup='''from __main__ import Session, Player, random
-#
-# class Dummy:
-#     @property
-#     def id(self):
-#         return random.randint(0, 65565)
-#
-#     def __repr__(self):
-#         return "<Dummy>"
-#
-# sess = Session(False)
-# for n in range(16):
-#     d = Dummy()
-#     p = Player(d)
-#     sess.join(p)
-# ''',
-#         number=number
-#     )
-#     print(time / number * 1000, 'ms per')
-
-# class Dummy:
-#     @property
-#     def id(self):
-#         return random.randint(0, 65565)
-#
-#     @property
-#     def display_name(self):
-#         return 'Bob_' + str(self.id)
-#
-#     def __repr__(self):
-#         return "<Dummy>"
-#
-#
-# sess = Session(True)
-# for n in range(16):
-#     d = Dummy()
-#     p = Player(d)
-#     sess.join(p)
-# sess.assign_role()
@@ -0,0 +1,443 @@
+"""Run sessions in worker processes, sharded by guild id.
+
+The front process keeps the QQ connection. It forwards the events a game needs
+(start, join, leave, force start and numeric DM replies) to the worker that owns the
+guild, ``guild_id % workers``, and relays whatever the worker's sessions post or DM
+back out through the cog's outbound queue and DM dispatcher. Each worker runs its own
+event loop, so CPU heavy work such as role balancing or end-of-game rendering only
+holds up the guilds of that one worker.
+
+Messages travel over one ``multiprocessing`` pipe per worker as tuples. Everything a
+worker emits during one loop iteration is sent as a single batch.
+
+Workers snapshot their sessions into the cog's snapshot directory like the front
+does. Stopping the pool cancels the games but keeps their snapshots, and the cog
+hands them to the new pool after a reload (:meth:`ShardPool.resume`). ``/profile``
+is forwarded to the worker running the game, which DMs the result back.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import multiprocessing
+from multiprocessing.connection import Connection
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from cogs.werewolf.dispatch import BatchReport
+from cogs.werewolf.history import HistoryStore
+from cogs.werewolf.profiling import PhaseProfiler
+from cogs.werewolf.question import QuestionRouter
+from cogs.werewolf.scheduler import Scheduler
+from cogs.werewolf.snapshot import SnapshotStore
+from cogs.werewolf.transport import Transport
+
+__all__ = (
+    'RemoteMember',
+    'RelayTransport',
+    'ShardWorker',
+    'ShardPool',
+)
+
+log = logging.getLogger(__name__)
+
+MemberInfo = Tuple[int, str, str]
+
+
+class RemoteMember:
+    """A member as seen from a worker: just enough of ``qq.Member`` for a session."""
+    __slots__ = ('id', 'display_name', 'mention')
+
+    def __init__(self, member_id: int, display_name: str, mention: str):
+        self.id: int = member_id
+        self.display_name: str = display_name
+        self.mention: str = mention
+
+    def __repr__(self):
+        return f'<RemoteMember id={self.id} name={self.display_name}>'
+
+    @classmethod
+    def info(cls, member) -> MemberInfo:
+        return member.id, member.display_name, member.mention
+
+
+class _Snowflake:
+    __slots__ = ('id',)
+
+    def __init__(self, snowflake_id: int):
+        self.id: int = snowflake_id
+
+
+class RelayTransport(Transport):
+    """Sends a worker session's posts and DMs back to the front process."""
+
+    def __init__(self, worker: ShardWorker, channel_id: int):
+        self.worker = worker
+        self.channel_id: int = channel_id
+        self.router: QuestionRouter = worker.router
+        self.scheduler: Scheduler = worker.scheduler
+
+    def post(self, content: str):
+        if content:
+            self.worker.emit(('post', self.channel_id, content))
+
+    async def send_all(self, messages: Iterable[Tuple[RemoteMember, str]]) -> BatchReport:
+        report = BatchReport()
+        for member, content in messages:
+            if content:
+                self.worker.emit(('dm', member.id, content))
+                report.sent += 1
+        return report
+
+
+class ShardWorker:
+    """The event loop of one worker process."""
+
+    def __init__(
+            self,
+            conn: Connection,
+            index: int,
+            history: Optional[str] = None,
+            snapshots: Optional[str] = None,
+            profiles: str = 'profiles',
+    ):
+        self.conn = conn
+        self.index: int = index
+        self.router: QuestionRouter = QuestionRouter()
+        self.scheduler: Scheduler = Scheduler()
+        self.sessions: Dict[int, Any] = {}
+        self.tasks: Dict[int, asyncio.Task] = {}
+        self.history: Optional[HistoryStore] = HistoryStore(history) if history else None
+        self.snapshots: Optional[SnapshotStore] = SnapshotStore(snapshots) if snapshots else None
+        self.profiles: str = profiles
+        self.finished: int = 0
+        self._out: List[tuple] = []
+        self._stopped: Optional[asyncio.Future] = None
+
+    def emit(self, message: tuple):
+        if not self._out:
+            asyncio.get_running_loop().call_soon(self._flush)
+        self._out.append(message)
+
+    def _flush(self):
+        out, self._out = self._out, []
+        try:
+            self.conn.send(out)
+        except (BrokenPipeError, EOFError, OSError):
+            self._stop()
+
+    def _on_readable(self):
+        try:
+            while self.conn.poll():
+                for message in self.conn.recv():
+                    self.handle(*message)
+        except (EOFError, OSError):
+            self._stop()
+
+    def _stop(self):
+        if not self._stopped.done():
+            self._stopped.set_result(None)
+
+    def handle(self, kind: str, *args):
+        if kind == 'answer':
+            self.router.dispatch(*args)
+        elif kind == 'start':
+            self.start(*args)
+        elif kind == 'resume':
+            self.resume(*args)
+        elif kind == 'simulate':
+            self.simulate(*args)
+        elif kind == 'profile':
+            self.profile(*args)
+        elif kind in ('join', 'leave', 'force_start'):
+            session = self.sessions.get(args[0])
+            if session is None or not session.is_joining:
+                return
+            if kind == 'join':
+                session.join(RemoteMember(*args[1]))
+                self.emit(('post', session.channel.id, session.player_list_string))
+            elif kind == 'leave':
+                session.leave(_Snowflake(args[1]))
+            else:
+                session.force_start = True
+        elif kind == 'stop':
+            self._stop()
+
+    def start(self, guild_id: int, channel_id: int, chaos: bool, author: MemberInfo):
+        if guild_id in self.sessions:
+            return
+        session = self._session(guild_id, channel_id, chaos)
+        session.join(RemoteMember(*author))
+        self.sessions[guild_id] = session
+        session.post(session.player_list_string)
+        self._run(guild_id, session.main_game_loop())
+
+    def resume(self, guild_id: int, channel_id: int, members: List[MemberInfo]):
+        """Continue the game of ``guild_id`` from its snapshot; ``members`` are its players as the front sees them."""
+        state = self.snapshots.load(guild_id) if self.snapshots is not None else None
+        if state is None or guild_id in self.sessions:
+            self.emit(('ended', guild_id))
+            return
+        session = self._session(guild_id, channel_id, state.chaos)
+        known = {n[0]: RemoteMember(*n) for n in members}
+        SnapshotStore.restore(state, session, known.get)
+        self.sessions[guild_id] = session
+        self._run(guild_id, session.resume(state.join_time))
+
+    def _session(self, guild_id: int, channel_id: int, chaos: bool):
+        from cogs.werewolf.session import Session
+
+        session = Session(
+            None, chaos, None, transport=RelayTransport(self, channel_id),
+            channel=_Snowflake(channel_id), guild=_Snowflake(guild_id),
+        )
+        session.history = self.history
+        session.snapshots = self.snapshots
+        return session
+
+    def profile(self, guild_id: int, member_id: int, phases: int):
+        session = self.sessions.get(guild_id)
+        if session is None:
+            self.emit(('dm', member_id, "本群没有正在进行的游戏。"))
+        elif session.profiler is not None and not session.profiler.done:
+            self.emit(('dm', member_id, "这局游戏已经在分析中了。"))
+        else:
+            session.profiler = PhaseProfiler(
+                guild_id, phases, self.profiles,
+                lambda path, summary: self.emit(('dm', member_id, f"{path}\n{summary}")),
+            )
+
+    def simulate(self, guild_id: int, player_count: int, seed: Optional[int]):
+        """A headless game whose channel posts are relayed like a real one's, for load tests."""
+        from cogs.werewolf.simulation import LocalTransport, simulate
+
+        worker = self
+
+        class Relayed(LocalTransport):
+            def post(self, content: str):
+                worker.emit(('post', guild_id, content))
+
+        self.sessions[guild_id] = None
+        self._run(guild_id, simulate(player_count, seed=seed, history=self.history, transport=Relayed()))
+
+    def _run(self, guild_id: int, game):
+        async def run():
+            stopping = False
+            try:
+                await game
+            except asyncio.CancelledError:
+                # The pool is stopping; the snapshot stays so the game resumes after the reload.
+                stopping = True
+                raise
+            except Exception:
+                log.exception('Game of guild %s failed', guild_id)
+            finally:
+                session = self.sessions.pop(guild_id, None)
+                self.tasks.pop(guild_id, None)
+                if session is not None and session.profiler is not None:
+                    session.profiler.finish()
+                if not stopping:
+                    if self.snapshots is not None:
+                        self.snapshots.remove(guild_id)
+                    self.finished += 1
+                    self.emit(('ended', guild_id))
+
+        self.tasks[guild_id] = asyncio.create_task(run())
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        self._stopped = loop.create_future()
+        loop.add_reader(self.conn.fileno(), self._on_readable)
+        try:
+            await self._stopped
+        finally:
+            loop.remove_reader(self.conn.fileno())
+            tasks = list(self.tasks.values())
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self.scheduler.close()
+            if self.history is not None:
+                await self.history.close()
+
+
+def _worker_main(conn: Connection, index: int, history: Optional[str], snapshots: Optional[str], profiles: str):
+    asyncio.run(ShardWorker(conn, index, history, snapshots, profiles).run())
+
+
+class ShardPool:
+    """Front side of the worker pool; lives on the cog's event loop.
+
+    ``on_post(channel_id, content)`` and ``on_dm(member_id, content)`` are called for
+    everything the workers send back. ``on_ended(guild_id, channel_id, member_ids)`` is
+    called once a guild's game is over, or lost with its worker, after the pool has
+    forgotten it. Workers record finished games in the :class:`HistoryStore` at
+    ``history`` and snapshot running ones into the ``snapshots`` directory; without
+    them they do neither. Profiles go to the ``profiles`` directory.
+    """
+
+    def __init__(
+            self,
+            workers: int,
+            *,
+            on_post: Callable[[int, str], Any],
+            on_dm: Callable[[int, str], Any],
+            on_ended: Callable[[int, int, Set[int]], Any] = lambda guild_id, channel_id, member_ids: None,
+            history: Optional[str] = None,
+            snapshots: Optional[str] = None,
+            profiles: str = 'profiles',
+    ):
+        self.workers: int = max(workers, 1)
+        self.history: Optional[str] = history
+        self.snapshots: Optional[str] = snapshots
+        self.profiles: str = profiles
+        self.on_post = on_post
+        self.on_dm = on_dm
+        self.on_ended = on_ended
+        self.conns: List[Connection] = []
+        self.processes: List[multiprocessing.Process] = []
+        # member id -> the guild whose game they are in
+        self.members: Dict[int, int] = {}
+        # guild id -> channel id, and guild id -> member ids, of every game in progress
+        self.guilds: Dict[int, int] = {}
+        self.rosters: Dict[int, Set[int]] = {}
+
+    def shard(self, guild_id: int) -> int:
+        return guild_id % self.workers
+
+    def start(self):
+        context = multiprocessing.get_context('spawn')
+        loop = asyncio.get_running_loop()
+        for index in range(self.workers):
+            conn, child = context.Pipe()
+            process = context.Process(
+                target=_worker_main, args=(child, index, self.history, self.snapshots, self.profiles),
+                daemon=True,
+            )
+            process.start()
+            child.close()
+            loop.add_reader(conn.fileno(), self._on_readable, conn)
+            self.conns.append(conn)
+            self.processes.append(process)
+
+    def _on_readable(self, conn: Connection):
+        try:
+            while conn.poll():
+                for kind, *args in conn.recv():
+                    if kind == 'post':
+                        self.on_post(*args)
+                    elif kind == 'dm':
+                        self.on_dm(*args)
+                    elif kind == 'ended':
+                        self._forget(args[0])
+        except (EOFError, OSError):
+            asyncio.get_running_loop().remove_reader(conn.fileno())
+            index = self.conns.index(conn)
+            lost = [n for n in self.guilds if self.shard(n) == index]
+            log.error('Worker %d went away with the games of %d guilds', index, len(lost))
+            for guild_id in lost:
+                self._forget(guild_id)
+
+    def _forget(self, guild_id: int):
+        channel_id = self.guilds.pop(guild_id, None)
+        if channel_id is None:
+            return
+        member_ids = self.rosters.pop(guild_id, set())
+        for member_id in member_ids:
+            if self.members.get(member_id) == guild_id:
+                del self.members[member_id]
+        self.on_ended(guild_id, channel_id, member_ids)
+
+    def _send(self, index: int, message: tuple) -> bool:
+        try:
+            self.conns[index].send([message])
+        except (BrokenPipeError, OSError):
+            log.error('Worker %d went away, dropping %r', index, message[0])
+            return False
+        return True
+
+    def send(self, guild_id: int, *message) -> bool:
+        return self._send(self.shard(guild_id), message)
+
+    def __contains__(self, guild_id: int) -> bool:
+        return guild_id in self.guilds
+
+    def start_game(self, guild_id: int, channel_id: int, chaos: bool, author) -> bool:
+        if guild_id in self.guilds:
+            return False
+        if not self.send(guild_id, 'start', guild_id, channel_id, chaos, RemoteMember.info(author)):
+            return False
+        self._track(guild_id, channel_id, (author,))
+        return True
+
+    def resume(self, guild_id: int, channel_id: int, members: List[Any]) -> bool:
+        """Have the worker continue the game of ``guild_id`` from its snapshot."""
+        if guild_id in self.guilds:
+            return False
+        if not self.send(guild_id, 'resume', guild_id, channel_id, [RemoteMember.info(n) for n in members]):
+            return False
+        self._track(guild_id, channel_id, members)
+        return True
+
+    def _track(self, guild_id: int, channel_id: int, members: Iterable[Any]):
+        self.guilds[guild_id] = channel_id
+        self.rosters[guild_id] = set()
+        for member in members:
+            self._add(guild_id, member.id)
+
+    def _add(self, guild_id: int, member_id: int):
+        self.members[member_id] = guild_id
+        self.rosters[guild_id].add(member_id)
+
+    def join(self, guild_id: int, member) -> bool:
+        if guild_id not in self.guilds:
+            return False
+        self._add(guild_id, member.id)
+        return self.send(guild_id, 'join', guild_id, RemoteMember.info(member))
+
+    def leave(self, guild_id: int, member_id: int):
+        if self.members.get(member_id) == guild_id:
+            del self.members[member_id]
+            self.rosters[guild_id].discard(member_id)
+        self.send(guild_id, 'leave', guild_id, member_id)
+
+    def force_start(self, guild_id: int):
+        self.send(guild_id, 'force_start', guild_id)
+
+    def profile(self, guild_id: int, member_id: int, phases: int) -> bool:
+        if guild_id not in self.guilds:
+            return False
+        return self.send(guild_id, 'profile', guild_id, member_id, phases)
+
+    def simulate(self, guild_id: int, player_count: int, seed: Optional[int] = None):
+        self.guilds[guild_id] = guild_id
+        self.rosters[guild_id] = set()
+        self.send(guild_id, 'simulate', guild_id, player_count, seed)
+
+    def answer(self, member_id: int, content: str) -> bool:
+        guild_id = self.members.get(member_id)
+        if guild_id is None:
+            return False
+        return self.send(guild_id, 'answer', member_id, content)
+
+    async def close(self):
+        """Stop every worker. Their games are cancelled, but keep their snapshots."""
+        loop = asyncio.get_running_loop()
+        conns, self.conns = self.conns, []
+        processes, self.processes = self.processes, []
+        for conn in conns:
+            try:
+                loop.remove_reader(conn.fileno())
+                conn.send([('stop',)])
+            except (OSError, ValueError):
+                pass
+        # Joining blocks, so it runs on the default executor instead of this loop.
+        await loop.run_in_executor(None, _reap, processes)
+        for conn in conns:
+            conn.close()
+
+
+def _reap(processes: List[multiprocessing.Process]):
+    for process in processes:
+        process.join(5)
+        if process.is_alive():
+            process.terminate()
@@ -0,0 +1,154 @@
+"""Run complete games in memory, without QQ.
+
+``python -m cogs.werewolf.simulation 12`` plays one 12 player game with random bots and
+prints the channel log.
+"""
+from __future__ import annotations
+
+import asyncio
+import random
+import sys
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from cogs.werewolf.dispatch import BatchReport
+from cogs.werewolf.enum import QuestionType
+from cogs.werewolf.history import HistoryStore
+from cogs.werewolf.question import Question, QuestionRouter
+from cogs.werewolf.scheduler import Scheduler
+from cogs.werewolf.session import Session
+from cogs.werewolf.transport import Transport
+
+__all__ = (
+    'BotMember',
+    'Strategy',
+    'random_strategy',
+    'LocalTransport',
+    'simulate',
+    'run',
+)
+
+Strategy = Callable[[Question, random.Random], Optional[int]]
+
+
+def random_strategy(question: Question, rng: random.Random) -> Optional[int]:
+    """Answer every question with a uniformly random option."""
+    if not question.options:
+        return -1 if question.allow_skip else None
+    return rng.randrange(len(question.options))
+
+
+class BotMember:
+    """Stands in for a ``qq.Member``; private messages end up in :attr:`inbox`."""
+
+    def __init__(self, member_id: int, name: Optional[str] = None):
+        self.id: int = member_id
+        self.display_name: str = name or f'Bot_{member_id}'
+        self.mention: str = f'@{self.display_name}'
+        self.inbox: List[str] = []
+
+    def __repr__(self):
+        return f'<BotMember id={self.id} name={self.display_name}>'
+
+    async def send(self, content: str):
+        self.inbox.append(content)
+
+
+class LocalTransport(Transport):
+    """An in-memory :class:`Transport` whose players are bots.
+
+    Channel posts are appended to :attr:`log`. Each question is answered on the next
+    loop iteration with whatever ``strategy`` returns for it; ``None`` leaves it
+    unanswered until it times out.
+    """
+
+    def __init__(self, strategy: Optional[Strategy] = None, rng: Optional[random.Random] = None):
+        self.strategy: Strategy = strategy or random_strategy
+        self.rng: random.Random = rng or random.Random()
+        self.router: QuestionRouter = QuestionRouter()
+        self.scheduler: Scheduler = Scheduler()
+        self.log: List[str] = []
+        self.asked: Dict[QuestionType, int] = {}
+
+    def post(self, content: str):
+        if content:
+            self.log.append(content)
+
+    async def send_all(self, messages: Iterable[Tuple[BotMember, str]]) -> BatchReport:
+        report = BatchReport()
+        for member, content in messages:
+            if content:
+                member.inbox.append(content)
+                report.sent += 1
+        return report
+
+    def ask(self, member, q_type, options, prompt, *, allow_skip=False, replace=False) -> Optional[Question]:
+        question = super().ask(member, q_type, options, prompt, allow_skip=allow_skip, replace=replace)
+        if question is not None:
+            self.asked[q_type] = self.asked.get(q_type, 0) + 1
+            asyncio.get_running_loop().call_soon(self._reply, question)
+        return question
+
+    def _reply(self, question: Question):
+        if question.done:
+            return
+        choice = self.strategy(question, self.rng)
+        if choice is not None:
+            self.router.answer(question.member.id, choice)
+
+    def close(self):
+        self.scheduler.close()
+
+
+async def simulate(
+        player_count: int,
+        *,
+        chaos: bool = False,
+        seed: Optional[int] = None,
+        strategy: Optional[Strategy] = None,
+        max_days: int = 30,
+        history: Optional[HistoryStore] = None,
+        transport: Optional[LocalTransport] = None,
+) -> Session:
+    """Play one game with ``player_count`` bots and return the finished :class:`Session`.
+
+    ``seed`` makes role assignment and the bots' answers reproducible. ``max_days``
+    ends a game that drags on with no winner. The game is recorded in ``history``
+    if given. A ``transport`` passed in replaces ``strategy``.
+    """
+    if seed is not None:
+        random.seed(seed)
+    transport = transport or LocalTransport(strategy, random.Random(seed))
+    session = Session(None, chaos, None, transport=transport)
+    session.history = history
+    session.setting.game_join_time = 0
+    session.setting.start_delay = 0
+    session.setting.night_time = 1
+    session.setting.night_warning = 0
+    session.setting.day_time = 0
+    session.setting.lynch_time = 1
+    session.setting.max_days = max_days
+    for n in range(player_count):
+        session.join(BotMember(n))
+    try:
+        await session.main_game_loop()
+    finally:
+        transport.close()
+    return session
+
+
+def run(player_count: int, **kwargs) -> Session:
+    return asyncio.run(simulate(player_count, **kwargs))
+
+
+def main():
+    player_count = int(sys.argv[1]) if len(sys.argv) > 1 else 12
+    start = time.perf_counter()
+    session = run(player_count, seed=int(sys.argv[2]) if len(sys.argv) > 2 else None)
+    elapsed = time.perf_counter() - start
+    print('\n'.join(session.transport.log))
+    print(f'\n{player_count} players, {session.day} days, {elapsed * 1000:.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,350 @@
+"""Binary snapshots of running sessions, so games survive a restart or cog reload.
+
+One file per guild holds a fixed-size header, the session state, one fixed-size
+record per player and one per death::
+
+    header | state | player 0 .. player n-1 | death 0 .. death m-1
+
+The header carries a CRC32 of everything after it. A save only rewrites the player
+records whose bytes changed, appends new deaths and then rewrites the header, so a
+phase boundary costs a handful of small ``pwrite`` calls. A snapshot torn by a crash
+fails its checksum and is discarded instead of resuming a corrupt game.
+"""
+from __future__ import annotations
+
+import datetime
+import logging
+import os
+import struct
+import zlib
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, TYPE_CHECKING
+
+from cogs.werewolf.enum import KillMethod
+from cogs.werewolf.history import DeathRecord
+from cogs.werewolf.roles import ROLES, Role
+
+if TYPE_CHECKING:
+    from cogs.werewolf.session import Player, Session
+
+__all__ = (
+    'PlayerState',
+    'SessionState',
+    'SnapshotStore',
+)
+
+log = logging.getLogger(__name__)
+
+MAGIC = b'WWS1'
+VERSION = 2
+
+# magic, version, player count, death count, crc32 of the rest
+_HEADER = struct.Struct('<4sHHHI')
+# guild, channel, day, night, joining, running, chaos, wolf cub killed, sandman sleep, silver spread,
+# join time left, start time, then Setting: min players, join time, disabled roles, burning overkill,
+# thief full, night time, night warning, dm concurrency, start delay, max days, day time, lynch time
+_STATE = struct.Struct('<qqH7?fdHfQ??ffHfHHH')
+# member, role bit, flags, in love, role model, changed role count, time died, bullet, kill method,
+# kill by role, final shot delay
+_PLAYER = struct.Struct('<qbHqqBhbbbb')
+# member, day, night, kill method, killer, killer role bit
+_DEATH = struct.Struct('<qH?bqb')
+
+_NONE = -1
+
+
+def _bit(role: Optional[Role]) -> int:
+    return role.bit if role else _NONE
+
+
+def _role(bit: int) -> Optional[Role]:
+    return ROLES.from_bit(bit) if bit != _NONE else None
+
+
+def _method(method: Optional[KillMethod]) -> int:
+    return method.value if method else _NONE
+
+
+@dataclass
+class PlayerState:
+    member_id: int
+    role: Optional[Role]
+    flags: int
+    in_love: int
+    role_model: int
+    changed_role_count: int
+    time_died: int
+    bullet: int
+    kill_method: Optional[KillMethod]
+    kill_by_role: Optional[Role]
+    final_shot_delay: Optional[KillMethod]
+
+    @staticmethod
+    def pack(player: Player) -> bytes:
+        return _PLAYER.pack(
+            player.member.id,
+            _bit(player.role),
+            player.flags,
+            player.in_love.member.id if player.in_love else 0,
+            player.role_model.member.id if player.role_model else 0,
+            min(player.changed_role_count, 255),
+            player.time_died or 0,
+            player.bullet,
+            _method(player.kill_method),
+            _bit(player.kill_by_role),
+            _method(player.final_shot_delay),
+        )
+
+    @classmethod
+    def unpack(cls, data: bytes) -> PlayerState:
+        member, role, flags, in_love, model, changed, died, bullet, method, by_role, delay = _PLAYER.unpack(data)
+        return cls(
+            member, _role(role), flags, in_love, model, changed, died, bullet,
+            KillMethod(method) if method != _NONE else None, _role(by_role),
+            KillMethod(delay) if delay != _NONE else None,
+        )
+
+
+@dataclass
+class SessionState:
+    guild_id: int
+    channel_id: int
+    day: int
+    night: bool
+    is_joining: bool
+    is_running: bool
+    chaos: bool
+    wolf_cub_killed: bool
+    sandman_sleep: bool
+    silver_spread: bool
+    join_time: float
+    start_time: Optional[datetime.datetime]
+    setting: Dict[str, object]
+    players: List[PlayerState] = field(default_factory=list)
+    deaths: List[DeathRecord] = field(default_factory=list)
+
+    @staticmethod
+    def pack(session: Session) -> bytes:
+        s = session.setting
+        return _STATE.pack(
+            session.guild.id,
+            session.channel.id,
+            session.day,
+            session.night,
+            session.is_joining,
+            session.is_running,
+            session.chaos,
+            session.wolf_cub_killed,
+            session.sandman_sleep,
+            session.silver_spread,
+            session.join_time,
+            session.start_time.timestamp() if session.start_time else 0.0,
+            s.min_players, s.game_join_time, s.disabled_role, s.burning_overkill, s.thief_full,
+            s.night_time, s.night_warning, s.dm_concurrency, s.start_delay, s.max_days, s.day_time, s.lynch_time,
+        )
+
+    @classmethod
+    def unpack(cls, data: bytes) -> SessionState:
+        (
+            guild, channel, day, night, joining, running, chaos, cub, sandman, silver, join_time, start,
+            min_players, game_join_time, disabled_role, burning_overkill, thief_full,
+            night_time, night_warning, dm_concurrency, start_delay, max_days, day_time, lynch_time,
+        ) = _STATE.unpack(data)
+        return cls(
+            guild, channel, day, night, joining, running, chaos, cub, sandman, silver, join_time,
+            datetime.datetime.fromtimestamp(start) if start else None,
+            dict(
+                min_players=min_players, game_join_time=game_join_time, disabled_role=disabled_role,
+                burning_overkill=burning_overkill, thief_full=thief_full, night_time=night_time,
+                night_warning=night_warning, dm_concurrency=dm_concurrency, start_delay=start_delay,
+                max_days=max_days, day_time=day_time, lynch_time=lynch_time,
+            ),
+        )
+
+
+def _pack_death(death: DeathRecord) -> bytes:
+    return _DEATH.pack(
+        death.member_id, death.day, death.night,
+        death.kill_method if death.kill_method is not None else _NONE,
+        death.killer_id or 0,
+        death.killer_role if death.killer_role is not None else _NONE,
+    )
+
+
+def _unpack_death(data: bytes) -> DeathRecord:
+    member, day, night, method, killer, role = _DEATH.unpack(data)
+    return DeathRecord(
+        member, day, night, method if method != _NONE else None, killer or None, role if role != _NONE else None
+    )
+
+
+class _File:
+    """What was last written for one guild, so the next save can skip unchanged bytes."""
+
+    def __init__(self, path: Path, fsync: bool):
+        self.path = path
+        self.fsync = fsync
+        self.fd: Optional[int] = None
+        self.state: bytes = b''
+        self.players: List[bytes] = []
+        self.deaths: List[bytes] = []
+
+    def rewrite(self, state: bytes, players: List[bytes], deaths: List[bytes]):
+        self.close()
+        body = state + b''.join(players) + b''.join(deaths)
+        tmp = self.path.with_suffix('.tmp')
+        with open(tmp, 'wb') as f:
+            f.write(_HEADER.pack(MAGIC, VERSION, len(players), len(deaths), zlib.crc32(body)) + body)
+            if self.fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        self.fd = os.open(self.path, os.O_RDWR)
+        self.state, self.players, self.deaths = state, players, deaths
+        return len(body)
+
+    def update(self, state: bytes, players: List[bytes], deaths: List[bytes]) -> int:
+        written = 0
+        offset = _HEADER.size
+        if state != self.state:
+            written += os.pwrite(self.fd, state, offset)
+        offset += len(state)
+        for old, new in zip(self.players, players):
+            if old != new:
+                written += os.pwrite(self.fd, new, offset)
+            offset += _PLAYER.size
+        offset += len(self.deaths) * _DEATH.size
+        fresh = deaths[len(self.deaths):]
+        if fresh:
+            written += os.pwrite(self.fd, b''.join(fresh), offset)
+        body = state + b''.join(players) + b''.join(deaths)
+        written += os.pwrite(self.fd, _HEADER.pack(MAGIC, VERSION, len(players), len(deaths), zlib.crc32(body)), 0)
+        if self.fsync:
+            os.fsync(self.fd)
+        self.state, self.players, self.deaths = state, players, deaths
+        return written
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+class SnapshotStore:
+    """Snapshots of every running session of the cog, one file per guild in ``directory``."""
+
+    def __init__(self, directory: str, *, fsync: bool = False):
+        self.directory: Path = Path(directory)
+        self.fsync: bool = fsync
+        self.files: Dict[int, _File] = {}
+        self.bytes_written: int = 0
+
+    def save(self, session: Session):
+        state = SessionState.pack(session)
+        players = [PlayerState.pack(n) for n in session.players.values()]
+        deaths = [_pack_death(n) for n in session.deaths]
+        snapshot = self.files.get(session.guild.id)
+        if snapshot is None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            snapshot = self.files[session.guild.id] = _File(self.directory / f'{session.guild.id}.snap', self.fsync)
+        if (
+                snapshot.fd is None or
+                [n[:8] for n in players] != [n[:8] for n in snapshot.players] or
+                deaths[:len(snapshot.deaths)] != snapshot.deaths
+        ):
+            # Someone joined or left, so records moved; lobbies are small, write it all again.
+            self.bytes_written += snapshot.rewrite(state, players, deaths)
+        else:
+            self.bytes_written += snapshot.update(state, players, deaths)
+
+    def remove(self, guild_id: int):
+        snapshot = self.files.pop(guild_id, None)
+        if snapshot is not None:
+            snapshot.close()
+        try:
+            os.remove(self.directory / f'{guild_id}.snap')
+        except FileNotFoundError:
+            pass
+
+    @staticmethod
+    def read(path: Path) -> Optional[SessionState]:
+        data = path.read_bytes()
+        if len(data) < _HEADER.size:
+            return None
+        magic, version, player_count, death_count, crc = _HEADER.unpack_from(data)
+        body = data[_HEADER.size:]
+        size = _STATE.size + player_count * _PLAYER.size + death_count * _DEATH.size
+        if magic != MAGIC or version != VERSION or len(body) < size or zlib.crc32(body[:size]) != crc:
+            return None
+        state = SessionState.unpack(body[:_STATE.size])
+        offset = _STATE.size
+        for _ in range(player_count):
+            state.players.append(PlayerState.unpack(body[offset:offset + _PLAYER.size]))
+            offset += _PLAYER.size
+        for _ in range(death_count):
+            state.deaths.append(_unpack_death(body[offset:offset + _DEATH.size]))
+            offset += _DEATH.size
+        return state
+
+    def load(self, guild_id: int) -> Optional[SessionState]:
+        """The snapshot of ``guild_id``, or ``None`` when there is no usable one."""
+        try:
+            return self.read(self.directory / f'{guild_id}.snap')
+        except (OSError, struct.error, ValueError):
+            return None
+
+    def load_all(self) -> List[SessionState]:
+        states = []
+        for path in sorted(self.directory.glob('*.snap')):
+            try:
+                state = self.read(path)
+            except (OSError, struct.error, ValueError):
+                log.exception('Failed to read snapshot %s', path)
+                state = None
+            if state is None:
+                log.warning('Discarding torn or outdated snapshot %s', path)
+                path.unlink(missing_ok=True)
+                continue
+            states.append(state)
+        return states
+
+    @staticmethod
+    def restore(state: SessionState, session: Session, member: Callable[[int], object]):
+        """Put ``state`` back into a fresh ``session``; ``member`` looks up a member by id."""
+        from cogs.werewolf.session import DEAD_FLAG, Player
+
+        for name, value in state.setting.items():
+            setattr(session.setting, name, value)
+        session.day = state.day
+        session.night = state.night
+        session.is_joining = state.is_joining
+        session.is_running = state.is_running
+        session.wolf_cub_killed = state.wolf_cub_killed
+        session.sandman_sleep = state.sandman_sleep
+        session.silver_spread = state.silver_spread
+        session.start_time = state.start_time or session.start_time
+        session.deaths = list(state.deaths)
+
+        for ply in state.players:
+            found = member(ply.member_id)
+            if found is None:
+                log.warning('Member %s of guild %s is gone', ply.member_id, state.guild_id)
+                continue
+            session.join(Player(found, session))
+        for ply in state.players:
+            p = session.players.get(ply.member_id)
+            if p is None:
+                continue
+            p.flags = ply.flags & ~DEAD_FLAG
+            if ply.role is not None:
+                p.role = ply.role
+            p.dead = bool(ply.flags & DEAD_FLAG)
+            p.in_love = session.players.get(ply.in_love) or p.in_love
+            p.role_model = session.players.get(ply.role_model) or p.role_model
+            p.changed_role_count = ply.changed_role_count
+            p.time_died = ply.time_died
+            p.bullet = ply.bullet
+            p.kill_method = ply.kill_method or p.kill_method
+            p.kill_by_role = ply.kill_by_role or p.kill_by_role
+            p.final_shot_delay = ply.final_shot_delay or p.final_shot_delay
@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import abc
+from typing import Any, Iterable, List, Optional, Tuple, TYPE_CHECKING
+
+import qq
+
+from cogs.werewolf.dispatch import BatchReport, DMDispatcher
+from cogs.werewolf.enum import QuestionType
+from cogs.werewolf.outbound import OutboundQueue
+from cogs.werewolf.question import Question, QuestionRouter, format_menu
+from cogs.werewolf.scheduler import Scheduler
+
+if TYPE_CHECKING:
+    from cogs.werewolf import Werewolf
+    from cogs.werewolf.session import Setting
+
+__all__ = (
+    'Transport',
+    'QQTransport',
+)
+
+
+class Transport(abc.ABC):
+    """Everything a :class:`Session` needs from the outside world.
+
+    The session posts to its channel, DMs players, asks them numbered questions and
+    schedules timers only through this interface, so a game can be run against QQ
+    (:class:`QQTransport`) or entirely in memory (``cogs.werewolf.simulation``).
+    """
+    scheduler: Scheduler
+    router: QuestionRouter
+
+    @abc.abstractmethod
+    def post(self, content: str):
+        """Queue a message for the game channel without waiting for it to be sent."""
+
+    @abc.abstractmethod
+    async def send_all(self, messages: Iterable[Tuple[qq.Member, str]]) -> BatchReport:
+        """Send a batch of private messages."""
+
+    async def send(self, member: qq.Member, content: str) -> BatchReport:
+        return await self.send_all([(member, content)])
+
+    async def flush(self):
+        """Wait until every queued channel post has been sent."""
+
+    def ask(
+            self,
+            member: qq.Member,
+            q_type: QuestionType,
+            options: List[Any],
+            prompt: str,
+            *,
+            allow_skip: bool = False,
+            replace: bool = False,
+    ) -> Optional[Question]:
+        return self.router.ask(member, q_type, options, prompt, allow_skip=allow_skip, replace=replace)
+
+    def build_menu(
+            self, option_str: List[str], options: List[Any], member: qq.Member, msg: str, q_type: QuestionType
+    ) -> Optional[Question]:
+        if member.id in self.router:
+            return None
+        return self.ask(member, q_type, [n for n in options], format_menu(msg, option_str))
+
+    async def wait(self, question: Question, timeout: Optional[float] = None) -> Optional[int]:
+        return await self.router.wait(question, timeout)
+
+    def expire(self, question: Question):
+        self.router.expire(question)
+
+
+class QQTransport(Transport):
+    """Talks to QQ through the queues, router and scheduler of the :class:`Werewolf` cog.
+
+    DMs are sent ``setting.dm_concurrency`` at a time, read at every batch so that a
+    changed or restored setting applies to the next one.
+    """
+
+    def __init__(self, channel: qq.abc.Messageable, cog: Optional[Werewolf], setting: Optional[Setting] = None):
+        self.channel = channel
+        self.cog = cog
+        self.setting: Optional[Setting] = setting
+        self.dispatcher: DMDispatcher = DMDispatcher()
+        if cog is not None:
+            self.outbound: OutboundQueue = cog.outbound
+            self.router: QuestionRouter = cog.router
+            self.scheduler: Scheduler = cog.scheduler
+        else:
+            self.outbound = OutboundQueue()
+            self.router = QuestionRouter()
+            self.scheduler = Scheduler()
+
+    def post(self, content: str):
+        self.outbound.post(self.channel, content)
+
+    async def send_all(self, messages: Iterable[Tuple[qq.Member, str]]) -> BatchReport:
+        limit = self.setting.dm_concurrency if self.setting is not None else None
+        return await self.dispatcher.send_all(messages, limit)
+
+    async def flush(self):
+        await self.outbound.flush(self.channel)
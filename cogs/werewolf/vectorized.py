@@ -0,0 +1,238 @@
+"""Batched role sampling with NumPy.
+
+:func:`cogs.werewolf.balance.balance_roles` draws one candidate role list at a time
+and adds up :attr:`Role.strength` in a Python loop. Here a whole batch of candidates
+is drawn as an integer matrix of role ids, the fix-ups are applied as boolean masks
+and both sides are scored with one array operation each.
+
+This is for analysis, not for starting games. A single lobby needs only a handful
+of candidates, so the fixed cost of the NumPy calls makes :func:`balance_vectorized`
+slower than ``balance_roles`` at every lobby size (see ``benchmarks.balance``), and
+``Session.balance`` keeps using the latter. The batches pay off in bulk, in
+:func:`sample_lobbies` and ``python -m cogs.werewolf.analysis --engine rejection``.
+
+NumPy is optional; :data:`HAS_NUMPY` tells whether this module can be used.
+"""
+from __future__ import annotations
+
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+from cogs.werewolf.balance import DRAW_LIMIT, BalanceResult
+from cogs.werewolf.roles import ROLES, Role
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+__all__ = (
+    'HAS_NUMPY',
+    'TABLE',
+    'RoleBatch',
+    'role_ids',
+    'roles_of',
+    'sample_roles',
+    'balance_vectorized',
+    'LobbyBatch',
+    'sample_lobbies',
+)
+
+HAS_NUMPY = np is not None
+
+TABLE: Tuple[Role, ...] = tuple(ROLES.all_role.values())
+_ID = {n: idx for idx, n in enumerate(TABLE)}
+
+if HAS_NUMPY:
+    _STRENGTH = np.array([n.strength for n in TABLE], dtype=np.int32)
+    _EVIL = np.array([ROLES.is_evil(n) for n in TABLE], dtype=bool)
+    _POINTLESS = np.array([n in (ROLES.Traitor, ROLES.SnowWolf, ROLES.Sorcerer) for n in TABLE], dtype=bool)
+
+
+class RoleBatch(NamedTuple):
+    roles: 'np.ndarray'
+    villager_strength: 'np.ndarray'
+    enemy_strength: 'np.ndarray'
+    passing: 'np.ndarray'
+
+
+class LobbyBatch(NamedTuple):
+    roles: 'np.ndarray'
+    villager_strength: 'np.ndarray'
+    enemy_strength: 'np.ndarray'
+    balanced: 'np.ndarray'
+    drawn: 'np.ndarray'
+
+
+def role_ids(roles: Sequence[Role]) -> 'np.ndarray':
+    return np.fromiter((_ID[n] for n in roles), dtype=np.int16, count=len(roles))
+
+
+def roles_of(row: 'np.ndarray') -> List[Role]:
+    return [TABLE[n] for n in row.tolist()]
+
+
+def _pad(pools: 'np.ndarray', player_count: int) -> 'np.ndarray':
+    missing = player_count - pools.shape[1]
+    if missing <= 0:
+        return pools
+    return np.pad(pools, ((0, 0), (0, missing)), constant_values=_ID[ROLES.Villager])
+
+
+def _replace_first(matrix: 'np.ndarray', rows: 'np.ndarray', mask: 'np.ndarray', role: Role):
+    """Replace the first ``mask`` hit of every selected row with ``role``."""
+    if rows.any():
+        matrix[rows, mask.argmax(axis=1)[rows]] = _ID[role]
+
+
+def sample_roles(
+        pool: Sequence[Role],
+        player_count: int,
+        batch: int,
+        *,
+        chaos: bool = False,
+        burning_overkill: bool = True,
+        cult_hunter: bool = True,
+        variance: Optional[int] = None,
+        rng: Optional['np.random.Generator'] = None,
+) -> RoleBatch:
+    """Draw ``batch`` candidate role lists from ``pool`` with the legacy fix-ups applied.
+
+    Every candidate is ``player_count`` independent draws from ``pool`` padded with
+    villagers. ``pool`` may also be a 2-D array of role ids holding one pool per
+    candidate, in which case ``batch`` is ignored. ``passing`` marks the rows the
+    legacy sampler would have accepted.
+    """
+    rng = rng or np.random.default_rng()
+    if variance is None:
+        variance = player_count // 4 + 1
+    if isinstance(pool, np.ndarray) and pool.ndim == 2:
+        # One pool per row, as built by :func:`sample_lobbies`.
+        pools = _pad(pool, player_count)
+        picks = rng.integers(0, pools.shape[1], size=(pools.shape[0], player_count))
+        matrix = np.take_along_axis(pools, picks, axis=1)
+    else:
+        ids = _pad(role_ids(pool)[None, :], player_count)[0]
+        matrix = ids[rng.integers(0, len(ids), size=(batch, player_count))]
+
+    wolf = matrix == _ID[ROLES.Wolf]
+    pointless = _POINTLESS[matrix]
+    _replace_first(matrix, pointless.any(axis=1) & ~wolf.any(axis=1), pointless, ROLES.Wolf)
+
+    if cult_hunter:
+        cultist = matrix == _ID[ROLES.Cultist]
+        villager = matrix == _ID[ROLES.Villager]
+        rows = cultist.any(axis=1) & ~(matrix == _ID[ROLES.CultistHunter]).any(axis=1)
+        has_villager = villager.any(axis=1)
+        _replace_first(matrix, rows & has_villager, villager, ROLES.CultistHunter)
+        _replace_first(matrix, rows & ~has_villager, cultist, ROLES.Villager)
+
+    if not burning_overkill:
+        arsonist = matrix == _ID[ROLES.Arsonist]
+        rows = arsonist.any(axis=1) & (matrix == _ID[ROLES.SerialKiller]).any(axis=1)
+        _replace_first(matrix, rows, arsonist, ROLES.Villager)
+
+    apprentice = matrix == _ID[ROLES.ApprenticeSeer]
+    rows = apprentice.any(axis=1) & ~(matrix == _ID[ROLES.Seer]).any(axis=1)
+    _replace_first(matrix, rows, apprentice, ROLES.Seer)
+
+    evil = _EVIL[matrix]
+    strength = _STRENGTH[matrix]
+    enemy_strength = np.where(evil, strength, 0).sum(axis=1)
+    villager_strength = strength.sum(axis=1) - enemy_strength
+    baddies = evil.sum(axis=1)
+    passing = (baddies > 0) & (player_count - baddies >= baddies)
+    if not chaos:
+        passing &= np.abs(villager_strength - enemy_strength) <= variance
+    return RoleBatch(matrix, villager_strength, enemy_strength, passing)
+
+
+def balance_vectorized(
+        pool: Sequence[Role],
+        player_count: int,
+        *,
+        chaos: bool = False,
+        burning_overkill: bool = True,
+        cult_hunter: bool = True,
+        variance: Optional[int] = None,
+        limit: int = DRAW_LIMIT,
+        batch: int = 32,
+        rng: Optional['np.random.Generator'] = None,
+) -> Tuple[BalanceResult, int]:
+    """The legacy rejection sampler, ``batch`` candidates at a time.
+
+    Returns the first passing candidate and how many candidates were drawn up to and
+    including it. Batches double in size, so an easy lobby costs one small batch while
+    a hard one still stops after ``limit`` candidates; the last candidate is returned
+    unbalanced in that case, as the legacy sampler did.
+    """
+    rng = rng or np.random.default_rng()
+    drawn = 0
+    result = None
+    while drawn < limit:
+        size = min(batch, limit - drawn)
+        sampled = sample_roles(
+            pool, player_count, size, chaos=chaos, burning_overkill=burning_overkill,
+            cult_hunter=cult_hunter, variance=variance, rng=rng,
+        )
+        hits = np.flatnonzero(sampled.passing)
+        row = int(hits[0]) if hits.size else size - 1
+        result = BalanceResult(
+            roles=roles_of(sampled.roles[row]),
+            villager_strength=int(sampled.villager_strength[row]),
+            enemy_strength=int(sampled.enemy_strength[row]),
+            balanced=bool(hits.size),
+        )
+        drawn += row + 1
+        if hits.size:
+            break
+        batch *= 2
+    return result, drawn
+
+
+def sample_lobbies(
+        pools: 'np.ndarray',
+        player_count: int,
+        *,
+        chaos: bool = False,
+        burning_overkill: bool = True,
+        cult_hunter: bool = True,
+        variance: Optional[int] = None,
+        limit: int = DRAW_LIMIT,
+        batch: int = 16,
+        rng: Optional['np.random.Generator'] = None,
+) -> LobbyBatch:
+    """Run the legacy rejection sampler for many lobbies at once.
+
+    ``pools`` holds one role pool per lobby as role ids (see :func:`role_ids`); all
+    pools of one player count have the same length. Each round draws ``batch``
+    candidates for every lobby that hasn't passed yet and keeps the first passing one,
+    doubling ``batch`` until ``limit`` candidates were drawn. ``drawn`` counts the
+    candidates drawn per lobby, ``balanced`` is false where the limit was hit.
+    """
+    rng = rng or np.random.default_rng()
+    lobbies = pools.shape[0]
+    roles = np.zeros((lobbies, player_count), dtype=pools.dtype)
+    villager_strength = np.zeros(lobbies, dtype=np.int32)
+    enemy_strength = np.zeros(lobbies, dtype=np.int32)
+    balanced = np.zeros(lobbies, dtype=bool)
+    drawn = np.zeros(lobbies, dtype=np.int32)
+    todo = np.arange(lobbies)
+    while todo.size:
+        size = int(min(batch, limit - drawn[todo[0]]))
+        sampled = sample_roles(
+            np.repeat(pools[todo], size, axis=0), player_count, 0, chaos=chaos,
+            burning_overkill=burning_overkill, cult_hunter=cult_hunter, variance=variance, rng=rng,
+        )
+        passing = sampled.passing.reshape(todo.size, size)
+        hit = passing.any(axis=1)
+        # The first passing candidate of every lobby, or its last one when none passed.
+        row = np.where(hit, passing.argmax(axis=1), size - 1)
+        flat = np.arange(todo.size) * size + row
+        drawn[todo] += np.where(hit, row + 1, size)
+        roles[todo] = sampled.roles[flat]
+        villager_strength[todo] = sampled.villager_strength[flat]
+        enemy_strength[todo] = sampled.enemy_strength[flat]
+        balanced[todo] = hit
+        todo = todo[~hit & (drawn[todo] < limit)]
+        batch *= 2
+    return LobbyBatch(roles, villager_strength, enemy_strength, balanced, drawn)
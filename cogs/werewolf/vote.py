@@ -0,0 +1,88 @@
+"""The running count of a lynch vote.
+
+Every ballot adds its voter's weight to one candidate and pushes the new count
+onto a max-heap, so the leader is known in O(log n) per ballot without
+re-counting. Heap entries go stale when a candidate gets more votes; they are
+dropped lazily when they reach the top.
+
+The vote is :attr:`LynchTally.decided` once the leader holds a strict majority
+of all the weight that could be cast, or once nobody is left to vote.
+"""
+from __future__ import annotations
+
+import heapq
+from typing import Dict, List, Optional, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from cogs.werewolf.session import Player
+
+__all__ = (
+    'LynchTally',
+)
+
+
+class LynchTally:
+    """``weights`` maps every voter to how many votes their ballot is worth."""
+
+    def __init__(self, weights: Dict[Player, int]):
+        self.weights: Dict[Player, int] = weights
+        self.total: int = sum(weights.values())
+        self.remaining: int = self.total
+        self.counts: Dict[Player, int] = {}
+        self.voted: Dict[Player, Optional[Player]] = {}
+        # (-count, first voted for, seq, candidate); seq keeps players out of comparisons.
+        self._heap: List[Tuple[int, int, int, Player]] = []
+        self._first: Dict[Player, int] = {}
+        self._seq: int = 0
+
+    def cast(self, voter: Player, target: Optional[Player]) -> bool:
+        """Count ``voter``'s ballot for ``target``, or an abstention for ``None``; once per voter."""
+        if voter in self.voted or voter not in self.weights:
+            return False
+        self.voted[voter] = target
+        weight = self.weights[voter]
+        self.remaining -= weight
+        if target is not None and weight:
+            count = self.counts.get(target, 0) + weight
+            self.counts[target] = count
+            first = self._first.setdefault(target, len(self._first))
+            self._seq += 1
+            heapq.heappush(self._heap, (-count, first, self._seq, target))
+        return True
+
+    def _top(self) -> Optional[Tuple[int, int, int, Player]]:
+        heap = self._heap
+        while heap and -heap[0][0] != self.counts[heap[0][3]]:
+            heapq.heappop(heap)
+        return heap[0] if heap else None
+
+    def leader(self) -> Optional[Tuple[Player, int]]:
+        top = self._top()
+        return (top[3], -top[0]) if top is not None else None
+
+    def runner_up(self) -> int:
+        """The best count of anyone but the leader."""
+        top = self._top()
+        if top is None:
+            return 0
+        heapq.heappop(self._heap)
+        second = self._top()
+        heapq.heappush(self._heap, top)
+        return -second[0] if second is not None else 0
+
+    @property
+    def decided(self) -> bool:
+        if not self.remaining:
+            return True
+        top = self._top()
+        return top is not None and -top[0] * 2 > self.total
+
+    def result(self) -> Optional[Player]:
+        """Whoever leads alone, or ``None`` after a tie or when nobody voted."""
+        leader = self.leader()
+        if leader is None or self.runner_up() == leader[1]:
+            return None
+        return leader[0]
+
+    def standings(self, limit: int = 5) -> List[Tuple[Player, int]]:
+        return heapq.nlargest(limit, self.counts.items(), key=lambda n: n[1])
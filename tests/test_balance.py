@@ -0,0 +1,86 @@
+"""Which roles :func:`cogs.werewolf.balance.balance_roles` deals, against the rejection loop it replaced.
+
+Both sides deal ``DEALS`` lobbies per player count from pools built by
+:func:`role_pool`, each with its own seeded generator. The share of lobbies that
+get each faction and the mean number of evil roles have to agree within
+``TOLERANCE``, which is several standard errors at this sample size.
+"""
+import random
+import statistics
+from typing import List
+
+import pytest
+
+from cogs.werewolf.balance import balance_roles, role_pool
+from cogs.werewolf.roles import ROLES, Role
+
+DEALS = 2000
+TOLERANCE = 0.05
+
+FACTIONS = {
+    'wolf': ROLES.wolves,
+    'cult': (ROLES.Cultist,),
+    'sk': (ROLES.SerialKiller,),
+    'arson': (ROLES.Arsonist,),
+}
+
+
+def legacy(pool: List[Role], player_count: int, rng: random.Random) -> List[Role]:
+    """``Session.balance`` before the knapsack balancer, with the default settings."""
+    if player_count > len(pool):
+        pool += [ROLES.Villager] * (player_count - len(pool))
+    count = 0
+    while True:
+        count += 1
+        roles = rng.choices(pool, k=player_count)
+        if count >= 500:
+            break
+        pointless_role = [x for x in roles if x in [ROLES.Traitor, ROLES.SnowWolf, ROLES.Sorcerer]]
+        if pointless_role and ROLES.Wolf not in roles:
+            roles[roles.index(pointless_role[0])] = ROLES.Wolf
+        if ROLES.Cultist in roles and ROLES.CultistHunter not in roles:
+            if ROLES.Villager in roles:
+                roles[roles.index(ROLES.Villager)] = ROLES.CultistHunter
+            else:
+                roles[roles.index(ROLES.Cultist)] = ROLES.Villager
+        if ROLES.ApprenticeSeer in roles and ROLES.Seer not in roles:
+            roles[roles.index(ROLES.ApprenticeSeer)] = ROLES.Seer
+        baddies = [x for x in roles if ROLES.is_evil(x)]
+        villagers = [x for x in roles if not ROLES.is_evil(x)]
+        if not (villagers and baddies):
+            continue
+        if len(villagers) < len(baddies):
+            continue
+        if abs(sum(n.strength for n in villagers) - sum(n.strength for n in baddies)) <= player_count // 4 + 1:
+            break
+    return roles
+
+
+def shares(deal, player_count: int, seed: int):
+    rng = random.Random(seed)
+    seen = dict.fromkeys(FACTIONS, 0)
+    evil = []
+    for _ in range(DEALS):
+        roles = deal(role_pool(player_count, rng=rng), player_count, rng)
+        for name, members in FACTIONS.items():
+            seen[name] += any(n in members for n in roles)
+        evil.append(sum(1 for n in roles if ROLES.is_evil(n)))
+    return {name: n / DEALS for name, n in seen.items()}, statistics.mean(evil)
+
+
+@pytest.mark.parametrize('player_count', (5, 10, 20, 50))
+def test_role_frequencies_match_legacy(player_count):
+    want, want_evil = shares(legacy, player_count, 1)
+    got, got_evil = shares(lambda p, c, rng: balance_roles(p, c, rng=rng).roles, player_count, 2)
+    for name in FACTIONS:
+        assert abs(got[name] - want[name]) <= TOLERANCE, (name, got, want)
+    assert abs(got_evil - want_evil) <= TOLERANCE * want_evil, (got_evil, want_evil)
+
+
+@pytest.mark.parametrize('player_count', range(5, 51))
+def test_every_lobby_is_balanced(player_count):
+    rng = random.Random(player_count)
+    for _ in range(50):
+        result = balance_roles(role_pool(player_count, rng=rng), player_count, rng=rng)
+        assert result.balanced
+        assert len(result.roles) == player_count
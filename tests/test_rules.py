@@ -0,0 +1,150 @@
+"""The table of :mod:`cogs.werewolf.rules` against the if-chain it replaced.
+
+Every multiset of up to ``MAX_ALIVE`` survivors drawn from ``ROSTER`` is tried with
+each combination of lovers, bitten players, gunner bullets and ``check_bitten``.
+Both sides run after the wolf succession step, which is unchanged. A decision is
+``(action, winner)``, where ``winner`` is ``None`` while the game goes on.
+"""
+import itertools
+from collections import Counter
+from typing import List, Optional, Tuple
+
+import pytest
+
+from cogs.werewolf import rules
+from cogs.werewolf.enum import PlayerFlag, WinType
+from cogs.werewolf.roles import ROLES
+
+MAX_ALIVE = 5
+
+ROSTER = (
+    ROLES.Villager, ROLES.Seer, ROLES.Wolf, ROLES.Lycan, ROLES.SnowWolf, ROLES.Traitor, ROLES.Hunter,
+    ROLES.SerialKiller, ROLES.Arsonist, ROLES.Cultist, ROLES.CultistHunter, ROLES.Tanner, ROLES.Sorcerer,
+    ROLES.Thief, ROLES.Doppelganger, ROLES.Gunner,
+)
+WOLF_ROLES = [ROLES.Wolf, ROLES.AlphaWolf, ROLES.WolfCub, ROLES.Lycan]
+LONERS = [ROLES.Tanner, ROLES.Sorcerer, ROLES.Thief, ROLES.Doppelganger]
+
+Decision = Tuple[Optional[str], Optional[WinType]]
+
+
+class Survivor:
+    def __init__(self, role, in_love=False, bitten=False, bullet=2):
+        self.role = role
+        self.in_love = in_love
+        self.flags = int(PlayerFlag.Bitten) if bitten else 0
+        self.bullet = bullet
+
+    @property
+    def bitten(self):
+        return not not self.flags & int(PlayerFlag.Bitten)
+
+
+def reference(survivor: List[Survivor], check_bitten: bool) -> Decision:
+    """``Session.check_game_end`` before the rules table, with its side effects named instead of done."""
+
+    def count(*roles):
+        return sum(1 for n in survivor if n.role in roles)
+
+    def party(win):
+        return sum(1 for n in survivor if n.role.party == win)
+
+    if not survivor:
+        return None, WinType.NoOne
+    elif len(survivor) == 1:
+        p = survivor[0]
+        if p.role in LONERS:
+            return None, WinType.NoOne
+        return None, p.role.party
+    elif len(survivor) == 2:
+        if all(n.in_love for n in survivor):
+            return None, WinType.Lovers
+        if all(n.role in LONERS for n in survivor):
+            return None, WinType.NoOne
+        if count(ROLES.Hunter):
+            other = [n for n in survivor if n.role != ROLES.Hunter]
+            if not other:
+                return None, WinType.Villager
+            other = other[0]
+            if other.role is ROLES.SerialKiller:
+                return None, WinType.SKHunter
+            if other.role in WOLF_ROLES:
+                return rules.HUNTER_DUEL, None
+        if count(ROLES.SerialKiller):
+            return None, WinType.SerialKiller
+        if count(ROLES.Arsonist):
+            return None, WinType.Arsonist
+        if count(ROLES.Cultist):
+            other = [n for n in survivor if n.role != ROLES.Cultist]
+            if not other:
+                return None, WinType.Cult
+            other = other[0]
+            if other.role in WOLF_ROLES:
+                return None, WinType.Wolf
+            if other.role is ROLES.CultistHunter:
+                return rules.CULT_HUNTER, WinType.Villager
+            return rules.CONVERT, WinType.Cult
+    elif len(survivor) == 3:
+        if all(n.role in LONERS for n in survivor):
+            return None, WinType.NoOne
+
+    if party(WinType.SerialKiller) or party(WinType.Arsonist):
+        return None, None
+    if party(WinType.Cult) == len(survivor):
+        return None, WinType.Cult
+
+    wolfs = [n for n in survivor if n.role in WOLF_ROLES or n.role is ROLES.SnowWolf]
+    others = [n for n in survivor if n not in wolfs]
+    if len(wolfs) >= len(others):
+        gunner = next((n for n in survivor if n.role is ROLES.Gunner), None)
+        if (
+                gunner and gunner.bullet > 0 and
+                (
+                        len(wolfs) == len(others) or
+                        (len(wolfs) == len(others) + 1 and len([n for n in wolfs if n.in_love]) == 2)
+                )
+        ):
+            return None, None
+        return None, WinType.Wolf
+    if not count(ROLES.SnowWolf, ROLES.Cultist, ROLES.SerialKiller, ROLES.Arsonist, *WOLF_ROLES):
+        if not check_bitten or all(n.bitten for n in survivor):
+            return None, WinType.Villager
+    return None, None
+
+
+def table(survivor: List[Survivor], check_bitten: bool, roles=None, parties=None) -> Decision:
+    composition = rules.Composition(survivor, check_bitten, roles, parties)
+    rule = rules.evaluate(composition)
+    if rule is None:
+        return None, None
+    return rule.action, rule.outcome(composition)
+
+
+def variants(roles) -> List[List[Survivor]]:
+    pack = [i for i, r in enumerate(roles) if r in rules.PACK]
+    lover_sets = [(), tuple(range(min(2, len(roles)))), tuple(pack[:2])]
+    bitten_sets = [(), (0,), tuple(range(len(roles)))]
+    result = []
+    for lovers, bitten, bullet in itertools.product(dict.fromkeys(lover_sets), bitten_sets, (0, 2)):
+        result.append([Survivor(r, i in lovers, i in bitten, bullet) for i, r in enumerate(roles)])
+    return result
+
+
+@pytest.mark.parametrize('size', range(MAX_ALIVE + 1))
+def test_table_matches_if_chain(size):
+    for roles in itertools.combinations_with_replacement(ROSTER, size):
+        for survivor in variants(roles):
+            for check_bitten in (False, True):
+                want = reference(survivor, check_bitten)
+                got = table(survivor, check_bitten)
+                assert got == want, (
+                    f'{[n.role.name for n in survivor]} lovers={[n.in_love for n in survivor]} '
+                    f'bitten={[n.bitten for n in survivor]} check_bitten={check_bitten}: {got} != {want}'
+                )
+
+
+def test_kept_counts_match_counting():
+    survivor = [Survivor(r) for r in ROSTER[:7] + (ROLES.Villager,) * 5]
+    roles = Counter(n.role for n in survivor)
+    parties = Counter(n.role.party for n in survivor)
+    assert table(survivor, True, roles, parties) == table(survivor, True)
@@ -0,0 +1,46 @@
+"""Session behaviour that needs a running event loop, played headless through :mod:`cogs.werewolf.simulation`."""
+import asyncio
+
+import pytest
+
+from cogs.werewolf.index import RoleIndex
+from cogs.werewolf.roles import ROLES
+from cogs.werewolf.session import Session
+from cogs.werewolf.simulation import BotMember, LocalTransport, run
+
+
+def test_force_start_before_the_lobby_opens():
+    async def play():
+        transport = LocalTransport()
+        session = Session(None, False, None, transport=transport)
+        session.join(BotMember(1))
+        # A /forcestart that arrives before main_game_loop has opened the lobby.
+        session.force_start = True
+        try:
+            await asyncio.wait_for(session.wait_for_players(60), 1)
+        finally:
+            transport.close()
+        return session
+
+    session = asyncio.run(play())
+    assert session.force_start
+    assert session.join_time == 0
+
+
+@pytest.mark.parametrize('player_count, chaos', [(5, False), (12, False), (12, True), (35, False)])
+def test_role_index_stays_in_sync(monkeypatch, player_count, chaos):
+    # Every index lookup during the game rebuilds the index and compares.
+    monkeypatch.setattr(RoleIndex, 'debug', True)
+    for seed in range(5):
+        session = run(player_count, chaos=chaos, seed=seed)
+        session.index.check()
+
+
+def test_role_index_check_catches_a_stale_index(monkeypatch):
+    monkeypatch.setattr(RoleIndex, 'debug', True)
+    session = run(8, seed=1)
+    player = next(iter(session.players.values()))
+    # Change the role behind the index's back, the way a direct slot write would.
+    player._role = ROLES.Tanner if player.role is not ROLES.Tanner else ROLES.Villager
+    with pytest.raises(AssertionError, match='by_role'):
+        session.index.check()